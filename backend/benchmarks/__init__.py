@@ -0,0 +1 @@
+"""Benchmarks the HADES backend end to end (without a real LLM, Nmap, or Metasploit)."""
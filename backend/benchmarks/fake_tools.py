@@ -0,0 +1,97 @@
+"""Defines fake Nmap and Msfconsole executables that take a set amount of time and print canned output."""
+
+# Standard library imports.
+import os
+import stat
+import sys
+from typing import Optional
+
+NMAP = '''#!{python}
+"""Fake Nmap: waits and then, reports every target as up with SSH and HTTP open (as XML on stdout)."""
+import ipaddress
+import sys
+import time
+
+RUNTIME = {runtime!r}
+OUTPUT = {output!r}
+
+# HADES puts the targets first, one per argument (e.g., "nmap 10.0.0.1 10.0.0.0/28 -oX - -sV").
+arguments = sys.argv[1:]
+first_option = next((i for i, argument in enumerate(arguments) if argument.startswith("-")), len(arguments))
+targets = []
+for target in arguments[:first_option]:
+    try:
+        targets.extend(str(address) for address in ipaddress.ip_network(target, strict=False))
+    except ValueError:
+        targets.append(target)
+time.sleep(RUNTIME)
+if OUTPUT is not None:
+    sys.stdout.write(open(OUTPUT).read())
+    sys.exit(0)
+print('<?xml version="1.0" encoding="UTF-8"?>')
+print(f'<nmaprun scanner="nmap" args="{{" ".join(sys.argv)}}" start="{{int(time.time())}}">')
+for target in targets:
+    print('<host><status state="up" reason="syn-ack"/>')
+    print(f'<address addr="{{target}}" addrtype="ipv4"/>')
+    if "-sn" in sys.argv:
+        print('</host>')
+        continue
+    print('<ports>')
+    print('<port protocol="tcp" portid="22"><state state="open"/><service name="ssh" product="OpenSSH" version="8.9p1"/></port>')
+    print('<port protocol="tcp" portid="80"><state state="open"/><service name="http" product="nginx" version="1.18.0"/></port>')
+    print('</ports></host>')
+print(f'<runstats><finished time="{{int(time.time())}}" summary="Nmap done: {{len(targets)}} IP addresses scanned"/></runstats>')
+print('</nmaprun>')
+'''
+
+MSFCONSOLE = '''#!{python}
+"""Fake Msfconsole: a console that waits on every command (and passes `echo` to the "shell" like Msfconsole does)."""
+import sys
+import time
+
+RUNTIME = {runtime!r}
+
+for line in sys.stdin:
+    command = line.strip()
+    if not command:
+        continue
+    if command.startswith("echo "):
+        print(f"[*] exec: {{command}}")
+        print(command[5:], flush=True)
+    elif command == "version":
+        print("Framework: 6.4.0-stub", flush=True)
+    else:
+        time.sleep(RUNTIME)
+        print(f"[*] {{command}}", flush=True)
+'''
+
+
+def install_fake_tools(
+    directory: str,
+    nmap_runtime: float = 0.0,
+    msfconsole_runtime: float = 0.0,
+    nmap_output: Optional[str] = None,
+) -> str:
+    """Writes fake `nmap` and `msfconsole` executables to the given directory (to put first on the PATH).
+
+    Args:
+        directory (str): Directory to write the executables to.
+        nmap_runtime (float): Seconds each Nmap scan takes.
+        msfconsole_runtime (float): Seconds each Msfconsole command takes.
+        nmap_output (str): Path to an XML report to print instead of the generated one.
+
+    Returns:
+        str. The directory.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    tools = {
+        "nmap": NMAP.format(python=sys.executable, runtime=nmap_runtime, output=nmap_output),
+        "msfconsole": MSFCONSOLE.format(python=sys.executable, runtime=msfconsole_runtime),
+    }
+    for name, source in tools.items():
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(source)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return directory
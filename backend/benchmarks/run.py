@@ -0,0 +1,283 @@
+"""Runs injects through the HADES backend (backed by a stub LLM and fake tools) and reports how fast it worked them.
+
+Usage (from the backend directory):
+    python -m benchmarks.run --injects 20 --concurrency 4 --llm-latency 0.2 --nmap-runtime 1
+"""
+
+# Standard library imports.
+import json
+import os
+import re
+import subprocess
+import sys
+from argparse import ArgumentParser, Namespace
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from socket import socket
+from tempfile import TemporaryDirectory
+from time import monotonic, sleep
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+# Local imports.
+from .fake_tools import install_fake_tools
+from .stub_llm import StubLLM
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATTERN = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+Samples = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+
+
+def get_args() -> Namespace:
+    parser = ArgumentParser(description="Benchmark the HADES backend with a stub LLM and fake tools.")
+    parser.add_argument("--injects", type=int, default=10, help="number of injects to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="number of injects submitted at a time")
+    parser.add_argument("--targets", type=int, default=1, help="number of targets per inject")
+    parser.add_argument("--network", help="network (e.g., 10.0.0.0/28) whose hosts are discovered and tasked too")
+    parser.add_argument("--goal", default="scan", help="goal given to every target (see the task matrix)")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="seconds before the stub LLM replies")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--script", help="JSON file of replies the stub LLM gives to agents offered tools")
+    parser.add_argument("--nmap-runtime", type=float, default=0.5, help="seconds each fake Nmap scan takes")
+    parser.add_argument("--nmap-output", help="XML report the fake Nmap prints instead of the generated one")
+    parser.add_argument("--msfconsole-runtime", type=float, default=0.1, help="seconds each Msfconsole command takes")
+    parser.add_argument("--output", choices=["rabbitmq", "console"], default="rabbitmq", help="how reports are sent")
+    parser.add_argument("--port", type=int, default=0, help="port to run the backend on (0 to pick a free one)")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for each inject")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file (as JSON)")
+    return parser.parse_args()
+
+
+def get_free_port() -> int:
+    with socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, body: Optional[Dict[str, Any]] = None, timeout: float = 30) -> Tuple[int, Dict[str, str], bytes]:
+    data = None if body is None else json.dumps(body).encode()
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    try:
+        with urlopen(Request(url, data=data, headers=headers), timeout=timeout) as response:
+            return response.status, dict(response.headers), response.read()
+    except HTTPError as error:
+        return error.code, dict(error.headers), error.read()
+
+
+def start_backend(args: Namespace, directory: str, stub: StubLLM, port: int) -> subprocess.Popen:
+    """Starts the backend (with uvicorn) so it uses the stub LLM, the fake tools, and throwaway state."""
+    bin_dir = install_fake_tools(
+        os.path.join(directory, "bin"),
+        nmap_runtime=args.nmap_runtime,
+        msfconsole_runtime=args.msfconsole_runtime,
+        nmap_output=args.nmap_output,
+    )
+    env = {
+        **os.environ,
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "OPENAI_API_KEY": "sk-stub",
+        "OPENAI_BASE_URL": stub.url,
+        "OUTPUT_METHOD": args.output,
+        "INJECT_STORE_PATH": os.path.join(directory, "injects.db"),
+        "EVENT_LOG_DIR": os.path.join(directory, "events"),
+        "METASPLOIT_PAYLOAD_INDEX": os.path.join(directory, "payloads.json"),
+        "LLM_CACHE": "false",
+        "TRACE_EXPORTER": "none",
+    }
+    # RabbitMQ settings are required (even when reports only go to the console).
+    for name, value in {
+        "RABBITMQ_ADDRESS": "localhost",
+        "RABBITMQ_PASSWORD": "hades",
+        "RABBITMQ_PORT": "5672",
+        "RABBITMQ_REPORT_EXCHANGE_NAME": "hades.injects.reports",
+        "RABBITMQ_USERNAME": "hades",
+    }.items():
+        env.setdefault(name, value)
+
+    log = open(os.path.join(directory, "backend.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "hades.main:api", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def wait_until_ready(url: str, backend: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = monotonic() + timeout
+    while monotonic() < deadline:
+        if backend.poll() is not None:
+            raise RuntimeError(f"the backend exited with code {backend.returncode}")
+        try:
+            if request(f"{url}/metrics", timeout=2)[0] == 200:
+                return
+        except (URLError, ConnectionError):
+            pass
+        sleep(0.2)
+    raise RuntimeError(f"the backend was not ready within {timeout} seconds")
+
+
+def get_inject(number: int, args: Namespace) -> Dict[str, Any]:
+    targets = [
+        {"type": "machine", "address": f"10.{number // 250 % 250}.{number % 250}.{target + 1}", "goals": [args.goal]}
+        for target in range(args.targets)
+    ]
+    if args.network:
+        targets.append({"type": "network", "address": args.network, "goals": [args.goal]})
+    return {
+        "name": f"benchmark-{number}",
+        "cache": False,
+        "rules_of_engagement": {"techniques": {"allowed": ["T1046"], "prohibited": []}},
+        "systems": [{"targets": targets}],
+    }
+
+
+def run_inject(url: str, number: int, args: Namespace) -> Dict[str, Any]:
+    """Submits an inject (waiting and retrying if the backend is busy) and then, waits for it to finish.
+
+    Returns:
+        dict. The inject's final status (including when it was submitted and finished).
+
+    """
+    while True:
+        status, headers, body = request(f"{url}/", get_inject(number, args))
+        if status != 429:
+            break
+        sleep(float(headers.get("Retry-After", 1)))
+    if status != 200:
+        return {"state": "rejected", "error": body.decode(errors="replace")}
+    inject_id = json.loads(body)["id"]
+
+    deadline = monotonic() + args.timeout
+    while monotonic() < deadline:
+        status, _, body = request(f"{url}/injects/{inject_id}/status")
+        inject = json.loads(body) if status == 200 else {}
+        if inject.get("state") in ("completed", "failed"):
+            return inject
+        sleep(0.1)
+    return {"id": inject_id, "state": "timed out"}
+
+
+def get_samples(url: str) -> Samples:
+    """Returns every sample the backend's /metrics endpoint reports (keyed by metric name and labels)."""
+    samples: Samples = {}
+    for line in request(f"{url}/metrics")[2].decode().splitlines():
+        match = SAMPLE_PATTERN.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[(name, tuple(LABEL_PATTERN.findall(labels or "")))] = float(value)
+    return samples
+
+
+def get_stages(before: Samples, after: Samples) -> List[Dict[str, Any]]:
+    """Returns how many times each stage (i.e., kind of span) ran during the benchmark, failed, and how long it took."""
+    stages = defaultdict(lambda: {"count": 0.0, "errors": 0.0, "seconds": 0.0})
+    for (name, labels), value in after.items():
+        if name not in ("hades_span_duration_seconds_count", "hades_span_duration_seconds_sum"):
+            continue
+        span_labels = dict(labels)
+        stage = stages[(span_labels["span"], span_labels["name"])]
+        delta = value - before.get((name, labels), 0.0)
+        if name.endswith("_sum"):
+            stage["seconds"] += delta
+            continue
+        stage["count"] += delta
+        if span_labels["status"] == "error":
+            stage["errors"] += delta
+    return [
+        {"stage": span, "name": name, "count": int(row["count"]), "errors": int(row["errors"]),
+         "seconds": row["seconds"], "mean": row["seconds"] / row["count"]}
+        for (span, name), row in sorted(stages.items())
+        if row["count"] > 0
+    ]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def main() -> None:
+    args = get_args()
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as file:
+            script = json.load(file)
+    stub = StubLLM(latency=args.llm_latency, token_latency=args.token_latency, script=script).start()
+    port = args.port or get_free_port()
+    url = f"http://127.0.0.1:{port}"
+
+    with TemporaryDirectory(prefix="hades-benchmark-") as directory:
+        backend = start_backend(args, directory, stub, port)
+        ready = False
+        try:
+            wait_until_ready(url, backend)
+            ready = True
+            before = get_samples(url)
+            started = monotonic()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                injects = list(executor.map(lambda number: run_inject(url, number, args), range(args.injects)))
+            elapsed = monotonic() - started
+            after = get_samples(url)
+        finally:
+            backend.terminate()
+            backend.wait(timeout=30)
+            stub.stop()
+            with open(os.path.join(directory, "backend.log"), encoding="utf-8", errors="replace") as log:
+                backend_log = log.read()
+            # Show why the backend did not start (its log is deleted along with the temporary directory).
+            if not ready:
+                print(f"backend log (last lines):\n{backend_log[-4000:]}", file=sys.stderr)
+
+    completed = [inject for inject in injects if inject.get("state") == "completed"]
+    # The scheduler reports when an inject was submitted and finished (the store, when it was created and updated).
+    latencies = [
+        inject["finished"] - inject["submitted"] if "finished" in inject else inject["updated"] - inject["created"]
+        for inject in completed
+    ]
+    results = {
+        "injects": args.injects,
+        "completed": len(completed),
+        "failed": args.injects - len(completed),
+        "seconds": elapsed,
+        "injects_per_minute": len(completed) / elapsed * 60 if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "llm_requests": stub.requests,
+        "stages": get_stages(before, after),
+    }
+    # Targets fail without failing their inject so, count those too.
+    results["errors"] = sum(stage["errors"] for stage in results["stages"] if stage["stage"] == "target")
+
+    print(f"injects:     {results['completed']}/{results['injects']} completed in {elapsed:.2f}s")
+    print(f"throughput:  {results['injects_per_minute']:.2f} injects/min")
+    print(f"latency:     p50 {results['latency_p50']:.3f}s, p99 {results['latency_p99']:.3f}s")
+    print(f"llm calls:   {results['llm_requests']}")
+    print(f"errors:      {results['errors']} target(s) failed")
+    print()
+    print(f"{'stage':<12} {'name':<16} {'count':>7} {'errors':>7} {'total (s)':>10} {'mean (s)':>10}")
+    for stage in results["stages"]:
+        print(
+            f"{stage['stage']:<12} {stage['name']:<16} {stage['count']:>7} {stage['errors']:>7} "
+            f"{stage['seconds']:>10.3f} {stage['mean']:>10.4f}"
+        )
+    for inject in injects:
+        if inject.get("state") != "completed":
+            print(f"\n{inject.get('state')}: {inject.get('error')}", file=sys.stderr)
+    if results["failed"] or results["errors"]:
+        print(f"\nbackend log (last lines):\n{backend_log[-4000:]}", file=sys.stderr)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    sys.exit(1 if results["failed"] or results["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Defines a stub of an OpenAI-compatible chat completions API with scripted replies and configurable latency."""
+
+# Standard library imports.
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import Lock, Thread
+from time import sleep, time
+from typing import Any, Dict, List, Optional
+
+# Replies given (in order) to agents that are offered tools: run Nmap once and then, wrap up.
+DEFAULT_SCRIPT = [
+    {"tool": "nmap", "arguments": {"args": {"target": ["127.0.0.1"], "sV": True}}},
+    {"content": "The scan is complete and its results have been reviewed."},
+]
+
+
+def count_tokens(text: str) -> int:
+    # Roughly four characters per token (good enough for usage reports).
+    return max(len(text) // 4, 1)
+
+
+class StubLLM:
+    """Serves `/v1/chat/completions` like an OpenAI-compatible server would, without running a model.
+
+    Agents that are offered tools are given the scripted replies in order (picked by how many replies the conversation
+    already has) so, tool calls happen at the same points of every inject. Every other request is answered with text.
+
+    Args:
+        latency (float): Seconds to wait before replying (i.e., the time to the first token).
+        token_latency (float): Seconds to wait between streamed tokens.
+        script (list[dict]): Replies given to agents that are offered tools. Each is either a tool call (`tool` and
+            `arguments`) or text (`content`).
+        host (str): Address to listen on.
+        port (int): Port to listen on (0 to pick a free one).
+    """
+    def __init__(
+        self,
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        script: Optional[List[Dict[str, Any]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.script = script or DEFAULT_SCRIPT
+        self.requests = 0
+        self.__ids = count()
+        self.__lock = Lock()
+        self.server = ThreadingHTTPServer((host, port), self.__get_handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLM":
+        Thread(target=self.server.serve_forever, name="stub-llm", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_reply(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the scripted reply to a chat completion request (as an assistant message).
+
+        Returns:
+            dict.
+
+        """
+        with self.__lock:
+            self.requests += 1
+            reply_id = next(self.__ids)
+
+        tools = {tool["function"]["name"] for tool in request.get("tools", [])}
+        turn = sum(1 for message in request.get("messages", []) if message.get("role") == "assistant")
+        step = self.script[turn % len(self.script)] if tools else {"content": "Understood."}
+        if step.get("tool") in tools:
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{reply_id}",
+                    "type": "function",
+                    "function": {"name": step["tool"], "arguments": json.dumps(step.get("arguments", {}))},
+                }],
+            }
+        return {"role": "assistant", "content": step.get("content") or "Understood."}
+
+    def __get_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                return None
+
+            def do_POST(self) -> None:
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                message = stub.get_reply(request)
+                sleep(stub.latency)
+                if request.get("stream"):
+                    self.__stream(request, message)
+                else:
+                    self.__reply(request, message)
+
+            def __get_usage(self, request: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, int]:
+                prompt = count_tokens(json.dumps(request.get("messages", [])))
+                completion = count_tokens(json.dumps(message))
+                return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+            def __reply(self, request: Dict[str, Any], message: Dict[str, Any]) -> None:
+                body = json.dumps({
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                    }],
+                    "usage": self.__get_usage(request, message),
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def __stream(self, request: Dict[str, Any], message: Dict[str, Any]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+
+                def send(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> None:
+                    chunk = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                if message.get("tool_calls"):
+                    send({"role": "assistant", "tool_calls": [{"index": 0, **message["tool_calls"][0]}]})
+                    send({}, "tool_calls")
+                else:
+                    for i, word in enumerate(message["content"].split(" ")):
+                        if i > 0:
+                            sleep(stub.token_latency)
+                        send({"role": "assistant", "content": word if i == 0 else f" {word}"})
+                    send({}, "stop")
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
@@ -1,3 +1,5 @@
 from .operator import HadesOperator
 from .planner import HadesPlanner
-from .agent import HadesAgent
\ No newline at end of file
+from .agent import HadesAgent
+from .cache import LLMResponseCache
+from .factory import HadesAgentFactory
@@ -1,7 +1,9 @@
 """Defines a HADES agent."""
 
 # Standard library imports.
-from typing import Any, Dict, Union, Tuple
+from copy import copy
+from uuid import uuid4
+from typing import Any, Dict, List, Optional, Union, Tuple
 import json
 import warnings
 
@@ -12,7 +14,20 @@ from autogen.io.base import IOStream
 from autogen.oai.client import OpenAIWrapper
 
 # Local imports.
-from hades.core import get_timestamp
+from .compaction import ANSI_ESCAPE_PATTERN, compact
+from .history import HistoryManager, Summarizer
+from hades.core import (
+    get_timestamp,
+    HISTORY_RECENT_MESSAGES,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_TOKEN_BUDGETS,
+    INJECT_ID,
+    LLM_TOKENS,
+    TOOL_OUTPUT_TOKEN_BUDGET,
+    TOOL_OUTPUT_TOKEN_BUDGETS,
+    tracer,
+)
+from hades.injects import event_log
 from hades.messages.rabbitmq import RabbitMQClient
 
 
@@ -31,14 +46,40 @@ class HadesAgentIOStream(IOStream):
         if self.output_method not in self.__output_methods:
             raise ValueError("invalid output method selected")    
 
+        # Identify the agent (and the LLM reply) partial tokens belong to.
+        self.sender = None
+        self.stream_id = None
+
     def __print_to_console(self, report):
         print(report)
 
     def __publish_to_rabbitmq(self, report):
         self.rabbitmq_client.Publish(report)
 
-    def print(self, report) -> None:
-        json_report = json.dumps(report)
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        # Reports (from HADES agents) are dicts.
+        if (len(objects) == 1) and isinstance(objects[0], dict):
+            report = objects[0]
+        else:
+            # Anything else is text from Autogen (e.g., a streamed token) with terminal colors that are not needed.
+            text = ANSI_ESCAPE_PATTERN.sub("", sep.join(str(o) for o in objects))
+            if not text.strip():
+                return
+            report = {
+                "sender": self.sender,
+                "timestamp": get_timestamp(),
+            }
+            # Streamed tokens are printed without a line ending.
+            if end == "":
+                report.update({"type": "token", "stream_id": self.stream_id, "token": text})
+            else:
+                report["message"] = text
+
+        # Log every report (except streamed tokens, which the full message follows) so it can be replayed later.
+        if report.get("type") == "token":
+            json_report = json.dumps(report)
+        else:
+            json_report = event_log.append(INJECT_ID.get(), report)
         self.__output_methods[self.output_method](json_report)
 
 def __post_carryover_processing(chat_info: Dict[str, Any]) -> None:
@@ -69,25 +110,92 @@ def __post_carryover_processing(chat_info: Dict[str, Any]) -> None:
 
 chat.__post_carryover_processing = __post_carryover_processing
 
+def get_token_counts(usage_summary: Optional[Dict[str, Any]]) -> Dict[str, Tuple[int, int]]:
+    """Returns how many prompt and completion tokens each model has been sent and generated (per an Autogen client)."""
+    return {
+        model: (usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        for model, usage in (usage_summary or {}).items()
+        if isinstance(usage, dict)
+    }
+
 class HadesAgent(ConversableAgent):
     def __init__(
         self,
         output_method: str,
         rabbitmq_client: RabbitMQClient,
         *args,
+        client: Optional[OpenAIWrapper] = None,
+        summarizer: Optional[Summarizer] = None,
         **kwargs
     ):
+        # Reuse the given LLM client (instead of building a new one) if there is one.
+        self.__shared_client = client
+
         # Set the IO stream.
         self.iostream = HadesAgentIOStream(
             output_method=output_method,
             rabbitmq_client=rabbitmq_client,
         )
-        IOStream.set_default(stream=self.iostream)
-        
+
         # TODO: add comment.
         super().__init__(*args, **kwargs)
+        self.iostream.sender = self.name
+
+        # Set how many tokens of tool output the agent's LLM is given per function call.
+        llm_config = kwargs.get("llm_config") or {}
+        self.tool_output_budget = TOOL_OUTPUT_TOKEN_BUDGETS.get(llm_config.get("model"), TOOL_OUTPUT_TOKEN_BUDGET)
+
+        # Keep the history sent to the agent's LLM (and summarized at the end of a chat) under a token budget.
+        self.history = HistoryManager(
+            budget=HISTORY_TOKEN_BUDGETS.get(llm_config.get("model"), HISTORY_TOKEN_BUDGET),
+            recent=HISTORY_RECENT_MESSAGES,
+            summarize=summarizer,
+        )
+        self.register_hook("process_all_messages_before_reply", self.history.process)
 
-    def execute_function(self, func_call, call_id: str, verbose: bool = False) -> Tuple[bool, Dict[str, str]]:
+    def chat_messages_for_summary(self, agent: Agent) -> List[Dict]:
+        return self.history.process(super().chat_messages_for_summary(agent))
+
+    def _validate_llm_config(self, llm_config):
+        if (self.__shared_client is None) or (not llm_config):
+            return super()._validate_llm_config(llm_config)
+        self.llm_config = llm_config
+        self.client = copy(self.__shared_client)
+
+        # Count the agent's tokens on its own (the usage summaries are updated in place so, they cannot be shared).
+        self.client.clear_usage_summary()
+
+        # Apply the agent's own settings (e.g., the caller to tag requests with or the response cache) to its client.
+        overrides = {key: llm_config[key] for key in ("cache", "user") if key in llm_config}
+        if overrides:
+            self.client._config_list = [{**config, **overrides} for config in self.client._config_list]
+
+    def _generate_oai_reply_from_client(self, llm_client, messages, cache) -> Union[str, Dict, None]:
+        # Send the reply's tokens (if the LLM config asks for them to be streamed) through this agent's IO stream.
+        self.iostream.stream_id = str(uuid4())
+        before = get_token_counts(llm_client.actual_usage_summary)
+        with tracer.span("llm_call", agent=self.name, model=self.llm_config.get("model")) as span:
+            with IOStream.set_default(self.iostream):
+                reply = super()._generate_oai_reply_from_client(llm_client, messages, cache)
+
+            # Count the tokens the LLM was actually sent and generated (i.e., not those of cached replies).
+            prompt_tokens, completion_tokens = 0, 0
+            for model, (prompt, completion) in get_token_counts(llm_client.actual_usage_summary).items():
+                prompt_before, completion_before = before.get(model, (0, 0))
+                prompt_tokens += prompt - prompt_before
+                completion_tokens += completion - completion_before
+                LLM_TOKENS.inc(prompt - prompt_before, model, "prompt")
+                LLM_TOKENS.inc(completion - completion_before, model, "completion")
+            span.set_attributes(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return reply
+
+    def initiate_chat(self, recipient: "ConversableAgent", *args, **kwargs):
+        message = kwargs.get("message")
+        message = message.__name__ if callable(message) else str(message)[:80]
+        with tracer.span("chat", sender=self.name, recipient=recipient.name, message=message):
+            return super().initiate_chat(recipient, *args, **kwargs)
+
+    def execute_function(self, func_call, call_id: Optional[str] = None, verbose: bool = False) -> Tuple[bool, Dict[str, str]]:
         func_name = func_call.get("name", "")
         func = self._function_map.get(func_name, None)
 
@@ -103,14 +211,32 @@ class HadesAgent(ConversableAgent):
 
             # Try to execute the function
             if arguments is not None:
-                try:
-                    content = func(**arguments)
-                    is_exec_success = True
-                except Exception as e:
-                    content = f"Error: {e}"
+                with tracer.span("tool_call", agent=self.name, tool=func_name) as span:
+                    try:
+                        # Send what the tool reports while it runs (e.g., each finished Nmap shard) through this
+                        # agent's IO stream.
+                        with IOStream.set_default(self.iostream):
+                            content = func(**arguments)
+                        is_exec_success = True
+                    except Exception as e:
+                        content = f"Error: {e}"
+                    span.set_attributes(success=is_exec_success, output_bytes=len(str(content)))
         else:
             content = f"Error: Function {func_name} not found."
 
+        # Report the full output (the LLM only sees it compacted) and then, compact it so it fits in the LLM's prompt.
+        content = str(content)
+        self.iostream.print({
+            "type": "tool_output",
+            "sender": self.name,
+            "name": func_name,
+            "call_id": call_id,
+            "timestamp": get_timestamp(),
+            "content": content,
+        })
+        if is_exec_success:
+            content = compact(func_name, content, self.tool_output_budget)
+
         return is_exec_success, {
             "name": func_name,
             "role": "function",
@@ -141,6 +267,11 @@ class HadesAgent(ConversableAgent):
                 id_key = "tool_call_id"
             id = message.get(id_key, "No id found")
         else:
+            # Tie the message to the tokens the sender's LLM streamed while writing it (so clients can swap them).
+            sender_iostream = getattr(sender, "iostream", None)
+            if getattr(sender_iostream, "stream_id", None) is not None:
+                output["stream_id"], sender_iostream.stream_id = sender_iostream.stream_id, None
+
             content = message.get("content")
 
             if content is not None:
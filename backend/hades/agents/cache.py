@@ -0,0 +1,75 @@
+"""Defines a disk-backed cache of LLM responses."""
+
+# Standard library imports.
+import json
+from hashlib import sha256
+from types import TracebackType
+from typing import Any, Dict, Optional, Type
+
+# Third-party imports.
+from diskcache import Cache
+
+# Request parameters that do not change what the LLM replies with.
+IGNORED_PARAMETERS = ["stream", "timeout", "user"]
+
+
+def normalize_key(key: str) -> str:
+    """Returns a stable hash of the request Autogen keyed its cache lookup with.
+
+    The key is Autogen's JSON dump of the request parameters (i.e., the model, messages, tools, and sampling parameters).
+    Parameters that do not affect the reply are dropped and whitespace around message content is trimmed, so the same
+    conversation is found again regardless of which inject (or how) it was sent.
+
+    Returns:
+        str.
+
+    """
+    try:
+        parameters: Dict[str, Any] = json.loads(key)
+    except json.JSONDecodeError:
+        return sha256(key.encode()).hexdigest()
+    for parameter in IGNORED_PARAMETERS:
+        parameters.pop(parameter, None)
+    for message in parameters.get("messages", []):
+        if isinstance(message.get("content"), str):
+            message["content"] = message["content"].strip()
+    return sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """Caches LLM responses on disk, evicting the least recently used ones once the cache reaches its size limit.
+
+    Implements Autogen's cache protocol so it can be given to agents via the `cache` key of their LLM config. The same
+    instance is shared by every agent (and is safe to use from several threads and processes).
+
+    Args:
+        directory (str): Directory the cache is stored in.
+        size_limit (int): Maximum size of the cache (in bytes).
+    """
+    def __init__(self, directory: str, size_limit: int):
+        self.cache = Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+
+    def get(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        return self.cache.get(normalize_key(key), default)
+
+    def set(self, key: str, value: Any) -> None:
+        self.cache.set(normalize_key(key), value)
+
+    def close(self) -> None:
+        self.cache.close()
+
+    def __enter__(self) -> "LLMResponseCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        # Autogen enters the cache around every lookup so, it is left open to be reused.
+        return None
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LLMResponseCache":
+        # Agents deep copy their LLM config, which should keep pointing at the same cache.
+        return self
@@ -0,0 +1,138 @@
+"""Defines how tool output is compacted before it is added to an LLM prompt."""
+
+# Standard library imports.
+import re
+from typing import Callable, Dict, List
+
+# Third-party imports.
+try:
+    from tiktoken import get_encoding
+    _encoding = get_encoding("cl100k_base")
+except Exception:
+    # Fall back to a rough estimate if tiktoken (or its encoding files) is unavailable.
+    _encoding = None
+
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+MSFCONSOLE_BANNER_PATTERNS = [
+    re.compile(r"^\s*=\[ metasploit v"),
+    re.compile(r"^\s*\+ -- --=\["),
+    re.compile(r"^\s*Metasploit tip:"),
+    re.compile(r"^\s*Metasploit Documentation:"),
+]
+
+
+def count_tokens(text: str) -> int:
+    """Returns the number of tokens in the text given (or an estimate if tiktoken is unavailable)."""
+    if _encoding is None:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def strip_ansi(lines: List[str]) -> List[str]:
+    return [ANSI_ESCAPE_PATTERN.sub("", line).rstrip() for line in lines]
+
+
+def drop_blank_runs(lines: List[str]) -> List[str]:
+    """Collapses consecutive blank lines into one."""
+    reduced = []
+    for line in lines:
+        if line.strip() or (reduced and reduced[-1].strip()):
+            reduced.append(line)
+    return reduced
+
+
+def split_long_lines(lines: List[str], width: int = 200) -> List[str]:
+    """Splits very long lines (e.g., serialized JSON) so they can be truncated like any other output."""
+    return [line[i:i + width] for line in lines for i in range(0, max(len(line), 1), width)]
+
+
+def dedupe_lines(lines: List[str]) -> List[str]:
+    """Collapses consecutive repeated lines into one line and a count."""
+    reduced, previous, repeats = [], None, 0
+    for line in lines + [None]:
+        if line == previous:
+            repeats += 1
+            continue
+        if repeats > 0:
+            reduced.append(f"[previous line repeated {repeats} more times]")
+        if line is not None:
+            reduced.append(line)
+        previous, repeats = line, 0
+    return reduced
+
+
+def drop_msfconsole_banners(lines: List[str]) -> List[str]:
+    return [line for line in lines if not any(pattern.search(line) for pattern in MSFCONSOLE_BANNER_PATTERNS)]
+
+
+def is_table_line(line: str) -> bool:
+    """Returns True if the line looks like part of a table (e.g., columns separated by runs of spaces or dashes)."""
+    stripped = line.strip()
+    return bool(stripped) and (set(stripped) <= set("-= ") or len(re.findall(r"\S\s{2,}\S", stripped)) >= 2)
+
+
+def truncate_lines(lines: List[str], budget: int) -> List[str]:
+    """Keeps as many lines as fit in the token budget, preferring tables, then the start and end of the output."""
+    if count_tokens("\n".join(lines)) <= budget:
+        return lines
+
+    # Leave room for the markers noting where lines were omitted.
+    budget = int(budget * 0.9)
+
+    # Tables hold the results (e.g., options, sessions, or payloads) so, they are kept first.
+    costs = [count_tokens(line) + 1 for line in lines]
+    keep, spent = set(), 0
+    for index in [i for i, line in enumerate(lines) if is_table_line(line)]:
+        if spent + costs[index] > budget // 2:
+            break
+        keep.add(index)
+        spent += costs[index]
+
+    # Then, alternate between the start and the end of the output.
+    head, tail, from_head = 0, len(lines) - 1, True
+    while head <= tail:
+        index = head if from_head else tail
+        if index not in keep:
+            if spent + costs[index] > budget:
+                break
+            keep.add(index)
+            spent += costs[index]
+        if from_head:
+            head += 1
+        else:
+            tail -= 1
+        from_head = not from_head
+
+    reduced, omitted = [], 0
+    for index, line in enumerate(lines):
+        if index in keep:
+            if omitted > 0:
+                reduced.append(f"[... {omitted} lines omitted ...]")
+                omitted = 0
+            reduced.append(line)
+        else:
+            omitted += 1
+    if omitted > 0:
+        reduced.append(f"[... {omitted} lines omitted ...]")
+    return reduced
+
+
+# Reducers applied (in order) to each tool's output before it is truncated to fit the token budget.
+REDUCERS: Dict[str, List[Callable[[List[str]], List[str]]]] = {
+    "msfconsole": [strip_ansi, drop_msfconsole_banners, drop_blank_runs, dedupe_lines],
+    "nmap": [strip_ansi, drop_blank_runs, dedupe_lines],
+}
+DEFAULT_REDUCERS = [strip_ansi, drop_blank_runs, dedupe_lines]
+
+
+def compact(tool_name: str, output: str, budget: int) -> str:
+    """Reduces the given tool output so it fits within the given number of tokens.
+
+    Returns:
+        str.
+
+    """
+    lines = output.splitlines()
+    for reducer in REDUCERS.get(tool_name, DEFAULT_REDUCERS):
+        lines = reducer(lines)
+    return "\n".join(truncate_lines(split_long_lines(lines), budget))
@@ -0,0 +1,184 @@
+"""Defines a factory that builds HADES agents from a config prepared once."""
+
+# Standard library imports.
+import functools
+from logging import Logger
+from os import environ
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Third-party imports.
+from autogen import filter_config
+from autogen.function_utils import get_function_schema, load_basemodels_if_needed, serialize_to_str
+from autogen.oai.client import OpenAIWrapper
+
+# Local imports.
+from .cache import LLMResponseCache
+from .history import LLMSummarizer, Summarizer
+from .operator import HadesOperator
+from .planner import HadesPlanner
+from hades.core import HISTORY_SUMMARIZER, INJECT_ID, LLM_STREAM
+from hades.messages.rabbitmq import RabbitMQClient
+
+
+def wrap_tool(tool: Callable) -> Callable:
+    """Wraps a tool so its pydantic arguments are loaded and its return value is serialized (like autogen does).
+
+    Returns:
+        Callable.
+
+    """
+    @load_basemodels_if_needed
+    @functools.wraps(tool)
+    def _wrapped_tool(*args, **kwargs):
+        return serialize_to_str(tool(*args, **kwargs))
+
+    return _wrapped_tool
+
+
+class HadesAgentFactory:
+    """Builds HADES planners and operators without redoing the work every agent shares.
+
+    The LLM config, the tool schemas (the planner's view of each tool), the function map (the operator's), and the LLM
+    clients are prepared once. Each new agent gets its own copy of the config and a shallow copy of the client (so its
+    usage summary is its own) that reuses the same HTTP connections.
+
+    Args:
+        logger (Logger): Logger used to report what the factory is doing.
+        llm_tag (str): Tag of the LLM the agents should use.
+        tools (List[Callable]): Functions the planner can call and the operator can execute.
+        cache (LLMResponseCache): Cache of LLM responses agents may reuse (None disables caching).
+    """
+    def __init__(
+        self,
+        logger: Logger,
+        llm_tag: str,
+        tools: List[Callable],
+        cache: Optional[LLMResponseCache] = None,
+    ):
+        self.logger = logger
+        self.cache = cache
+
+        # Parse the LLM config provided.
+        self.llm_config = {**self.__get_llm_config(llm_tag)[0], "stream": LLM_STREAM}
+        self.logger.debug(f"using the '{self.llm_config['model']}' LLM")
+
+        # Generate each tool's schema (and wrap each tool) once.
+        self.tool_schemas: List[Dict[str, Any]] = []
+        self.function_map: Dict[str, Callable] = {}
+        for tool in tools:
+            self.logger.debug(f"registering '{tool.__name__}' as a tool for HADES agents to use")
+            self.tool_schemas.append(get_function_schema(tool, name=tool.__name__, description=tool.__doc__))
+            self.function_map[tool.__name__] = wrap_tool(tool)
+
+        # Init the LLM clients every agent shares.
+        self.planner_llm_config = {**self.llm_config, "tools": self.tool_schemas}
+        self.planner_client = OpenAIWrapper(**self.planner_llm_config)
+        self.operator_client = OpenAIWrapper(**self.llm_config)
+
+        # Init what folds old messages into the summaries that keep each agent's history under its token budget.
+        self.summarizer = self.__get_summarizer(HISTORY_SUMMARIZER)
+
+    def __get_summarizer(self, summarizer: str) -> Optional[Summarizer]:
+        """Returns what summarizes agent histories ("llm" for the agents' LLM, "local" for the local LLM, or "none").
+
+        Returns:
+            Summarizer.
+
+        """
+        match summarizer:
+            case "llm":
+                # Use a client of its own (so its tokens are not also counted as those of the agents sharing one).
+                return LLMSummarizer(client=OpenAIWrapper(**self.llm_config), model=self.llm_config["model"])
+            case "local":
+                llm_config = self.__get_llm_config("local")[0]
+                self.logger.debug(f"summarizing agent histories with the '{llm_config['model']}' LLM")
+                return LLMSummarizer(client=OpenAIWrapper(**llm_config), model=llm_config["model"])
+            case "none":
+                return None
+            case _:
+                raise ValueError("invalid history summarizer option")
+
+    def __get_api_key(self, llm_tag: str) -> Optional[str]:
+        """Returns the API key that corresponds with the LLM tag given.
+
+        Returns:
+            str.
+
+        """
+        match llm_tag:
+            case "openai":
+                if "OPENAI_API_KEY" not in environ:
+                    raise RuntimeError("the 'OPENAI_API_KEY' environment variable is not set")
+                self.logger.debug("the 'OPENAI_API_KEY' environment variable is set")
+                return environ["OPENAI_API_KEY"]
+            case _:
+                return None
+
+    def __get_llm_config(self, llm_tag: str) -> List[Dict[str, Any]]:
+        """Returns the LLM config that corresponds with the LLM tag given.
+
+        Returns:
+            list[dict[str, Any]].
+
+        """
+        if llm_tag in ["openai", "gpt4-0"]:
+            api_key = self.__get_api_key(llm_tag)
+        else:
+            api_key = None
+        return filter_config(
+            config_list=[
+                {
+                    "tags": ["openai", "gpt-4o"],
+                    "model": "gpt-4o",
+                    "api_key": api_key,
+                    "cache_seed": None,
+                },
+                {
+                    "tags": ["local", "mistral-7b"],
+                    "model": "mistral-7b-instruct-v0.2.Q6_K.gguf",
+                    "api_key": None,
+                    "cache_seed": None,
+                    "api_type": "openai",
+                    "base_url": "http://llm-server:9999/v1",
+                    "timeout": 120,
+                },
+            ],
+            filter_dict={"tags": [llm_tag]}
+        )
+
+    def new_agents(
+        self,
+        output_method: str,
+        rabbitmq_client: Optional[RabbitMQClient],
+        use_cache: bool = True,
+    ) -> Tuple[HadesPlanner, HadesOperator]:
+        """Returns a new HADES planner and operator (with tools registered) to work a single target.
+
+        Args:
+            use_cache. False if the agents must not reuse cached LLM responses (e.g., the inject opted out).
+
+        Returns:
+            tuple[HadesPlanner, HadesOperator].
+
+        """
+        # Identify the inject as the caller so, the LLM server can take turns between injects.
+        caller = {"user": INJECT_ID.get()}
+        if use_cache and (self.cache is not None):
+            caller["cache"] = self.cache
+
+        planner = HadesPlanner(
+            output_method=output_method,
+            llm_config={**self.planner_llm_config, **caller},
+            rabbitmq_client=rabbitmq_client,
+            client=self.planner_client,
+            summarizer=self.summarizer,
+        )
+        operator = HadesOperator(
+            output_method=output_method,
+            llm_config={**self.llm_config, **caller},
+            rabbitmq_client=rabbitmq_client,
+            client=self.operator_client,
+            summarizer=self.summarizer,
+        )
+        operator.register_function(dict(self.function_map))
+        return planner, operator
@@ -0,0 +1,217 @@
+"""Defines how an agent's conversation history is kept under a token budget before it is sent to an LLM."""
+
+# Standard library imports.
+import json
+import re
+from hashlib import sha256
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+# Third-party imports.
+from autogen.oai.client import OpenAIWrapper
+
+# Local imports.
+from .compaction import count_tokens
+from hades.core import INJECT_ID, LLM_TOKENS, tracer
+from hades.knowledge import knowledge_store
+
+IPV4_PATTERN = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a penetration test conversation. Merge the new messages into the summary. "
+    "Keep every target, open port, service version, vulnerability, exploit, payload, and result (including failures) "
+    "but, drop raw tool output and pleasantries. Reply with the summary only, in at most 200 words."
+)
+
+# Summarizers are given the summary so far (empty at first) and the messages to fold into it.
+Summarizer = Callable[[str, List[Dict[str, Any]]], str]
+
+
+def count_message_tokens(message: Dict[str, Any]) -> int:
+    """Returns the (approximate) number of tokens a message adds to a prompt."""
+    tokens = 4 + count_tokens(str(message.get("content") or ""))
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        tokens += count_tokens(function.get("name", "")) + count_tokens(function.get("arguments", ""))
+    return tokens
+
+
+def get_tool_arguments(tool_call: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the arguments of a tool call (unwrapped from the "args" model every HADES tool takes)."""
+    try:
+        arguments = json.loads(tool_call.get("function", {}).get("arguments") or "{}")
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(arguments, dict):
+        return {}
+    return arguments["args"] if isinstance(arguments.get("args"), dict) else arguments
+
+
+def render_message(message: Dict[str, Any], width: int = 300) -> str:
+    """Returns a message as one line of text (e.g., for a summary)."""
+    parts = []
+    content = str(message.get("content") or "").strip()
+    if content:
+        content = " ".join(content.split())
+        parts.append(content if len(content) <= width else f"{content[:width]}...")
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        parts.append(f"called {function.get('name')}({json.dumps(get_tool_arguments(tool_call), sort_keys=True)})")
+    return f"{message.get('name') or message.get('role', 'unknown')}: {'; '.join(parts) or '(no content)'}"
+
+
+def summarize_extractively(summary: str, messages: List[Dict[str, Any]]) -> str:
+    """Folds messages into a summary by appending one (shortened) line per message."""
+    lines = [summary] if summary else []
+    return "\n".join(lines + [render_message(message) for message in messages])
+
+
+class LLMSummarizer:
+    """Folds messages into a summary using an LLM (e.g., the cheaper local model instead of the agents' own).
+
+    Args:
+        client (OpenAIWrapper): Client of the LLM that writes the summaries.
+        model (str): Name of the LLM (used to label its spans and token counts).
+    """
+    def __init__(self, client: OpenAIWrapper, model: str):
+        self.client = client
+        self.model = model
+
+    def __call__(self, summary: str, messages: List[Dict[str, Any]]) -> str:
+        conversation = "\n".join(render_message(message, width=2000) for message in messages)
+        with tracer.span("llm_call", agent="history", model=self.model) as span:
+            response = self.client.create(
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew messages:\n{conversation}"},
+                ],
+                stream=False,
+                user=INJECT_ID.get(),
+            )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_TOKENS.inc(usage.prompt_tokens, self.model, "prompt")
+                LLM_TOKENS.inc(usage.completion_tokens, self.model, "completion")
+                span.set_attributes(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        text = self.client.extract_text_or_completion_object(response)[0]
+        return text if isinstance(text, str) and text.strip() else summarize_extractively(summary, messages)
+
+
+class HistoryManager:
+    """Keeps the messages an agent sends to its LLM under a token budget.
+
+    The first message (the task, including what earlier tasks found) and the most recent messages are kept verbatim.
+    Once the conversation no longer fits, older messages are folded into a rolling summary (only messages that were
+    not folded before are summarized) and key facts (e.g., open ports and the exploit chosen) are pinned next to it so,
+    they survive however many turns are summarized. Messages are never split from the tool calls they answer.
+
+    Args:
+        budget (int): Maximum number of tokens of history sent to the LLM.
+        recent (int): Number of recent messages kept verbatim (fewer if they do not fit in the budget).
+        summarize (Summarizer): Folds messages into the summary (None to shorten and append them instead).
+    """
+    def __init__(self, budget: int, recent: int, summarize: Optional[Summarizer] = None):
+        self.budget = budget
+        self.recent = recent
+        self.summarize = summarize
+        self.__conversations: Dict[str, Dict[str, Any]] = {}
+        self.__lock = Lock()
+
+    def process(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Returns the messages to send to the LLM (used as an Autogen "process_all_messages_before_reply" hook)."""
+        if (len(messages) < 3) or (sum(count_message_tokens(message) for message in messages) <= self.budget):
+            return messages
+        head, rest = messages[0], messages[1:]
+
+        # Keep the most recent messages (starting the kept ones at a message the conversation could resume from).
+        role = head.get("role")
+        start = self.__find_boundary(rest, max(len(rest) - self.recent, 0), role, step=-1)
+        if start is None or start == 0:
+            return messages
+
+        # Keep fewer recent messages if they alone exceed the budget.
+        kept_tokens = sum(count_message_tokens(message) for message in rest[start:])
+        budget = self.budget - count_message_tokens(head)
+        while kept_tokens > budget * 0.75:
+            later = self.__find_boundary(rest, start + 1, role, step=1)
+            if later is None:
+                break
+            kept_tokens -= sum(count_message_tokens(message) for message in rest[start:later])
+            start = later
+
+        summary = self.__fold(head, rest[:start])
+        facts = self.__get_facts(messages)
+        preamble = f"Summary of the conversation so far:\n{summary}"
+        if facts:
+            preamble = "Known facts:\n" + "\n".join(f"- {fact}" for fact in facts) + f"\n\n{preamble}"
+
+        # Add the summary to the first message (instead of adding a message) so the roles still alternate.
+        content = head.get("content")
+        head = {**head, "content": f"{content}\n\n{preamble}" if isinstance(content, str) else preamble}
+        return [head] + rest[start:]
+
+    def __find_boundary(self, messages: List[Dict[str, Any]], index: int, role: str, step: int) -> Optional[int]:
+        # Return the nearest message (from the index, in the direction given) that neither answers a tool call nor has
+        # the same role as the first message (which the kept messages follow).
+        while 0 <= index < len(messages):
+            if messages[index].get("role") not in ("tool", "function", role):
+                return index
+            index += step
+        return None
+
+    def __fold(self, head: Dict[str, Any], messages: List[Dict[str, Any]]) -> str:
+        # Summarize only the messages that were not folded into the conversation's summary already.
+        key = sha256(str(head.get("content")).encode()).hexdigest()
+        with self.__lock:
+            state = self.__conversations.setdefault(key, {"summary": "", "folded": 0})
+        if state["folded"] > len(messages):
+            state.update(summary="", folded=0)
+        unfolded = messages[state["folded"]:]
+        if unfolded:
+            summary = None
+            if self.summarize is not None:
+                try:
+                    summary = self.summarize(state["summary"], unfolded)
+                except Exception:
+                    # Fall back to the extractive summary (a reply is more important than a well written summary).
+                    summary = None
+            if summary is None:
+                summary = summarize_extractively(state["summary"], unfolded)
+                # Keep the extractive summary's most recent lines (the rest of the budget goes to recent messages).
+                lines = summary.split("\n")
+                while len(lines) > 1 and count_tokens("\n".join(lines)) > self.budget // 4:
+                    lines.pop(0)
+                summary = "\n".join(lines)
+            state.update(summary=summary, folded=len(messages))
+        return state["summary"]
+
+    def __get_facts(self, messages: List[Dict[str, Any]]) -> List[str]:
+        # Pin what is known about the targets discussed and the exploits and payloads chosen so far.
+        facts: List[str] = []
+        addresses = IPV4_PATTERN.findall(str(messages[0].get("content") or ""))
+        for message in messages:
+            for tool_call in message.get("tool_calls") or []:
+                arguments = get_tool_arguments(tool_call)
+                targets = arguments.get("target") or arguments.get("rhosts") or []
+                for target in [targets] if isinstance(targets, str) else targets:
+                    addresses += [address.strip() for address in str(target).split(",") if address.strip()]
+                for key in ("exploit", "payload"):
+                    if arguments.get(key):
+                        fact = f"{key} chosen: {arguments[key]}"
+                        facts = [f for f in facts if not f.startswith(f"{key} chosen:")] + [fact]
+
+        inject_id = INJECT_ID.get()
+        for address in dict.fromkeys(addresses):
+            known = knowledge_store.get(inject_id, address)
+            if known is None:
+                continue
+            ports = [
+                f"{port['port']}/{port['protocol']}"
+                + "".join(f" {port[field]}" for field in ("service", "product", "version") if port.get(field))
+                for port in known.open_ports()
+            ]
+            if ports:
+                facts.append(f"open ports on {known.address}: {', '.join(ports)}")
+            if known.os:
+                facts.append(f"operating system of {known.address}: {known.os[0]}")
+            facts += [f"{key} ({known.address}): {value}" for key, (value, _) in known.notes.items()]
+        return facts
@@ -1,10 +1,14 @@
 """Defines a HADES Operator."""
 
 # Standard library imports.
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+# Third-party imports.
+from autogen.oai.client import OpenAIWrapper
 
 # Local imports.
 from .agent import HadesAgent
+from .history import Summarizer
 from hades.messages.rabbitmq import RabbitMQClient
 
 
@@ -14,7 +18,9 @@ class HadesOperator(HadesAgent):
         output_method: str,
         rabbitmq_client: RabbitMQClient,
         llm_config: Dict[str, Any],
-        name: str = "HADES-Operator"
+        name: str = "HADES-Operator",
+        client: Optional[OpenAIWrapper] = None,
+        summarizer: Optional[Summarizer] = None,
     ):
         super().__init__(
             output_method=output_method,
@@ -23,4 +29,6 @@ class HadesOperator(HadesAgent):
             system_message="You are a penetration tester. Be concise and do not format your responses using Markdown, etc.",
             llm_config=llm_config,
             human_input_mode="NEVER",
+            client=client,
+            summarizer=summarizer,
         )
@@ -1,10 +1,14 @@
 """Defines a HADES Planner."""
 
 # Standard library imports.
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+# Third-party imports.
+from autogen.oai.client import OpenAIWrapper
 
 # Local imports.
 from .agent import HadesAgent
+from .history import Summarizer
 from hades.messages.rabbitmq import RabbitMQClient
 
 
@@ -15,6 +19,8 @@ class HadesPlanner(HadesAgent):
         llm_config: Dict[str, Any],
         rabbitmq_client: RabbitMQClient,
         name: str = "HADES-Planner",
+        client: Optional[OpenAIWrapper] = None,
+        summarizer: Optional[Summarizer] = None,
     ):
         super().__init__(
             output_method=output_method,
@@ -23,4 +29,6 @@ class HadesPlanner(HadesAgent):
             system_message="You are a penetration testing planner. Be concise and do not format your responses using Markdown, etc.",
             llm_config=llm_config,
             human_input_mode="NEVER",
+            client=client,
+            summarizer=summarizer,
         )
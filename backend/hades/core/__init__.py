@@ -1,12 +1,56 @@
 from .constants import (
     BANNER,
+    EVENT_LOG_DIR,
+    EVENT_LOG_SEGMENT_BYTES,
+    FANOUT_QUEUE_SIZE,
+    FANOUT_REPLAY_SIZE,
+    HISTORY_RECENT_MESSAGES,
+    HISTORY_SUMMARIZER,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_TOKEN_BUDGETS,
+    INJECT_QUEUE_SIZE,
+    INJECT_STATUS_TTL,
+    INJECT_STORE_PATH,
+    INJECT_WORKERS,
+    KNOWLEDGE_TTL,
+    LLM_CACHE,
+    LLM_CACHE_DIR,
+    LLM_CACHE_SIZE,
+    LLM_STREAM,
     LLM_TAGS,
+    LOG_LEVEL,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLE_RATE,
+    MSFCONSOLE_BOOT_TIMEOUT,
+    MSFCONSOLE_COMMAND_TIMEOUT,
+    MSFCONSOLE_POOL_SIZE,
+    NMAP_MAX_SHARDS,
+    NMAP_PARALLELISM,
+    NMAP_SHARD_HOSTS,
+    NMAP_SHARD_PORTS,
+    OTEL_EXPORTER_OTLP_ENDPOINT,
+    OUTPUT_METHOD,
     RABBITMQ_ADDRESS,
     RABBITMQ_REPORT_EXCHANGE_NAME,
     RABBITMQ_PASSWORD,
+    RABBITMQ_POOL_SIZE,
     RABBITMQ_PORT,
     RABBITMQ_USERNAME,
-    USER_PROXY_AGENT_NAME
+    REPORT_BATCH_INTERVAL,
+    REPORT_BATCH_SIZE,
+    REPORT_QUEUE_SIZE,
+    TARGET_PARALLELISM,
+    TASK_PARALLELISM,
+    TOOL_MAX_OUTPUT_BYTES,
+    TOOL_OUTPUT_TOKEN_BUDGET,
+    TOOL_OUTPUT_TOKEN_BUDGETS,
+    TOOL_TIMEOUT,
+    TRACE_EXPORTER,
+    TRACE_FILE
 )
+from .context import INJECT_ID
 from .logging import get_logger
+from .metrics import BROKER_LATENCY, LLM_TOKENS, metrics
+from .processes import CommandResult, run_command, run_command_async
 from .timestamps import get_timestamp
+from .tracing import tracer
@@ -1,7 +1,8 @@
 """Defines constants."""
 
 # Standard library imports.
-from os import environ
+from json import loads
+from os import environ, path
 
 
 BANNER="""
@@ -15,10 +16,56 @@ BANNER="""
 
 Harnessing AI to Disrupt and Evaluate Security (HADES)
 """
+EVENT_LOG_DIR=environ.get("EVENT_LOG_DIR", path.join(path.expanduser("~"), ".local", "share", "hades", "events"))
+EVENT_LOG_SEGMENT_BYTES=int(environ.get("EVENT_LOG_SEGMENT_BYTES", 4 << 20))
+FANOUT_QUEUE_SIZE=int(environ.get("FANOUT_QUEUE_SIZE", 256))
+FANOUT_REPLAY_SIZE=int(environ.get("FANOUT_REPLAY_SIZE", 100))
+HISTORY_RECENT_MESSAGES=int(environ.get("HISTORY_RECENT_MESSAGES", 6))
+HISTORY_SUMMARIZER=environ.get("HISTORY_SUMMARIZER", "llm")
+HISTORY_TOKEN_BUDGET=int(environ.get("HISTORY_TOKEN_BUDGET", 8000))
+HISTORY_TOKEN_BUDGETS=loads(environ.get(
+    "HISTORY_TOKEN_BUDGETS",
+    '{"gpt-4o": 16000, "mistral-7b-instruct-v0.2.Q6_K.gguf": 3000}',
+))
+INJECT_QUEUE_SIZE=int(environ.get("INJECT_QUEUE_SIZE", 32))
+INJECT_STATUS_TTL=float(environ.get("INJECT_STATUS_TTL", 3600))
+INJECT_STORE_PATH=environ.get("INJECT_STORE_PATH", path.join(path.expanduser("~"), ".local", "share", "hades", "injects.db"))
+INJECT_WORKERS=int(environ.get("INJECT_WORKERS", 4))
+KNOWLEDGE_TTL=float(environ.get("KNOWLEDGE_TTL", 1800))
+LLM_CACHE=environ.get("LLM_CACHE", "false").lower() == "true"
+LLM_CACHE_DIR=environ.get("LLM_CACHE_DIR", path.join(path.expanduser("~"), ".cache", "hades", "llm"))
+LLM_CACHE_SIZE=int(environ.get("LLM_CACHE_SIZE", 1 << 30))
+LLM_STREAM=environ.get("LLM_STREAM", "true").lower() == "true"
 LLM_TAGS=["openai", "gpt-4o", "local", "mistral-7b"]
+LOG_LEVEL=environ.get("LOG_LEVEL", "DEBUG")
+LOG_QUEUE_SIZE=int(environ.get("LOG_QUEUE_SIZE", 10000))
+LOG_SAMPLE_RATE=float(environ.get("LOG_SAMPLE_RATE", 1.0))
+MSFCONSOLE_BOOT_TIMEOUT=float(environ.get("MSFCONSOLE_BOOT_TIMEOUT", 120))
+MSFCONSOLE_COMMAND_TIMEOUT=float(environ.get("MSFCONSOLE_COMMAND_TIMEOUT", 300))
+MSFCONSOLE_POOL_SIZE=int(environ.get("MSFCONSOLE_POOL_SIZE", 2))
+NMAP_MAX_SHARDS=int(environ.get("NMAP_MAX_SHARDS", 256))
+NMAP_PARALLELISM=int(environ.get("NMAP_PARALLELISM", 4))
+NMAP_SHARD_HOSTS=int(environ.get("NMAP_SHARD_HOSTS", 16))
+NMAP_SHARD_PORTS=int(environ.get("NMAP_SHARD_PORTS", 8192))
+OTEL_EXPORTER_OTLP_ENDPOINT=environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+OUTPUT_METHOD=environ.get("OUTPUT_METHOD", "rabbitmq")
 RABBITMQ_ADDRESS=environ["RABBITMQ_ADDRESS"]
 RABBITMQ_REPORT_EXCHANGE_NAME=environ["RABBITMQ_REPORT_EXCHANGE_NAME"]
 RABBITMQ_PASSWORD=environ["RABBITMQ_PASSWORD"]
+RABBITMQ_POOL_SIZE=int(environ.get("RABBITMQ_POOL_SIZE", 8))
 RABBITMQ_PORT=environ["RABBITMQ_PORT"]
 RABBITMQ_USERNAME=environ["RABBITMQ_USERNAME"]
-USER_PROXY_AGENT_NAME="victor"
+REPORT_BATCH_INTERVAL=float(environ.get("REPORT_BATCH_INTERVAL", 0.05))
+REPORT_BATCH_SIZE=int(environ.get("REPORT_BATCH_SIZE", 100))
+REPORT_QUEUE_SIZE=int(environ.get("REPORT_QUEUE_SIZE", 10000))
+TARGET_PARALLELISM=int(environ.get("TARGET_PARALLELISM", 4))
+TASK_PARALLELISM=int(environ.get("TASK_PARALLELISM", 3))
+TOOL_MAX_OUTPUT_BYTES=int(environ.get("TOOL_MAX_OUTPUT_BYTES", 1048576))
+TOOL_OUTPUT_TOKEN_BUDGET=int(environ.get("TOOL_OUTPUT_TOKEN_BUDGET", 2000))
+TOOL_OUTPUT_TOKEN_BUDGETS=loads(environ.get(
+    "TOOL_OUTPUT_TOKEN_BUDGETS",
+    '{"gpt-4o": 4000, "mistral-7b-instruct-v0.2.Q6_K.gguf": 1000}',
+))
+TOOL_TIMEOUT=float(environ.get("TOOL_TIMEOUT", 900))
+TRACE_EXPORTER=environ.get("TRACE_EXPORTER", "none")
+TRACE_FILE=environ.get("TRACE_FILE", path.join(path.expanduser("~"), ".local", "share", "hades", "traces.jsonl"))
@@ -0,0 +1,8 @@
+"""Defines context shared by the code processing an inject."""
+
+# Standard library imports.
+from contextvars import ContextVar
+
+
+# The ID of the inject being processed by the current thread (e.g., so tools can scope their state to it).
+INJECT_ID: ContextVar[str] = ContextVar("inject_id", default="default")
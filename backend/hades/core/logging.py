@@ -1,8 +1,35 @@
 """Defining logging."""
 
 # Standard library imports.
-from json import dumps
-from logging import DEBUG, Formatter, getLogger, StreamHandler
+import atexit
+from logging import DEBUG, Filter, Formatter, getLevelName, getLogger, Logger, LogRecord, StreamHandler
+from logging.handlers import QueueHandler, QueueListener
+from queue import Full, Queue
+from random import random
+from threading import Lock
+from typing import Dict
+
+# Third-party imports.
+try:
+    from orjson import dumps as _dumps
+
+    def dumps(log: dict) -> str:
+        return _dumps(log, default=str).decode()
+except ImportError:
+    # Fall back to the standard library if orjson is unavailable.
+    from json import dumps as _dumps
+
+    def dumps(log: dict) -> str:
+        return _dumps(log, default=str)
+
+# Local imports.
+from .constants import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATE
+from .metrics import metrics
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    "hades_log_records_dropped_total",
+    "Log records dropped because the log writer could not keep up.",
+)
 
 
 class JSONFormatter(Formatter):
@@ -13,18 +40,50 @@ class JSONFormatter(Formatter):
             "level": event.levelname,
             "message": event.getMessage(),
         }
+        if event.exc_text:
+            log["exception"] = event.exc_text
         return dumps(log)
-    
+
 class ConsoleFormatter(Formatter):
     def format(self, event):
         log = event.getMessage()
+        if event.exc_text:
+            log = f"{log}\n{event.exc_text}"
         return log
 
-def get_logger(name: str, format: str):
-    logger = getLogger(name)
-    logger.setLevel(level=DEBUG)
-    handler = StreamHandler()
+class SamplingFilter(Filter):
+    """Lets through a fraction of the debug records (and every record above debug)."""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: LogRecord) -> bool:
+        return (record.levelno > DEBUG) or (self.rate >= 1) or (random() < self.rate)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the log writer thread, dropping them (instead of waiting) if its queue is full."""
+    def prepare(self, record: LogRecord) -> LogRecord:
+        # Only render what cannot wait (the message's arguments may change later); the writer formats the rest.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            LOG_RECORDS_DROPPED.inc()
 
+
+# Every logger of the same format shares one queue and one writer thread (started the first time it is needed).
+_handlers: Dict[str, NonBlockingQueueHandler] = {}
+_listeners: Dict[str, QueueListener] = {}
+_lock = Lock()
+
+def get_handler(format: str) -> NonBlockingQueueHandler:
     match format:
         case "console":
             formatter = ConsoleFormatter()
@@ -33,7 +92,40 @@ def get_logger(name: str, format: str):
         case _:
             raise ValueError("invalid logging format option")
 
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    return logger
+    handler = _handlers.get(format)
+    if handler is None:
+        queue = Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(queue)
+        handler.addFilter(SamplingFilter(rate=LOG_SAMPLE_RATE))
+        writer = StreamHandler()
+        writer.setFormatter(formatter)
+        listener = QueueListener(queue, writer)
+        listener.start()
+        _handlers[format], _listeners[format] = handler, listener
+    return handler
+
+@atexit.register
+def stop_listeners() -> None:
+    # Write out whatever is still queued before the process exits.
+    with _lock:
+        for listener in _listeners.values():
+            listener.stop()
+        _listeners.clear()
+        _handlers.clear()
+
+def get_logger(name: str, format: str) -> Logger:
+    """Returns the logger with the given name, configuring it the first time it is asked for.
 
+    Records are queued and written by a background thread so, logging never waits on I/O.
+
+    Returns:
+        Logger.
+
+    """
+    logger = getLogger(name)
+    with _lock:
+        if not any(isinstance(handler, NonBlockingQueueHandler) for handler in logger.handlers):
+            logger.setLevel(level=getLevelName(LOG_LEVEL.upper()))
+            logger.addHandler(get_handler(format))
+            logger.propagate = False
+    return logger
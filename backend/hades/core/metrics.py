@@ -0,0 +1,127 @@
+"""Defines metrics exposed in the Prometheus text format."""
+
+# Standard library imports.
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Sequence, Tuple
+
+# Upper bounds (in seconds) of the latency buckets, from LLM tokens to full injects.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = [str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    """A value that only goes up (e.g., the number of tokens an LLM generated), per set of label values.
+
+    Args:
+        name (str): Name of the metric.
+        description (str): What the metric counts.
+        labels (Sequence[str]): Names of the labels the metric is broken down by.
+    """
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.__values: Dict[Tuple[str, ...], float] = {}
+        self.__lock = Lock()
+
+    def inc(self, amount: float = 1, *values: str) -> None:
+        with self.__lock:
+            self.__values[values] = self.__values.get(values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self.__lock:
+            for values, total in sorted(self.__values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    """Counts observations (e.g., how long something took) in cumulative buckets, per set of label values.
+
+    Args:
+        name (str): Name of the metric.
+        description (str): What the metric measures.
+        labels (Sequence[str]): Names of the labels the metric is broken down by.
+        buckets (Sequence[float]): Upper bounds of the buckets.
+    """
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.__series: Dict[Tuple[str, ...], List[float]] = {}
+        self.__lock = Lock()
+
+    def observe(self, value: float, *values: str) -> None:
+        with self.__lock:
+            # Each series holds a count per bucket (plus one for +Inf), the sum, and the count of observations.
+            series = self.__series.setdefault(values, [0] * (len(self.buckets) + 1) + [0.0, 0])
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.__lock:
+            for values, series in sorted(self.__series.items()):
+                cumulative = 0
+                for bound, count in zip([*self.buckets, "+Inf"], series):
+                    cumulative += count
+                    labels = format_labels((*self.labels, "le"), (*values, bound))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = format_labels(self.labels, values)
+                lines.append(f"{self.name}_sum{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric the process reports."""
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, description, labels))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text format.
+
+        Returns:
+            str.
+
+        """
+        return "\n".join(line for metric in self.metrics.values() for line in metric.render()) + "\n"
+
+
+metrics = MetricsRegistry()
+SPAN_DURATION = metrics.histogram(
+    "hades_span_duration_seconds",
+    "How long each kind of traced operation took.",
+    labels=("span", "name", "status"),
+)
+BROKER_LATENCY = metrics.histogram(
+    "hades_rabbitmq_operation_seconds",
+    "How long each operation on a pooled RabbitMQ channel (e.g., publishing a report) took.",
+)
+LLM_TOKENS = metrics.counter(
+    "hades_llm_tokens_total",
+    "Tokens sent to (prompt) and generated by (completion) each model.",
+    labels=("model", "type"),
+)
@@ -0,0 +1,183 @@
+"""Defines a shared, asyncio-based runner for the commands HADES tools execute."""
+
+# Standard library imports.
+import asyncio
+from asyncio.subprocess import PIPE
+from codecs import getincrementaldecoder
+from dataclasses import dataclass, field
+from os import killpg, path
+from signal import SIGKILL
+from threading import Lock, Thread
+from time import monotonic
+from typing import Callable, List, Optional
+
+# Local imports.
+from .tracing import tracer
+
+
+@dataclass
+class CommandResult:
+    """The outcome of running a command.
+
+    Attributes:
+        command (list[str]): The command sentence that was executed.
+        returncode (int): The command's exit status (negative if it was killed by a signal).
+        stdout (str): Everything the command wrote to stdout (up to the output limit).
+        stderr (str): Everything the command wrote to stderr (up to the output limit).
+        timed_out (bool): True if the command was killed for exceeding its deadline.
+        truncated (int): Number of bytes of output that were discarded because of the output limit.
+        duration (float): Seconds the command ran for.
+        errors (list[str]): Why the command could not be run (e.g., the executable was not found).
+    """
+    command: List[str]
+    returncode: Optional[int] = None
+    stdout: str = ""
+    stderr: str = ""
+    timed_out: bool = False
+    truncated: int = 0
+    duration: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> bool:
+        return (self.returncode == 0) and (not self.timed_out)
+
+    def describe_failure(self) -> Optional[str]:
+        """Returns a short description of why the command failed (or None if it succeeded)."""
+        if self.timed_out:
+            return f"'{self.command[0]}' did not finish within {self.duration:.0f} seconds and was killed"
+        if self.returncode != 0:
+            return f"'{self.command[0]}' exited with status {self.returncode}"
+        return None
+
+
+class _BoundedBuffer:
+    """Keeps the first `limit` bytes written to it and counts the rest."""
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.dropped = 0
+
+    def write(self, chunk: bytes) -> None:
+        room = max(self.limit - self.size, 0)
+        if room < len(chunk):
+            self.dropped += len(chunk) - room
+            chunk = chunk[:room]
+        if chunk:
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+
+    def getvalue(self) -> str:
+        return b"".join(self.chunks).decode(errors="replace")
+
+
+async def _pump(stream: asyncio.StreamReader, buffer: _BoundedBuffer, callback: Optional[Callable[[str], None]]):
+    decoder = getincrementaldecoder("utf-8")(errors="replace")
+    while chunk := await stream.read(65536):
+        buffer.write(chunk)
+        if callback is not None:
+            callback(decoder.decode(chunk))
+    if callback is not None:
+        callback(decoder.decode(b"", final=True))
+
+
+def _kill_process_group(process: asyncio.subprocess.Process) -> None:
+    try:
+        killpg(process.pid, SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def run_command_async(
+    command: List[str],
+    timeout: Optional[float] = None,
+    max_output: int = 1048576,
+    on_stdout: Optional[Callable[[str], None]] = None,
+) -> CommandResult:
+    """Runs a command in its own process group, killing the whole group if it times out or is cancelled.
+
+    Args:
+        command (list[str]): The command sentence to execute.
+        timeout (float): Seconds the command is allowed to run for (None means no deadline).
+        max_output (int): Maximum number of bytes of stdout (and of stderr) to keep.
+        on_stdout (Callable): Optional function called with each chunk of stdout as soon as it is read.
+
+    Returns:
+        CommandResult.
+
+    """
+    result = CommandResult(command=command)
+    stdout, stderr = _BoundedBuffer(max_output), _BoundedBuffer(max_output)
+    started = monotonic()
+
+    try:
+        process = await asyncio.create_subprocess_exec(*command, stdout=PIPE, stderr=PIPE, start_new_session=True)
+    except OSError as error:
+        result.returncode = 127
+        result.errors.append(str(error))
+        return result
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                _pump(process.stdout, stdout, on_stdout),
+                _pump(process.stderr, stderr, None),
+                process.wait(),
+            ),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        result.timed_out = True
+    finally:
+        # Kill the whole process group if the command timed out, was cancelled, or its output could not be handled.
+        if process.returncode is None:
+            _kill_process_group(process)
+            await process.wait()
+        result.duration = monotonic() - started
+
+    result.returncode = process.returncode
+    result.stdout = stdout.getvalue()
+    result.stderr = stderr.getvalue()
+    result.truncated = stdout.dropped + stderr.dropped
+    return result
+
+
+# Every command is driven by one background event loop so waiting on a subprocess never needs a thread of its own.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = Lock()
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            Thread(target=_loop.run_forever, name="hades-processes", daemon=True).start()
+        return _loop
+
+
+def run_command(
+    command: List[str],
+    timeout: Optional[float] = None,
+    max_output: int = 1048576,
+    on_stdout: Optional[Callable[[str], None]] = None,
+) -> CommandResult:
+    """Runs a command on the shared event loop and blocks until it finishes (see run_command_async).
+
+    Returns:
+        CommandResult.
+
+    """
+    with tracer.span("process", command=path.basename(command[0]) if command else "") as span:
+        future = asyncio.run_coroutine_threadsafe(
+            run_command_async(command, timeout=timeout, max_output=max_output, on_stdout=on_stdout),
+            _get_loop(),
+        )
+        try:
+            result = future.result()
+        except KeyboardInterrupt:
+            # Make sure the process group dies with the caller.
+            future.cancel()
+            raise
+        span.set_attributes(exit_code=result.returncode, timed_out=result.timed_out, truncated=result.truncated)
+        return result
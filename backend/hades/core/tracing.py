@@ -0,0 +1,195 @@
+"""Defines spans that time what an inject does (and where they are exported to)."""
+
+# Standard library imports.
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from queue import Empty, Queue
+from secrets import token_hex
+from threading import Lock, Thread
+from time import time_ns
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.request import Request, urlopen
+
+# Local imports.
+from .constants import OTEL_EXPORTER_OTLP_ENDPOINT, TRACE_EXPORTER, TRACE_FILE
+from .metrics import SPAN_DURATION
+
+
+class Span:
+    """A timed operation (e.g., an inject, a chat, an LLM call, or a tool call) and what it was about.
+
+    Attributes:
+        name (str): Kind of operation (e.g., "llm_call").
+        trace_id (str): ID shared by every span of the same inject.
+        span_id (str): ID of the span.
+        parent_id (str): ID of the span this one is nested in (if any).
+        attributes (dict): Facts about the operation (e.g., the target, the tool, or the exit code).
+        status (str): "ok" or "error".
+    """
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else token_hex(16)
+        self.span_id = token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start = time_ns()
+        self.end: Optional[int] = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time_ns()) - self.start) / 1e9
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Returns the span in the OTLP/JSON format."""
+        def value(v: Any) -> Dict[str, Any]:
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [{"key": k, "value": value(v)} for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error or ""} if self.status == "error" else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class FileSpanExporter:
+    """Appends finished spans to a file (one JSON document per line)."""
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self.__lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line)
+
+
+class OTLPSpanExporter:
+    """Sends finished spans (in batches, from a background thread) to an OpenTelemetry collector over OTLP/HTTP."""
+    def __init__(self, endpoint: str, batch_size: int = 256, interval: float = 2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.batch_size = batch_size
+        self.interval = interval
+        self.__spans: Queue = Queue(maxsize=batch_size * 32)
+        Thread(target=self.__send_batches, name="hades-span-exporter", daemon=True).start()
+
+    def export(self, span: Span) -> None:
+        # Drop spans instead of slowing down the inject if the collector cannot keep up.
+        if not self.__spans.full():
+            self.__spans.put_nowait(span)
+
+    def __send_batches(self) -> None:
+        while True:
+            batch: List[Span] = [self.__spans.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.__spans.get(timeout=self.interval))
+            except Empty:
+                pass
+            body = {
+                "resourceSpans": [{
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "hades"}}]},
+                    "scopeSpans": [{"scope": {"name": "hades"}, "spans": [span.to_otlp() for span in batch]}],
+                }]
+            }
+            request = Request(
+                self.url,
+                data=json.dumps(body, default=str).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                urlopen(request, timeout=10).close()
+            except OSError:
+                pass
+
+
+class Tracer:
+    """Times nested operations and hands each finished span to an exporter (and the span duration histogram).
+
+    The current span is kept in a context variable so, spans started in a thread (or task) that copied the context
+    are nested under the span that was current when the context was copied.
+
+    Args:
+        exporter: Object with an `export(span)` method (or None to only record metrics).
+    """
+    def __init__(self, exporter: Optional[Any] = None):
+        self.exporter = exporter
+        self.current: ContextVar[Optional[Span]] = ContextVar("hades_span", default=None)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Times the code run in the context as a span nested under the current one.
+
+        Returns:
+            Span.
+
+        """
+        span = Span(name, self.current.get(), attributes)
+        token = self.current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time_ns()
+            self.current.reset(token)
+            # The "name" label is whichever attribute says what the span was about (e.g., the tool or the model).
+            label = next((str(span.attributes[key]) for key in ("tool", "model", "command", "task") if key in span.attributes), "")
+            SPAN_DURATION.observe(span.duration, span.name, label, span.status)
+            if self.exporter is not None:
+                try:
+                    self.exporter.export(span)
+                except OSError:
+                    pass
+
+
+def get_exporter(kind: str) -> Optional[Any]:
+    """Returns the span exporter that corresponds with the kind given ("file", "otlp", or "none")."""
+    match kind:
+        case "file":
+            return FileSpanExporter(TRACE_FILE)
+        case "otlp":
+            return OTLPSpanExporter(OTEL_EXPORTER_OTLP_ENDPOINT)
+        case _:
+            return None
+
+
+tracer = Tracer(exporter=get_exporter(TRACE_EXPORTER))
@@ -0,0 +1,2 @@
+from .eventlog import EventLog, event_log
+from .store import InjectStore
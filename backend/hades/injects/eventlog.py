@@ -0,0 +1,162 @@
+"""Defines an append-only log of the events each inject reports."""
+
+# Standard library imports.
+import gzip
+import json
+import os
+import shutil
+from threading import Lock
+from typing import Any, Dict, IO, Iterator, List, Tuple
+
+# Local imports.
+from hades.core import EVENT_LOG_DIR, EVENT_LOG_SEGMENT_BYTES
+
+
+class EventLogWriter:
+    """Appends an inject's events to its log, one JSON document per line.
+
+    Events are numbered (their "offset") in the order they are appended. The log is split into segments named after the
+    offset of their first event so, a reader can find where any offset is without an index file. The segment being
+    written is plain text (so readers see events as soon as they are flushed); full segments are compressed.
+
+    Args:
+        directory (str): Directory the inject's segments are stored in.
+        segment_bytes (int): Size a segment may grow to before a new one is started.
+    """
+    def __init__(self, directory: str, segment_bytes: int):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Continue a log left by an earlier run (e.g., after a restart).
+        self.next_offset = 0
+        segments = list_segments(directory)
+        if segments:
+            base, path = segments[-1]
+            self.next_offset = base + sum(1 for _ in read_segment(path))
+            if not path.endswith(".gz"):
+                seal(path)
+        self.file: IO[str] = None
+        self.size = 0
+
+    def append(self, event: Dict[str, Any]) -> str:
+        """Numbers an event (by adding its offset to it) and then, appends it to the log.
+
+        Returns:
+            str. The event as it was logged (i.e., as JSON).
+
+        """
+        with self.lock:
+            if (self.file is None) or (self.size >= self.segment_bytes):
+                self.__roll()
+            event["offset"] = self.next_offset
+            line = json.dumps(event)
+            self.file.write(line + "\n")
+            self.file.flush()
+            self.size += len(line) + 1
+            self.next_offset += 1
+            return line
+
+    def __roll(self) -> None:
+        # Compress the segment being written (if any) and start a new one at the next offset.
+        self.__seal()
+        path = os.path.join(self.directory, f"{self.next_offset:012d}.log")
+        self.file, self.size = open(path, "a", encoding="utf-8"), 0
+
+    def __seal(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            seal(self.file.name)
+            self.file = None
+
+    def close(self) -> None:
+        with self.lock:
+            self.__seal()
+
+
+def seal(path: str) -> None:
+    """Compresses a segment (the compressed copy replaces it once it is complete)."""
+    with open(path, "rb") as source, gzip.open(f"{path}.gz.tmp", "wb") as destination:
+        shutil.copyfileobj(source, destination)
+    os.replace(f"{path}.gz.tmp", f"{path}.gz")
+    os.remove(path)
+
+
+def list_segments(directory: str) -> List[Tuple[int, str]]:
+    """Returns the offset of the first event in each of the segments in the given directory (and its path)."""
+    if not os.path.isdir(directory):
+        return []
+    segments = {}
+    for name in os.listdir(directory):
+        if name.endswith(".log") or name.endswith(".log.gz"):
+            base = int(name.split(".")[0])
+            # Prefer a compressed segment over the plain one it replaces.
+            if name.endswith(".gz") or (base not in segments):
+                segments[base] = os.path.join(directory, name)
+    return sorted(segments.items())
+
+
+def read_segment(path: str) -> Iterator[str]:
+    """Returns the complete events (lines) in a segment."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            # Skip an event that is still being written.
+            if line.endswith("\n"):
+                yield line[:-1]
+
+
+class EventLog:
+    """Per-inject logs of every event reported (so viewers can catch up from any offset).
+
+    Args:
+        directory (str): Directory every inject's log is stored in.
+        segment_bytes (int): Size a segment may grow to before a new one is started.
+    """
+    def __init__(self, directory: str, segment_bytes: int):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.__writers: Dict[str, EventLogWriter] = {}
+        self.__lock = Lock()
+
+    def __get_directory(self, inject_id: str) -> str:
+        return os.path.join(self.directory, os.path.basename(inject_id) or "default")
+
+    def append(self, inject_id: str, event: Dict[str, Any]) -> str:
+        """Numbers an event (by adding its offset to it) and then, appends it to an inject's log.
+
+        Returns:
+            str. The event as it was logged (i.e., as JSON).
+
+        """
+        with self.__lock:
+            writer = self.__writers.get(inject_id)
+            if writer is None:
+                writer = EventLogWriter(self.__get_directory(inject_id), self.segment_bytes)
+                self.__writers[inject_id] = writer
+        return writer.append(event)
+
+    def close(self, inject_id: str) -> None:
+        """Compresses the rest of an inject's log (e.g., once the inject ends)."""
+        with self.__lock:
+            writer = self.__writers.pop(inject_id, None)
+        if writer is not None:
+            writer.close()
+
+    def read(self, inject_id: str, offset: int = 0) -> Iterator[Tuple[int, str]]:
+        """Returns every event in an inject's log from the given offset on (and each event's offset)."""
+        segments = list_segments(self.__get_directory(inject_id))
+        for i, (base, path) in enumerate(segments):
+            # Skip segments that end before the offset.
+            if (i + 1 < len(segments)) and (segments[i + 1][0] <= offset):
+                continue
+            if not os.path.exists(path):
+                # The segment was compressed after it was listed.
+                path = f"{path}.gz"
+            for number, event in enumerate(read_segment(path), start=base):
+                if number >= offset:
+                    yield number, event
+
+
+event_log = EventLog(directory=EVENT_LOG_DIR, segment_bytes=EVENT_LOG_SEGMENT_BYTES)
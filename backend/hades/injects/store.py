@@ -0,0 +1,151 @@
+"""Defines a persistent store of injects."""
+
+# Standard library imports.
+import json
+import os
+import sqlite3
+from threading import local
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS injects (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS injects_status ON injects (status, created);
+CREATE INDEX IF NOT EXISTS injects_created ON injects (created);
+CREATE TABLE IF NOT EXISTS inject_targets (
+    inject_id TEXT NOT NULL REFERENCES injects (id) ON DELETE CASCADE,
+    address TEXT NOT NULL,
+    PRIMARY KEY (inject_id, address)
+);
+CREATE INDEX IF NOT EXISTS inject_targets_address ON inject_targets (address);
+"""
+
+
+class InjectStore:
+    """SQLite-backed store of injects (and their status) shared by every process that opens the same file.
+
+    Injects are indexed by ID, status, when they were created, and the addresses they target so, they can be listed a
+    page at a time instead of all at once.
+
+    Args:
+        path (str): Path to the database file.
+        recover (bool): Whether to mark injects still queued or running (i.e., left behind by a backend that stopped)
+            as failed. Disable it if another running backend shares the file.
+    """
+    def __init__(self, path: str, recover: bool = True):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__local = local()
+        with self.__connection() as connection:
+            connection.executescript(SCHEMA)
+            if recover:
+                # Injects only run in the process that queued them so, these will never finish.
+                connection.execute(
+                    "UPDATE injects SET status = 'failed', error = ?, updated = ? "
+                    "WHERE status IN ('queued', 'running')",
+                    ("the backend stopped before the inject finished", time()),
+                )
+
+    def __connection(self) -> sqlite3.Connection:
+        # SQLite connections must not be shared between threads so, each thread opens its own.
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            # Let readers (e.g., other uvicorn workers) read while an inject is being written.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self.__local.connection = connection
+        return connection
+
+    @staticmethod
+    def __get_targets(inject: Dict[str, Any]) -> List[str]:
+        return sorted({
+            target["address"]
+            for system in inject.get("systems", [])
+            for target in system.get("targets", [])
+            if target.get("address")
+        })
+
+    def add(self, inject_id: str, inject: Dict[str, Any], status: str = "queued") -> None:
+        """Saves a new inject."""
+        now = time()
+        with self.__connection() as connection:
+            connection.execute(
+                "INSERT INTO injects (id, name, status, created, updated, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (inject_id, inject.get("name"), status, now, now, json.dumps(inject)),
+            )
+            connection.executemany(
+                "INSERT INTO inject_targets (inject_id, address) VALUES (?, ?)",
+                [(inject_id, address) for address in self.__get_targets(inject)],
+            )
+
+    def delete(self, inject_id: str) -> None:
+        with self.__connection() as connection:
+            connection.execute("DELETE FROM injects WHERE id = ?", (inject_id,))
+
+    def set_status(self, inject_id: str, status: str, error: Optional[str] = None) -> None:
+        """Records the state of an inject (e.g., "running", "completed", or "failed")."""
+        with self.__connection() as connection:
+            connection.execute(
+                "UPDATE injects SET status = ?, error = ?, updated = ? WHERE id = ?",
+                (status, error, time(), inject_id),
+            )
+
+    def get(self, inject_id: str) -> Optional[Dict[str, Any]]:
+        """Returns an inject or None if it is unknown."""
+        row = self.__connection().execute("SELECT body FROM injects WHERE id = ?", (inject_id,)).fetchone()
+        return None if row is None else json.loads(row["body"])
+
+    def get_status(self, inject_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the state of an inject or None if it is unknown."""
+        row = self.__connection().execute(
+            "SELECT id, status AS state, error, created, updated FROM injects WHERE id = ?",
+            (inject_id,),
+        ).fetchone()
+        return None if row is None else dict(row)
+
+    def exists(self, inject_id: str) -> bool:
+        return self.__connection().execute("SELECT 1 FROM injects WHERE id = ?", (inject_id,)).fetchone() is not None
+
+    def list(
+        self,
+        status: Optional[str] = None,
+        target: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Returns the number of injects matching the filters given and a page of them (newest first).
+
+        Returns:
+            tuple[int, list[dict]]. Each inject's summary (ID, name, status, timestamps) and body.
+
+        """
+        conditions, parameters = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            parameters.append(status)
+        if target is not None:
+            conditions.append("id IN (SELECT inject_id FROM inject_targets WHERE address = ?)")
+            parameters.append(target)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        connection = self.__connection()
+        total = connection.execute(f"SELECT COUNT(*) FROM injects {where}", parameters).fetchone()[0]
+        rows = connection.execute(
+            f"SELECT id, name, status, error, created, updated, body FROM injects {where} "
+            "ORDER BY created DESC, id LIMIT ? OFFSET ?",
+            parameters + [limit, offset],
+        ).fetchall()
+        injects = [{**dict(row), "body": json.loads(row["body"])} for row in rows]
+        return total, injects
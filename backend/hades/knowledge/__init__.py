@@ -0,0 +1 @@
+from .store import KnowledgeStore, knowledge_store, TargetKnowledge
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""Defines a store of facts discovered about targets during an inject."""
+
+# Standard library imports.
+from copy import deepcopy
+from threading import Lock
+from time import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Local imports.
+from hades.core import KNOWLEDGE_TTL
+
+
+class TargetKnowledge:
+    """Facts discovered about a single target.
+
+    Attributes:
+        address (str): The target's IP address.
+        state (str): Whether the target was last seen "up" or "down".
+        hostnames (list[str]): Hostnames the target resolves to.
+        ports (dict[str, dict]): Port records (e.g., state, service, product, version) keyed by "<port>/<protocol>".
+        scanned_ports (dict[int, float]): When each explicitly requested port was last scanned.
+        default_scan (float): When a scan of the scanner's default ports last completed.
+        os (list[str]): Operating system guesses.
+        os_observed (float): When the operating system guesses were made.
+        notes (dict[str, tuple[str, float]]): Other facts (e.g., the exploit chosen) and when they were noted.
+    """
+    def __init__(self, address: str):
+        self.address = address
+        self.state: Optional[str] = None
+        self.hostnames: List[str] = []
+        self.observed: Optional[float] = None
+        self.ports: Dict[str, Dict[str, Any]] = {}
+        self.scanned_ports: Dict[int, float] = {}
+        self.default_scan: Optional[float] = None
+        self.os: List[str] = []
+        self.os_observed: Optional[float] = None
+        self.notes: Dict[str, Tuple[str, float]] = {}
+
+    def expire(self, oldest: float) -> None:
+        """Drops every fact observed before the given time."""
+        self.ports = {key: port for key, port in self.ports.items() if port["observed"] >= oldest}
+        self.scanned_ports = {port: observed for port, observed in self.scanned_ports.items() if observed >= oldest}
+        self.notes = {key: note for key, note in self.notes.items() if note[1] >= oldest}
+        if (self.default_scan is not None) and (self.default_scan < oldest):
+            self.default_scan = None
+        if (self.os_observed is not None) and (self.os_observed < oldest):
+            self.os, self.os_observed = [], None
+        if (self.observed is not None) and (self.observed < oldest):
+            self.state, self.observed = None, None
+
+    def has_scanned(self, ports: Optional[Iterable[int]]) -> bool:
+        """Returns True if the given ports (or the default ports if None) have been scanned."""
+        if ports is None:
+            return self.default_scan is not None
+        return all(port in self.scanned_ports for port in ports)
+
+    def open_ports(self, ports: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Returns the records of every open port (limited to the given ports if specified)."""
+        wanted = None if ports is None else set(ports)
+        return [
+            port for port in sorted(self.ports.values(), key=lambda port: (port["protocol"], port["port"]))
+            if port["state"] == "open" and (wanted is None or port["port"] in wanted)
+        ]
+
+
+class KnowledgeStore:
+    """Thread-safe store of facts about targets, scoped to the inject that discovered them.
+
+    Facts older than the store's time-to-live (TTL) are treated as unknown.
+
+    Args:
+        ttl (float): Seconds a fact remains valid for.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.__targets: Dict[Tuple[str, str], TargetKnowledge] = {}
+        self.__lock = Lock()
+
+    def __get(self, inject_id: str, address: str) -> TargetKnowledge:
+        key = (inject_id, address)
+        if key not in self.__targets:
+            self.__targets[key] = TargetKnowledge(address)
+        return self.__targets[key]
+
+    def get(self, inject_id: str, address: str) -> Optional[TargetKnowledge]:
+        """Returns a copy of the unexpired facts about the given target (or None if nothing is known about it)."""
+        with self.__lock:
+            target = self.__targets.get((inject_id, address))
+            if target is None:
+                return None
+            target.expire(time() - self.ttl)
+            return deepcopy(target)
+
+    def record_host(self, inject_id: str, address: str, state: str, hostnames: List[str]) -> None:
+        """Records whether the given target is up and what its hostnames are."""
+        with self.__lock:
+            target = self.__get(inject_id, address)
+            target.state, target.observed = state, time()
+            target.hostnames = hostnames or target.hostnames
+
+    def record_ports(
+        self,
+        inject_id: str,
+        address: str,
+        ports: List[Dict[str, Any]],
+        scanned: Optional[Iterable[int]],
+        versioned: bool,
+    ) -> None:
+        """Records the results of a port scan.
+
+        Args:
+            ports (list[dict]): The port records reported by the scanner.
+            scanned (Iterable[int]): The ports that were scanned (None if the scanner's default ports were scanned).
+            versioned (bool): True if the scan identified service versions.
+        """
+        now = time()
+        with self.__lock:
+            target = self.__get(inject_id, address)
+            if scanned is None:
+                target.default_scan = now
+            else:
+                target.scanned_ports.update({port: now for port in scanned})
+
+            for port in ports:
+                key = f"{port['port']}/{port['protocol']}"
+                previous = target.ports.get(key, {})
+
+                # Do not let a scan without version detection erase versions that are already known.
+                record = {**port, "observed": now, "versioned": versioned or previous.get("versioned", False)}
+                if (not versioned) and previous.get("versioned", False):
+                    for field in ("service", "product", "version", "extrainfo"):
+                        record[field] = previous.get(field)
+                target.ports[key] = record
+
+    def record_os(self, inject_id: str, address: str, os: List[str]) -> None:
+        """Records the operating system guesses made about the given target."""
+        with self.__lock:
+            target = self.__get(inject_id, address)
+            target.os, target.os_observed = os, time()
+
+    def record_note(self, inject_id: str, address: str, key: str, value: str) -> None:
+        """Records any other fact about the given target (e.g., the exploit chosen)."""
+        with self.__lock:
+            self.__get(inject_id, address).notes[key] = (value, time())
+
+    def forget(self, inject_id: str) -> None:
+        """Drops everything known by the given inject."""
+        with self.__lock:
+            for key in [key for key in self.__targets if key[0] == inject_id]:
+                del self.__targets[key]
+
+
+# Init a store shared by every inject.
+knowledge_store = KnowledgeStore(ttl=KNOWLEDGE_TTL)
@@ -2,51 +2,101 @@
 
 # Standard library imports.
 import asyncio
-from json import dumps
+from json import dumps, loads
 from threading import Thread
+from typing import Optional
 from uuid import uuid4
 
 # Third-party imports.
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Local imports.
-from hades.server import HadesServer
+from hades.agents import HadesAgentFactory, LLMResponseCache
+from hades.server import HadesServer, InjectScheduler, SchedulerFullError
 from hades.core import (
+    FANOUT_QUEUE_SIZE,
+    FANOUT_REPLAY_SIZE,
     get_logger,
+    INJECT_QUEUE_SIZE,
+    INJECT_STATUS_TTL,
+    INJECT_STORE_PATH,
+    INJECT_WORKERS,
+    LLM_CACHE,
+    LLM_CACHE_DIR,
+    LLM_CACHE_SIZE,
     LLM_TAGS,
+    metrics,
+    OUTPUT_METHOD,
     RABBITMQ_ADDRESS,
     RABBITMQ_PASSWORD,
+    RABBITMQ_POOL_SIZE,
     RABBITMQ_PORT,
     RABBITMQ_REPORT_EXCHANGE_NAME,
     RABBITMQ_USERNAME,
+    REPORT_BATCH_INTERVAL,
+    REPORT_BATCH_SIZE,
+    REPORT_QUEUE_SIZE,
 )
+from hades.injects import event_log, InjectStore
+from hades.messages.fanout import FanoutHub
+from hades.messages.pool import RabbitMQConnectionPool
+from hades.messages.publisher import ReportPublisher
 from hades.messages.rabbitmq import RabbitMQClient
-from hades.tools import msfconsole, nmap
+from hades.tools import get_payload_index, msfconsole, msfconsole_pool, nmap
 
 logger = get_logger(name="hades", format="json")
-INJECTS: dict[str, dict] = {}
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+# Init a store of injects shared by every worker (and kept across restarts).
+inject_store = InjectStore(path=INJECT_STORE_PATH)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+# Init a pool of RabbitMQ connections shared by every request.
+rabbitmq_pool = RabbitMQConnectionPool(
+    address=RABBITMQ_ADDRESS,
+    port=RABBITMQ_PORT,
+    virtual_host="/",
+    username=RABBITMQ_USERNAME,
+    password=RABBITMQ_PASSWORD,
+    size=RABBITMQ_POOL_SIZE,
+)
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+# Init a publisher that sends every inject's reports to RabbitMQ in the background (in batches).
+report_publisher = None
+if OUTPUT_METHOD == "rabbitmq":
+    report_publisher = ReportPublisher(
+        pool=rabbitmq_pool,
+        exchange_name=RABBITMQ_REPORT_EXCHANGE_NAME,
+        exchange_type="topic",
+        logger=logger,
+        batch_size=REPORT_BATCH_SIZE,
+        batch_interval=REPORT_BATCH_INTERVAL,
+        max_queued=REPORT_QUEUE_SIZE,
+    )
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+# Init a scheduler that bounds how many injects run at once.
+scheduler = InjectScheduler(
+    logger=logger,
+    workers=INJECT_WORKERS,
+    max_queued=INJECT_QUEUE_SIZE,
+    status_ttl=INJECT_STATUS_TTL,
+)
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+# Init a hub that relays each inject's reports to every websocket client watching it.
+hub = FanoutHub(
+    pool=rabbitmq_pool,
+    exchange_name=RABBITMQ_REPORT_EXCHANGE_NAME,
+    queue_size=FANOUT_QUEUE_SIZE,
+    replay_size=FANOUT_REPLAY_SIZE,
+)
 
-manager = ConnectionManager()
+# Init a factory that prepares the LLM config and tool schemas once for every inject's agents.
+agent_factory = HadesAgentFactory(
+    logger=logger,
+    llm_tag=LLM_TAGS[0],
+    tools=[nmap, msfconsole],
+    cache=LLMResponseCache(directory=LLM_CACHE_DIR, size_limit=LLM_CACHE_SIZE) if LLM_CACHE else None,
+)
 
 api = FastAPI()
 
@@ -56,6 +106,29 @@ api.add_middleware(
     allow_methods=["*"],
 )
 
+@api.on_event("startup")
+async def warm_tools():
+    # Boot the Msfconsole workers now so the first inject does not have to wait for them.
+    msfconsole_pool.warm()
+
+    # Build (or validate) the Metasploit payload index in the background.
+    Thread(target=get_payload_index, daemon=True).start()
+
+@api.on_event("shutdown")
+async def flush_reports():
+    # Publish the reports still queued before the process exits.
+    if report_publisher is not None:
+        await asyncio.to_thread(report_publisher.close)
+
+@api.get("/health/msfconsole")
+async def msfconsole_health():
+    return await asyncio.to_thread(msfconsole_pool.health_check)
+
+@api.get("/metrics")
+async def get_metrics():
+    # Latency histograms (per span, tool, and model) and LLM token counts in the Prometheus text format.
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @api.post("/")
 async def new_inject(request: Request):
     # Tag the inject with a UUID and then, save it.
@@ -63,86 +136,126 @@ async def new_inject(request: Request):
     logger.debug(request)
     id = str(uuid4())
 
-    # I did this so the object returned to the frontend is a list of single key/value pairs.
-    # ex: [{id: inject}, {id: inject}, {id: inject}] 
-    INJECTS[id] = request
-    
+    # Reject a bad priority before the inject is saved (so it does not linger in the store).
+    try:
+        priority = int(request.get("priority", 0))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="The priority must be an integer")
+
     # I did this so the agents are sent an object containing multiple key/value pairs. 
     # ex: {id: 1234, target: x.x.x.x}.
     request["id"] = id
+    await asyncio.to_thread(inject_store.add, id, request)
 
     # Convert the inject to JSON.
     inject = dumps(request)
 
-    rabbitmq_client = RabbitMQClient(
-        address=RABBITMQ_ADDRESS,
-        port=RABBITMQ_PORT,
-        virtual_host="/",
-        username=RABBITMQ_USERNAME,
-        password=RABBITMQ_PASSWORD,
-        exchange_name=RABBITMQ_REPORT_EXCHANGE_NAME,
-        exchange_type="topic",
-        durable=False,
-        routing_key=id,
-        handler=None,
-    )
+    def run_inject():
+        # Reports are published to RabbitMQ unless they are only meant for the console (e.g., when benchmarking).
+        rabbitmq_client = None
+        if OUTPUT_METHOD == "rabbitmq":
+            rabbitmq_client = RabbitMQClient(publisher=report_publisher, routing_key=id)
 
-    server = HadesServer(
-        logger=logger,
-        output_method="rabbitmq",
-        rabbitmq_client=rabbitmq_client,
-        llm_tag=LLM_TAGS[0],
-        tools=[nmap, msfconsole]
-    )
+        server = HadesServer(
+            logger=logger,
+            output_method=OUTPUT_METHOD,
+            rabbitmq_client=rabbitmq_client,
+            agent_factory=agent_factory,
+        )
+        inject_store.set_status(id, "running")
+        try:
+            server.Start(inject)
+        except Exception as e:
+            inject_store.set_status(id, "failed", str(e))
+            raise
+        inject_store.set_status(id, "completed")
+
+    # Queue the inject (or ask the client to come back later if the queue is full).
+    try:
+        status = scheduler.submit(id, run_inject, priority=priority)
+    except SchedulerFullError as error:
+        await asyncio.to_thread(inject_store.delete, id)
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(error), "retry_after": error.retry_after},
+            headers={"Retry-After": str(error.retry_after)},
+        )
+    return {"id": id, "state": status["state"], "position": status.get("position")}
 
-    Thread(target=server.Start, args=(inject,), daemon=True).start()    
-    return {"id": id}
+@api.get("/injects/{inject_id}/status")
+async def get_inject_status(inject_id: str):
+    # Injects queued (or running) on another worker are only known to the store.
+    status = scheduler.status(inject_id) or await asyncio.to_thread(inject_store.get_status, inject_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown inject")
+    return status
 
 @api.websocket("/ws/{inject_id}")
-async def watch_inject(websocket: WebSocket, inject_id: str):
-    await manager.connect(websocket)
-    loop = asyncio.get_event_loop()
+async def watch_inject(websocket: WebSocket, inject_id: str, offset: Optional[int] = None):
+    await websocket.accept()
 
-    if inject_id not in INJECTS:
+    if not await asyncio.to_thread(inject_store.exists, inject_id):
         await websocket.close(code=1008, reason="Unknown inject")
         return
 
-    def relay(ch, method, properties, body):
-        asyncio.run_coroutine_threadsafe(
-            websocket.send_text(body.decode()), loop
-        )
+    # Subscribe before catching up so no report is missed between the two.
+    subscriber = hub.subscribe(inject_id)
 
-    rabbitmq_client = RabbitMQClient(
-        address=RABBITMQ_ADDRESS,
-        port=RABBITMQ_PORT,
-        virtual_host="/",
-        username=RABBITMQ_USERNAME,
-        password=RABBITMQ_PASSWORD,
-        exchange_name=RABBITMQ_REPORT_EXCHANGE_NAME,
-        exchange_type="topic",
-        durable=False,
-        routing_key=inject_id,
-        handler=relay,
-    )
+    async def _relay():
+        # Catch up from the inject's event log (if asked to) and then, skip live reports that were already sent.
+        last = -1
+        if offset is not None:
+            # Live reports that do not fit in the queue meanwhile are read from the log too (on the next pass).
+            subscriber.catching_up = True
+            while True:
+                subscriber.overflowed = False
+                start = max(offset, last + 1)
+                for last, event in await asyncio.to_thread(lambda: list(event_log.read(inject_id, start))):
+                    await websocket.send_text(event)
+                if not subscriber.overflowed:
+                    break
+            subscriber.catching_up = False
+        while (message := await subscriber.queue.get()) is not None:
+            if (last >= 0) and (loads(message).get("offset", last + 1) <= last):
+                continue
+            await websocket.send_text(message)
+        # The hub only wakes a subscriber with None when it is being dropped.
+        await websocket.close(code=subscriber.close_code, reason=subscriber.close_reason)
 
-    def _consume():
-        try:
-            rabbitmq_client.Consume()
-        except Exception as error:
-            asyncio.run_coroutine_threadsafe(
-                websocket.send_text(error), loop
-            )
-
-    consumer_thread = Thread(target=_consume, daemon=True)
-    consumer_thread.start()
+    relay = asyncio.create_task(_relay())
 
     try:
         while True:
             await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        consumer_thread.join(timeout=1)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        relay.cancel()
+        hub.unsubscribe(inject_id, subscriber)
+
+@api.get("/injects")
+async def list_inject_summaries(
+    status: Optional[str] = None,
+    target: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    total, injects = await asyncio.to_thread(inject_store.list, status, target, limit, offset)
+    return {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "injects": [{key: value for key, value in inject.items() if key != "body"} for inject in injects],
+    }
 
 @api.get("/")
-async def list_injects():
-    return INJECTS
+async def list_injects(
+    status: Optional[str] = None,
+    target: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    # I did this so the object returned to the frontend is a list of single key/value pairs.
+    # ex: [{id: inject}, {id: inject}, {id: inject}] 
+    _, injects = await asyncio.to_thread(inject_store.list, status, target, limit, offset)
+    return {inject["id"]: inject["body"] for inject in injects}
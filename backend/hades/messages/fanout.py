@@ -0,0 +1,202 @@
+"""Defines a hub that fans inject reports out to every client watching the inject."""
+
+# Standard library imports.
+import asyncio
+from collections import deque
+from json import dumps, loads
+from threading import Event, Thread
+from typing import Deque, Dict, Optional, Set
+
+# Third-party imports.
+from pika.exceptions import AMQPError
+
+# Local imports.
+from .pool import RabbitMQConnectionPool
+from .publisher import split_batch
+
+
+class FanoutSubscriber:
+    """A client watching an inject.
+
+    Attributes:
+        queue (asyncio.Queue): Reports waiting to be sent to the client (None means the client was dropped).
+        dropped (bool): True if the client was dropped (e.g., it fell too far behind or the feed failed).
+        close_code (int): WebSocket close code explaining why the client was dropped.
+        close_reason (str): Why the client was dropped.
+        catching_up (bool): True while the client reads older reports from the event log (instead of the queue).
+        overflowed (bool): True if reports were discarded (instead of dropping the client) while it was catching up.
+    """
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.dropped = False
+        self.close_code = 1000
+        self.close_reason = ""
+        self.catching_up = False
+        self.overflowed = False
+
+    def offer(self, message: str) -> bool:
+        """Queues a report for the client, returning False (and dropping the client) if its queue is full."""
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            if self.catching_up:
+                # Logged reports are read from the event log once the client is done catching up so, keep the client.
+                self.overflowed = True
+                return True
+            self.close(code=1013, reason="Client is too slow")
+            return False
+
+    def close(self, code: int, reason: str) -> None:
+        """Discards the client's pending reports and wakes it up so it can disconnect (with the code and reason)."""
+        self.dropped = True
+        self.close_code, self.close_reason = code, reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class InjectFeed:
+    """Consumes an inject's reports from RabbitMQ (once) and hands each one to every subscriber.
+
+    Args:
+        pool (RabbitMQConnectionPool): Pool used to open the consumer's connection.
+        exchange_name (str): Name of the exchange reports are published to.
+        inject_id (str): ID of the inject (used as the routing key).
+        loop (asyncio.AbstractEventLoop): Event loop the subscribers are served from.
+        replay_size (int): Number of recent reports replayed to clients that subscribe late.
+    """
+    def __init__(
+        self,
+        pool: RabbitMQConnectionPool,
+        exchange_name: str,
+        inject_id: str,
+        loop: asyncio.AbstractEventLoop,
+        replay_size: int,
+    ):
+        self.pool = pool
+        self.exchange_name = exchange_name
+        self.inject_id = inject_id
+        self.loop = loop
+        self.subscribers: Set[FanoutSubscriber] = set()
+        self.replay: Deque[str] = deque(maxlen=replay_size)
+        self.__stopped = Event()
+        self.__thread = Thread(target=self.__consume, name=f"hades-feed-{inject_id}", daemon=True)
+
+    @property
+    def is_running(self) -> bool:
+        return self.__thread.is_alive() and not self.__stopped.is_set()
+
+    def start(self) -> None:
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+
+    def __consume(self) -> None:
+        connection = None
+        try:
+            connection, channel = self.pool.connect()
+
+            # Give the inject its own short-lived queue so feeds for different injects never compete for reports.
+            channel.exchange_declare(exchange=self.exchange_name, exchange_type="topic")
+            queue = channel.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
+            channel.queue_bind(exchange=self.exchange_name, queue=queue, routing_key=self.inject_id)
+            channel.basic_consume(queue=queue, on_message_callback=self.__on_message, auto_ack=True)
+
+            # Consume in short slices so the feed notices when it is stopped.
+            while not self.__stopped.is_set():
+                connection.process_data_events(time_limit=1)
+        except AMQPError as error:
+            report = dumps({"sender": "System", "message": f"Stopped relaying reports: {error}"})
+            self.loop.call_soon_threadsafe(self.publish, report)
+            self.loop.call_soon_threadsafe(self.close)
+        finally:
+            if (connection is not None) and connection.is_open:
+                connection.close()
+
+    def __on_message(self, channel, method, properties, body: bytes) -> None:
+        # Reports are published in batches so, hand each one to the subscribers separately.
+        for message in split_batch(body.decode()):
+            self.loop.call_soon_threadsafe(self.publish, message)
+
+    def publish(self, message: str) -> None:
+        """Hands a report to every subscriber (must be called from the event loop)."""
+        # Streamed tokens are only useful live (the full message follows them) so, they are not replayed.
+        try:
+            is_token = loads(message).get("type") == "token"
+        except (ValueError, AttributeError):
+            is_token = False
+        if not is_token:
+            self.replay.append(message)
+        for subscriber in list(self.subscribers):
+            if not subscriber.offer(message):
+                self.subscribers.discard(subscriber)
+
+    def close(self) -> None:
+        """Disconnects every subscriber (must be called from the event loop)."""
+        for subscriber in self.subscribers:
+            subscriber.close(code=1011, reason="Stopped relaying reports")
+        self.subscribers.clear()
+
+
+class FanoutHub:
+    """Keeps one RabbitMQ consumer per watched inject and fans its reports out to every client watching it.
+
+    Clients get a bounded queue. A client that falls more than `queue_size` reports behind is dropped instead of
+    slowing down the others.
+
+    Args:
+        pool (RabbitMQConnectionPool): Pool used to open consumer connections.
+        exchange_name (str): Name of the exchange reports are published to.
+        queue_size (int): Maximum number of reports waiting to be sent to a client.
+        replay_size (int): Number of recent reports replayed to clients that subscribe late.
+    """
+    def __init__(self, pool: RabbitMQConnectionPool, exchange_name: str, queue_size: int, replay_size: int):
+        self.pool = pool
+        self.exchange_name = exchange_name
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.feeds: Dict[str, InjectFeed] = {}
+
+    def subscribe(self, inject_id: str) -> FanoutSubscriber:
+        """Subscribes a client to an inject's reports, starting a feed for the inject if there is not one already.
+
+        Must be called from the event loop.
+
+        Returns:
+            FanoutSubscriber.
+
+        """
+        feed = self.feeds.get(inject_id)
+        if (feed is None) or (not feed.is_running):
+            feed = InjectFeed(
+                pool=self.pool,
+                exchange_name=self.exchange_name,
+                inject_id=inject_id,
+                loop=asyncio.get_running_loop(),
+                replay_size=self.replay_size,
+            )
+            self.feeds[inject_id] = feed
+            feed.start()
+
+        subscriber = FanoutSubscriber(size=max(self.queue_size, self.replay_size + 1))
+        for message in feed.replay:
+            subscriber.offer(message)
+        feed.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, inject_id: str, subscriber: FanoutSubscriber) -> None:
+        """Unsubscribes a client, stopping the inject's feed if nobody else is watching it.
+
+        Must be called from the event loop.
+        """
+        feed: Optional[InjectFeed] = self.feeds.get(inject_id)
+        if feed is None:
+            return
+        feed.subscribers.discard(subscriber)
+        if not feed.subscribers:
+            feed.stop()
+            del self.feeds[inject_id]
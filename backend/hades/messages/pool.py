@@ -0,0 +1,109 @@
+"""Defines a pool of RabbitMQ connections."""
+
+# Standard library imports.
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+from threading import Semaphore
+from time import monotonic
+from typing import Callable, Iterator, Tuple, TypeVar
+
+# Third-party imports.
+from pika import BlockingConnection, ConnectionParameters, PlainCredentials
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import AMQPError
+
+# Local imports.
+from hades.core import BROKER_LATENCY
+
+T = TypeVar("T")
+
+
+class RabbitMQConnectionPool:
+    """Process-wide pool of RabbitMQ connections (each with one channel) that are reused across requests.
+
+    A pika connection must only be used by one thread at a time so, each checkout is exclusive. Idle connections are
+    checked before they are handed out and replaced if the broker closed them.
+
+    Args:
+        address (str): RabbitMQ server address.
+        port (int): Port number for the RabbitMQ server.
+        virtual_host (str): Virtual host to connect to.
+        username (str): Username for authentication.
+        password (str): Password for authentication.
+        size (int): Maximum number of connections to keep open at once.
+    """
+    def __init__(self, address: str, port: int, virtual_host: str, username: str, password: str, size: int):
+        self.parameters = ConnectionParameters(
+            host=address,
+            port=port,
+            virtual_host=virtual_host,
+            credentials=PlainCredentials(
+                username=username,
+                password=password
+            )
+        )
+        self.__idle: LifoQueue = LifoQueue()
+        self.__slots = Semaphore(size)
+
+    def connect(self) -> Tuple[BlockingConnection, BlockingChannel]:
+        """Opens a new connection (and channel) that is not managed by the pool (e.g., for long-running consumers)."""
+        connection = BlockingConnection(parameters=self.parameters)
+        return connection, connection.channel()
+
+    def __checkout(self) -> Tuple[BlockingConnection, BlockingChannel]:
+        while True:
+            try:
+                connection, channel = self.__idle.get_nowait()
+            except Empty:
+                return self.connect()
+            try:
+                # Service heartbeats that were missed while idle (and find out if the broker closed the connection).
+                connection.process_data_events(time_limit=0)
+                if channel.is_open:
+                    return connection, channel
+            except AMQPError:
+                pass
+            self.__close(connection)
+
+    @staticmethod
+    def __close(connection: BlockingConnection) -> None:
+        try:
+            if connection.is_open:
+                connection.close()
+        except AMQPError:
+            pass
+
+    @contextmanager
+    def channel(self) -> Iterator[BlockingChannel]:
+        """Checks out a channel for the duration of the context, discarding its connection if it fails."""
+        with self.__slots:
+            connection, channel = self.__checkout()
+            try:
+                yield channel
+            except AMQPError:
+                # The broker may have restarted so, reconnect next time.
+                self.__close(connection)
+                raise
+            except BaseException:
+                self.__idle.put((connection, channel))
+                raise
+            self.__idle.put((connection, channel))
+
+    def run(self, function: Callable[[BlockingChannel], T], retries: int = 1) -> T:
+        """Calls the given function with a pooled channel, retrying on a new connection if the broker fails it.
+
+        Returns:
+            The function's return value.
+
+        """
+        started = monotonic()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    with self.channel() as channel:
+                        return function(channel)
+                except AMQPError:
+                    if attempt == retries:
+                        raise
+        finally:
+            BROKER_LATENCY.observe(monotonic() - started)
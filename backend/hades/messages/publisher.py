@@ -0,0 +1,172 @@
+"""Defines a background publisher that batches reports on their way to RabbitMQ."""
+
+# Standard library imports.
+from collections import defaultdict
+from logging import Logger
+from queue import Empty, Full, Queue
+from threading import Condition, Event, Thread
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+# Third-party imports.
+from pika import BasicProperties, BlockingConnection
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import AMQPError
+
+# Local imports.
+from .pool import RabbitMQConnectionPool
+from hades.core import BROKER_LATENCY, metrics
+
+# Reports in a batch are separated by new lines (reports are JSON documents, which never contain one).
+BATCH_CONTENT_TYPE = "application/x-ndjson"
+
+REPORTS_DROPPED = metrics.counter(
+    "hades_reports_dropped_total",
+    "Reports dropped because RabbitMQ could not keep up (they are still in the inject's event log).",
+)
+REPORT_BATCHES = metrics.histogram(
+    "hades_report_batch_size",
+    "Number of reports published to RabbitMQ as one message.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+
+def split_batch(body: str) -> List[str]:
+    """Returns the reports in a message published by a ReportPublisher (or the message itself if it is one report)."""
+    return [report for report in body.split("\n") if report]
+
+
+class ReportPublisher:
+    """Publishes reports to an exchange from a background thread so agents never wait on RabbitMQ.
+
+    Reports are queued in memory and published in batches (one message per inject) of up to `batch_size` reports or
+    whatever arrived within `batch_interval` seconds. Batches are published on a dedicated channel with publisher
+    confirms and retried (on a new connection) until the broker accepts them. If the broker falls `max_queued` reports
+    behind, new reports are dropped instead of buffered; viewers can still catch up from the event log.
+
+    Args:
+        pool (RabbitMQConnectionPool): Pool used to open the publisher's connection.
+        exchange_name (str): Name of the exchange reports are published to.
+        exchange_type (str): Type of the exchange.
+        logger (Logger): Logger used to report broker failures.
+        batch_size (int): Maximum number of reports per batch.
+        batch_interval (float): Seconds to wait for more reports before publishing a batch.
+        max_queued (int): Maximum number of reports waiting to be published.
+    """
+    def __init__(
+        self,
+        pool: RabbitMQConnectionPool,
+        exchange_name: str,
+        exchange_type: str,
+        logger: Logger,
+        batch_size: int,
+        batch_interval: float,
+        max_queued: int,
+    ):
+        self.pool = pool
+        self.exchange_name = exchange_name
+        self.exchange_type = exchange_type
+        self.logger = logger
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.__queue: Queue = Queue(maxsize=max_queued)
+        self.__pending = 0
+        self.__published = Condition()
+        self.__stopped = Event()
+        self.__connection: Optional[BlockingConnection] = None
+        self.__channel: Optional[BlockingChannel] = None
+        self.__thread = Thread(target=self.__run, name="hades-report-publisher", daemon=True)
+        self.__thread.start()
+
+    def publish(self, routing_key: str, report: str) -> None:
+        """Queues a report to be published (without waiting on the broker)."""
+        with self.__published:
+            try:
+                self.__queue.put_nowait((routing_key, report))
+                self.__pending += 1
+            except Full:
+                REPORTS_DROPPED.inc()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued report has been published.
+
+        Returns:
+            bool. False if reports were still waiting when the timeout expired.
+
+        """
+        with self.__published:
+            return self.__published.wait_for(lambda: self.__pending == 0, timeout)
+
+    def close(self, timeout: float = 10) -> None:
+        """Publishes whatever is queued (waiting up to the timeout) and then, stops the publisher."""
+        self.flush(timeout)
+        self.__stopped.set()
+        self.__thread.join(timeout)
+
+    def __get_batch(self) -> List[Tuple[str, str]]:
+        # Wait for a report and then, for more (until the batch is full or the time window ends).
+        try:
+            batch = [self.__queue.get(timeout=1)]
+        except Empty:
+            return []
+        deadline = monotonic() + self.batch_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - monotonic()
+            try:
+                batch.append(self.__queue.get(timeout=remaining) if remaining > 0 else self.__queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def __connect(self) -> BlockingChannel:
+        if (self.__channel is None) or (not self.__channel.is_open):
+            self.__disconnect()
+            self.__connection, self.__channel = self.pool.connect()
+            self.__channel.exchange_declare(exchange=self.exchange_name, exchange_type=self.exchange_type)
+            self.__channel.confirm_delivery()
+        return self.__channel
+
+    def __disconnect(self) -> None:
+        connection, self.__connection, self.__channel = self.__connection, None, None
+        try:
+            if (connection is not None) and connection.is_open:
+                connection.close()
+        except AMQPError:
+            pass
+
+    def __send(self, batch: List[Tuple[str, str]]) -> None:
+        # Send one message per inject (keeping the order its reports were queued in).
+        reports: Dict[str, List[str]] = defaultdict(list)
+        for routing_key, report in batch:
+            reports[routing_key].append(report)
+
+        delay = 0.5
+        while reports and not self.__stopped.is_set():
+            started = monotonic()
+            try:
+                channel = self.__connect()
+                for routing_key in list(reports):
+                    channel.basic_publish(
+                        exchange=self.exchange_name,
+                        routing_key=routing_key,
+                        body="\n".join(reports[routing_key]),
+                        properties=BasicProperties(content_type=BATCH_CONTENT_TYPE),
+                    )
+                    REPORT_BATCHES.observe(len(reports.pop(routing_key)))
+                BROKER_LATENCY.observe(monotonic() - started)
+            except (AMQPError, OSError) as error:
+                # Keep the unpublished reports and retry on a new connection (backing off while the broker is down).
+                self.logger.warning(f"failed to publish reports (retrying in {delay} seconds): {error!r}")
+                self.__disconnect()
+                self.__stopped.wait(delay)
+                delay = min(delay * 2, 30)
+
+    def __run(self) -> None:
+        while not self.__stopped.is_set():
+            batch = self.__get_batch()
+            if batch:
+                self.__send(batch)
+                with self.__published:
+                    self.__pending -= len(batch)
+                    self.__published.notify_all()
+        self.__disconnect()
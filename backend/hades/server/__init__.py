@@ -1,2 +1,4 @@
+from .scheduler import InjectScheduler, SchedulerFullError
 from .server import HadesServer
-from .task_matrix import get_task_matrix
+from .task_graph import Task, TaskGraph
+from .task_matrix import task_graph
@@ -0,0 +1,39 @@
+"""Defines a fast sweep that finds which hosts of a network are up (reporting each one as soon as it is found)."""
+
+# Standard library imports.
+from typing import Callable, List
+
+# Local imports.
+from hades.core import INJECT_ID, tracer
+from hades.knowledge import knowledge_store
+from hades.tools.nmap import NmapHost, scan
+from hades.tools.nmap.nmap_args import NmapArgs
+
+
+def discover_hosts(network: str, on_host: Callable[[str], None]) -> List[str]:
+    """Sweeps a network for hosts that are up (without scanning their ports).
+
+    The sweep is split into shards (see `scan`) so, hosts are reported while the rest of the network is still being
+    swept. Each host found is also added to what the inject knows.
+
+    Args:
+        network (str): The network (e.g., "10.0.0.0/24"), range, or host to sweep.
+        on_host (Callable): Called with the address of each host that is up, as soon as it is found.
+
+    Returns:
+        list[str]. The address of every host found (in the order they were found).
+
+    """
+    inject_id = INJECT_ID.get()
+    found: List[str] = []
+
+    def report_host(host: NmapHost) -> None:
+        knowledge_store.record_host(inject_id, host.address, host.state, host.hostnames)
+        if host.state == "up":
+            found.append(host.address)
+            on_host(host.address)
+
+    with tracer.span("discovery", network=network) as span:
+        report = scan(NmapArgs(target=[network], sn=True), on_host=report_host)
+        span.set_attributes(hosts=len(found), errors=len(report.errors))
+    return found
@@ -0,0 +1,134 @@
+"""Defines a scheduler that bounds how many injects run at once."""
+
+# Standard library imports.
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from logging import Logger
+from threading import Condition, Lock, Thread
+from time import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class SchedulerFullError(RuntimeError):
+    """Raised when an inject is submitted while the scheduler's queue is full.
+
+    Attributes:
+        retry_after (int): Seconds the caller should wait before submitting again.
+    """
+    def __init__(self, retry_after: int):
+        super().__init__("the inject queue is full")
+        self.retry_after = retry_after
+
+
+class InjectScheduler:
+    """Runs injects on a fixed number of worker threads, queueing the rest by priority.
+
+    Injects with a higher priority run first. Injects with the same priority run in the order they were submitted.
+    Finished injects are forgotten after a while (the inject store still knows how they ended).
+
+    Args:
+        logger (Logger): Logger used to report what the scheduler is doing.
+        workers (int): Number of injects allowed to run at once.
+        max_queued (int): Number of injects allowed to wait for a worker before new ones are rejected.
+        status_ttl (float): Seconds the status of a finished inject is kept.
+        max_finished (int): Number of finished injects whose status is kept (the oldest ones are forgotten first).
+    """
+    def __init__(
+        self,
+        logger: Logger,
+        workers: int,
+        max_queued: int,
+        status_ttl: float = 3600,
+        max_finished: int = 1000,
+    ):
+        self.logger = logger
+        self.workers = workers
+        self.max_queued = max_queued
+        self.status_ttl = status_ttl
+        self.max_finished = max_finished
+        self.__queued: List[Tuple[Tuple[int, int], str]] = []
+        self.__sequence = count()
+        self.__jobs: Dict[str, Dict[str, Any]] = {}
+        self.__finished: Deque[Tuple[float, str]] = deque()
+        self.__durations: List[float] = []
+        self.__lock = Lock()
+        self.__ready = Condition(self.__lock)
+        for i in range(workers):
+            Thread(target=self.__work, name=f"hades-inject-worker-{i}", daemon=True).start()
+
+    def __evict(self) -> None:
+        # Forget injects that finished longer ago than the TTL (or the oldest ones, if too many finished since).
+        cutoff = time() - self.status_ttl
+        while self.__finished and ((self.__finished[0][0] < cutoff) or (len(self.__finished) > self.max_finished)):
+            _, inject_id = self.__finished.popleft()
+            self.__jobs.pop(inject_id, None)
+
+    def __retry_after(self) -> int:
+        # Estimate when a slot frees up using the average duration of recent injects.
+        average = sum(self.__durations) / len(self.__durations) if self.__durations else 60
+        return max(int(average * (len(self.__queued) + 1) / self.workers), 1)
+
+    def submit(self, inject_id: str, job: Callable[[], None], priority: int = 0) -> Dict[str, Any]:
+        """Queues an inject to be run by the next available worker.
+
+        Raises:
+            SchedulerFullError: If the queue is full.
+
+        Returns:
+            Dict. The inject's status.
+
+        """
+        with self.__lock:
+            self.__evict()
+            if len(self.__queued) >= self.max_queued:
+                raise SchedulerFullError(retry_after=self.__retry_after())
+            order = (-priority, next(self.__sequence))
+            self.__jobs[inject_id] = {
+                "id": inject_id,
+                "job": job,
+                "order": order,
+                "priority": priority,
+                "state": "queued",
+                "submitted": time(),
+                "started": None,
+                "finished": None,
+                "error": None,
+            }
+            heappush(self.__queued, (order, inject_id))
+            self.__ready.notify()
+        self.logger.debug(f"queued Inject #{inject_id} with priority {priority}")
+        return self.status(inject_id)
+
+    def status(self, inject_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the state of an inject (and its place in line if it is queued) or None if it is unknown."""
+        with self.__lock:
+            job = self.__jobs.get(inject_id)
+            if job is None:
+                return None
+            status = {key: value for key, value in job.items() if key not in ("job", "order")}
+            if job["state"] == "queued":
+                # The queue is bounded so, counting the injects ahead of this one is cheap.
+                status["position"] = sum(1 for order, _ in self.__queued if order < job["order"]) + 1
+            return status
+
+    def __work(self) -> None:
+        while True:
+            with self.__ready:
+                while not self.__queued:
+                    self.__ready.wait()
+                _, inject_id = heappop(self.__queued)
+                job = self.__jobs[inject_id]
+                job["state"], job["started"] = "running", time()
+            try:
+                job["job"]()
+                state, error = "completed", None
+            except Exception as e:
+                self.logger.error(f"Inject #{inject_id} failed: {e}")
+                state, error = "failed", str(e)
+            with self.__lock:
+                job["state"], job["error"], job["finished"] = state, error, time()
+                job["job"] = None
+                self.__durations = (self.__durations + [job["finished"] - job["started"]])[-20:]
+                self.__finished.append((job["finished"], inject_id))
+                self.__evict()
@@ -1,32 +1,33 @@
 """Defines a HADES Server."""
 
 # Standard library imports.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 from json import loads
 from logging import Logger
-from typing import Any, Callable, Dict, List
-from os import environ
+from threading import Lock
 from warnings import filterwarnings
 
 # Suppress warnings about flaml/autogen noise.
 filterwarnings("ignore", category=UserWarning, module="flaml")
 filterwarnings("ignore", category=UserWarning, module="autogen")
 
-# Third-party imports.
-from autogen import filter_config, register_function, UserProxyAgent
-
 # Local imports.
-from .task_matrix import get_task_matrix
-from hades.agents import HadesOperator, HadesPlanner
-from hades.core import USER_PROXY_AGENT_NAME
+from .discovery import discover_hosts
+from .task_matrix import task_graph
+from hades.agents import HadesAgentFactory
+from hades.core import INJECT_ID, TARGET_PARALLELISM, TASK_PARALLELISM, tracer
+from hades.injects import event_log
+from hades.knowledge import knowledge_store
 from hades.messages.rabbitmq import RabbitMQClient
+from hades.tools import msfconsole_pool
 
 
 class HadesServer:
     """Responds to cyber inject requests.
         
     Args:
-        llm_tag. str.
-        tools. A list of functions.
+        agent_factory. Builds the HADES agents (with tools registered) used for each target.
         message_client.
 
     """
@@ -35,8 +36,7 @@ class HadesServer:
         logger: Logger,
         output_method: str,
         rabbitmq_client: RabbitMQClient,
-        llm_tag: str,
-        tools: List[Callable],
+        agent_factory: HadesAgentFactory,
     ):
         self.logger = logger
         self.logger.debug("initializing the HADES server")
@@ -51,115 +51,10 @@ class HadesServer:
             case _:
                 raise ValueError("no output method specified")
 
-        # Init an Autogen user proxy agent.
-        self.user_proxy = UserProxyAgent(
-            name=USER_PROXY_AGENT_NAME,
-            code_execution_config={"use_docker": False}
-        )
-
-        # Parse the LLM config provided.
-        self.llm_config = self.__get_llm_config(llm_tag)[0]
-        self.logger.debug(f"using the '{self.llm_config['model']}' LLM")
-
-        # Init a HADES planner.
-        self.planner = HadesPlanner(
-            output_method=self.output_method,
-            llm_config=self.llm_config,
-            rabbitmq_client=self.rabbitmq_client,
-        )
-        self.logger.debug(f"initialized a HADES planner called '{self.planner.name}'")
-
-        # Init a HADES operator.
-        self.operator = HadesOperator(
-            output_method=self.output_method,
-            llm_config=self.llm_config,
-            rabbitmq_client=self.rabbitmq_client,
-        )
-        self.logger.debug(f"initialized a HADES operator called '{self.operator.name}'")
-
-        # Register tools for the HADES agents to use.
-        self.__register_tools(tools)
+        # Agents are created per task (so tasks and targets can be worked concurrently) by the factory.
+        self.agent_factory = agent_factory
         self.logger.debug("the HADES server has been initialized")
 
-    def __get_api_key(self, llm_tag: str) -> str:
-        """Returns the API key that corresponds with the LLM tag given.
-
-        Returns:
-            str. 
-        
-        """
-        match llm_tag:
-            case "openai":
-                if "OPENAI_API_KEY" not in environ:
-                    raise RuntimeError("the 'OPENAI_API_KEY' environment variable is not set")
-                self.logger.debug("the 'OPENAI_API_KEY' environment variable is set")
-                return environ["OPENAI_API_KEY"]
-            case _:
-                return None
-
-    def __get_llm_config(self, llm_tag: str) -> Dict[str, Any]:
-        """Returns the LLM config that corresponds with the LLM tag given.
-
-        Returns:
-            list[dict[str, Any]]: Text goes here.
-
-        """
-        if llm_tag in ["openai", "gpt4-0"]:
-            api_key = self.__get_api_key(llm_tag)
-        else:
-            api_key = None
-        return filter_config(
-            config_list=[
-                {
-                    "tags": ["openai", "gpt-4o"],
-                    "model": "gpt-4o",
-                    "api_key": api_key,
-                    "cache_seed": None,
-                },
-                {
-                    "tags": ["local", "mistral-7b"],
-                    "model": "mistral-7b-instruct-v0.2.Q6_K.gguf",
-                    "api_key": None,
-                    "cache_seed": None,
-                    "api_type": "openai",
-                    "base_url": "http://llm-server:9999/v1",
-                    "timeout": 120, 
-                },
-            ],
-            filter_dict={"tags": [llm_tag]}
-        )
-
-    def __register_tools(self, tools) -> None:
-        """Registers tools for HADES agents to use.
-        
-        Returns:
-            bool: True if all tool registrations were successful. False if all tool registrations were not successful.
-        
-        """
-        try:
-            for tool in tools:
-                self.logger.debug(f"registering '{tool.__name__}' as a tool for HADES agents to use")
-                register_function(
-                    tool,
-                    caller=self.planner,
-                    executor=self.operator,
-                    description=tool.__doc__,
-                )
-        except Exception as e:
-            self.logger.error(e)
-            raise RuntimeError(e)
-
-    def __get_task_list(self, scenario: dict, address: str, goal: str) -> List[Callable]:
-        """Parses the HADES task matrix to produce a list of tasks for HADES agents to execute.
-        """
-        task_matrix = get_task_matrix(
-            scenario=scenario,
-            sender=self.planner,
-            recipient=self.operator,
-            target=address
-        )
-        return task_matrix.get(goal, [])
-
     def Start(self, body):
         """
         Text goes here.
@@ -172,29 +67,102 @@ class HadesServer:
         # Parse the metadata provided.
         inject_id = request.get("id", "")
         inject_name = request.get("name", "")
+        INJECT_ID.set(inject_id)
         scenario = {}
         scenario["address"] = "192.168.152.1"
         scenario["allowed"] = request.get("rules_of_engagement", {}).get("techniques", {}).get("allowed", [])
         scenario["prohibited"] = request.get("rules_of_engagement", {}).get("techniques", {}).get("prohibited", [])
         systems = request.get("systems", [])
+        use_cache = request.get("cache", True)
         self.logger.info(f"starting '{inject_name}' (Inject #{inject_id})")
-        # Process the inject.
+
+        try:
+            self.__work_inject(inject_id, inject_name, scenario, systems, use_cache)
+        finally:
+            # Free what the inject held even if it failed (e.g., its Msfconsole worker, knowledge, and event log).
+            msfconsole_pool.release(inject_id)
+            knowledge_store.forget(inject_id)
+            event_log.close(inject_id)
+        self.logger.info(f"ending '{inject_name}' (Inject #{inject_id})")
+
+    def __work_inject(self, inject_id: str, inject_name: str, scenario: dict, systems: list, use_cache: bool) -> None:
+        """Works every target of an inject (discovering the hosts of any network targets first).
+        """
+        # Collect the high-value targets of every system (only machines and networks can be tasked for now).
+        # TODO: add code to handle situations where no targets are provided.
+        targets = []
+        networks = []
         for system in systems:
-            # Process the provided list of high-value targets.
-            # TODO: add code to handle situations where no targets are provided.
             for target in system["targets"]:
-                # Build a task list based on the target type (e.g., machine or persona).
                 match target["type"]:
                     case "machine":
-                        address = target["address"]
-                        goal = target["goals"][0]
-                        task_list = self.__get_task_list(scenario, address, goal)
+                        targets.append(target)
+                    case "network":
+                        networks.append(target)
                     case _:
-                        return None
-
-            # Task the HADES agents.
-            # TODO: add code to trace the following activity.
-            self.user_proxy.initiate_chats(
-                chat_queue=task_list,
+                        self.logger.warning(f"skipping a target of type '{target['type']}' (Inject #{inject_id})")
+
+        # Task a separate pair of HADES agents per target so independent targets are worked concurrently.
+        # The context (and so, the inject's span) is copied into each worker so their spans are nested under it.
+        with tracer.span(
+            "inject",
+            inject_id=inject_id,
+            inject_name=inject_name,
+            targets=len(targets),
+            networks=len(networks),
+        ):
+            with ThreadPoolExecutor(max_workers=TARGET_PARALLELISM, thread_name_prefix=f"hades-{inject_id}") as executor:
+                futures = {}
+                tasked = set()
+                lock = Lock()
+                context = copy_context()
+
+                def task_target(target: dict) -> None:
+                    # Hosts can be listed (or discovered) more than once but, are only worked once.
+                    with lock:
+                        if target["address"] in tasked:
+                            return
+                        tasked.add(target["address"])
+                        # Discovered hosts are found by other threads so, use (a copy of) the inject's context.
+                        future = executor.submit(context.copy().run, self.__work_target, scenario, target, use_cache)
+                        futures[future] = target["address"]
+
+                for target in targets:
+                    task_target(target)
+
+                # Sweep each network and task every host found as soon as it is found (i.e., while the sweep goes on).
+                for network in networks:
+                    self.logger.debug(f"discovering the hosts of {network['address']} (Inject #{inject_id})")
+                    try:
+                        hosts = discover_hosts(
+                            network["address"],
+                            on_host=lambda address: task_target({**network, "type": "machine", "address": address}),
+                        )
+                        self.logger.info(f"found {len(hosts)} hosts on {network['address']} (Inject #{inject_id})")
+                    except Exception as e:
+                        self.logger.error(
+                            f"failed to discover the hosts of {network['address']} (Inject #{inject_id}): {e}"
+                        )
+
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.logger.error(f"failed to work {futures[future]} (Inject #{inject_id}): {e}")
+
+    def __work_target(self, scenario: dict, target: dict, use_cache: bool) -> None:
+        """Works the tasks of a target's goal (each with its own HADES planner and operator) per the task graph.
+        """
+        address = target["address"]
+        goal = target["goals"][0]
+        if goal not in task_graph.plans:
+            self.logger.warning(f"skipping {address} because '{goal}' is not a known goal")
+            return
+        with tracer.span("target", target=address, goal=goal):
+            self.logger.debug(f"tasking the HADES agents with '{goal}' against {address}")
+            task_graph.run(
+                goal=goal,
+                context={"scenario": scenario, "target": address},
+                new_agents=lambda: self.agent_factory.new_agents(self.output_method, self.rabbitmq_client, use_cache),
+                max_workers=TASK_PARALLELISM,
             )
-        self.logger.info(f"ending '{inject_name}' (Inject #{inject_id})")
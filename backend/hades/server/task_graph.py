@@ -0,0 +1,143 @@
+"""Defines a graph of tasks (and the order they can be run in) for each goal HADES agents can be given."""
+
+# Standard library imports.
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Set, Tuple
+
+# Third-party imports.
+from autogen.agentchat import ChatResult, initiate_chats
+
+# Local imports.
+from hades.agents import HadesOperator, HadesPlanner
+from hades.core import tracer
+
+
+@dataclass(frozen=True)
+class Task:
+    """A chat between a planner and an operator, and the tasks whose results it needs.
+
+    Attributes:
+        get_chat (Callable): Returns the chat (as Autogen's `initiate_chats` expects it) given the sender, recipient, and
+            the value of the task's argument.
+        argument (str): Key of the value (e.g., "target" or "scenario") the chat is about.
+        needs (tuple[str, ...]): Names of the tasks that must finish first (and whose summaries are carried over).
+    """
+    get_chat: Callable[[HadesPlanner, HadesOperator, Any], Dict[str, Any]]
+    argument: str = "target"
+    needs: Tuple[str, ...] = ()
+
+
+class TaskGraph:
+    """Compiles (and validates) the tasks of every goal once so they can be run as soon as what they need is done.
+
+    Each task is worked by its own planner and operator so, tasks that do not depend on each other (e.g., detecting the
+    operating system and enumerating service versions once the open ports are known) run concurrently. A task is given
+    the summaries of the tasks it depends on (directly or not) instead of every conversation before it.
+
+    Args:
+        tasks (dict[str, Task]): Every task, by name.
+        goals (dict[str, Sequence[str]]): Tasks worked toward each goal (the tasks they need are included).
+
+    Raises:
+        ValueError: If a task needs one that does not exist or tasks need each other (i.e., there is a cycle).
+    """
+    def __init__(self, tasks: Dict[str, Task], goals: Dict[str, Sequence[str]]):
+        self.tasks = tasks
+        self.ancestors: Dict[str, Tuple[str, ...]] = {}
+        self.plans: Dict[str, Tuple[str, ...]] = {}
+
+        order = self.__sort(list(tasks))
+        for name in order:
+            ancestors = {ancestor for need in tasks[name].needs for ancestor in (need, *self.ancestors[need])}
+            self.ancestors[name] = tuple(task for task in order if task in ancestors)
+        for goal, names in goals.items():
+            unknown = [name for name in names if name not in tasks]
+            if unknown:
+                raise ValueError(f"the '{goal}' goal uses unknown tasks: {', '.join(unknown)}")
+            included = {task for name in names for task in (name, *self.ancestors[name])}
+            self.plans[goal] = tuple(task for task in order if task in included)
+
+    def __sort(self, names: List[str]) -> List[str]:
+        # Order the tasks so each one comes after every task it needs (keeping the order they were declared in).
+        order: List[str] = []
+        visiting: Set[str] = set()
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"tasks need each other: {' -> '.join(path + (name,))}")
+            if name not in self.tasks:
+                raise ValueError(f"the '{path[-1]}' task needs an unknown task: {name}")
+            visiting.add(name)
+            for need in self.tasks[name].needs:
+                visit(need, path + (name,))
+            visiting.discard(name)
+            order.append(name)
+
+        for name in names:
+            visit(name, ())
+        return order
+
+    def run(
+        self,
+        goal: str,
+        context: Dict[str, Any],
+        new_agents: Callable[[], Tuple[HadesPlanner, HadesOperator]],
+        max_workers: int,
+    ) -> Dict[str, ChatResult]:
+        """Works every task of a goal, starting each one as soon as the tasks it needs are done.
+
+        Args:
+            goal (str): Name of the goal.
+            context (dict): Values the tasks are about (e.g., the target and the scenario).
+            new_agents (Callable): Returns a new planner and operator (for a single task).
+            max_workers (int): Maximum number of tasks worked at once.
+
+        Raises:
+            Exception: The first error a task raised (tasks that were not started yet are skipped).
+
+        Returns:
+            dict[str, ChatResult]. The result of each task.
+
+        """
+        plan = self.plans.get(goal, ())
+        results: Dict[str, ChatResult] = {}
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hades-task") as executor:
+            pending = list(plan)
+            while pending or running:
+                # Start every task whose needs are met (in the context of the target so, spans and IDs carry over).
+                for name in [name for name in pending if all(need in results for need in self.tasks[name].needs)]:
+                    pending.remove(name)
+                    carryover = [results[ancestor].summary for ancestor in self.ancestors[name]]
+                    future = executor.submit(copy_context().run, self.__run_task, name, context, new_agents, carryover)
+                    running[future] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        # Let the tasks already started finish but, do not start any others.
+                        for other in running:
+                            other.cancel()
+                        wait(running)
+                        raise
+        return results
+
+    def __run_task(
+        self,
+        name: str,
+        context: Dict[str, Any],
+        new_agents: Callable[[], Tuple[HadesPlanner, HadesOperator]],
+        carryover: List[str],
+    ) -> ChatResult:
+        task = self.tasks[name]
+        with tracer.span("task", task=name):
+            planner, operator = new_agents()
+            chat = task.get_chat(planner, operator, context[task.argument])
+            return initiate_chats([{**chat, "carryover": carryover}])[0]
@@ -1,10 +1,7 @@
-"""Defines a HADES Server."""
-
-# Standard libary imports.
-from typing import List
+"""Defines the tasks HADES agents can be given and which goals they are worked toward."""
 
 # Local imports.
-from hades.agents import HadesAgent
+from .task_graph import Task, TaskGraph
 from hades.tasks.impact import shutdown
 from hades.tasks.initial_access import (
     demo,
@@ -21,29 +18,29 @@ from hades.tasks.reconnaissance import (
     get_vulnerabilities,
 )
 
-def get_task_matrix(scenario: dict, sender: HadesAgent, recipient: HadesAgent, target: str):
-    """Defines a matrix of tasks and subtasks that can be executed by a HADES agent.
+# Each task is started as soon as the tasks it needs are done (so, for example, the operating system, service versions,
+# and vulnerabilities are enumerated at the same time once the open ports are known).
+TASKS = {
+    "scenario": Task(get_scenario, argument="scenario"),
+    "exploitation_status": Task(get_exploitation_status, needs=("scenario",)),
+    "open_ports": Task(get_open_ports, needs=("scenario",)),
+    "service_versions": Task(get_service_versions, needs=("open_ports",)),
+    "vulnerabilities": Task(get_vulnerabilities, needs=("open_ports",)),
+    "operating_system": Task(get_operating_system, needs=("open_ports",)),
+    "exploit": Task(
+        get_exploit,
+        needs=("exploitation_status", "service_versions", "vulnerabilities", "operating_system"),
+    ),
+    # A payload is only chosen once the exploit (which it has to be compatible with) is known.
+    "payload": Task(get_payload, needs=("exploit",)),
+    "initial_access": Task(get_initial_access, needs=("payload", "exploit")),
+    "shutdown": Task(shutdown, needs=("initial_access",)),
+}
+
+GOALS = {
+    "scan": ["service_versions"],
+    "shutdown": ["shutdown"],
+}
 
-    Returns:
-        Dict.
-    
-    """
-    return {
-        "scan": [
-            get_scenario(sender, recipient, scenario),
-            get_open_ports(sender, recipient, target),
-            get_service_versions(sender, recipient, target),  
-        ],
-        "shutdown": [
-            get_scenario(sender, recipient, scenario),
-            get_exploitation_status(sender, recipient, target),
-            get_open_ports(sender, recipient, target),
-            get_service_versions(sender, recipient, target),  
-            get_vulnerabilities(sender, recipient, target),
-            get_operating_system(sender, recipient, target),
-            get_payload(sender, recipient, target),
-            get_exploit(sender, recipient, target),
-            get_initial_access(sender, recipient, target),
-            shutdown(sender, recipient, target),
-        ],
-    }
\ No newline at end of file
+# Compiled (and validated) once, when the server is imported.
+task_graph = TaskGraph(tasks=TASKS, goals=GOALS)
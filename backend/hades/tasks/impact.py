@@ -13,5 +13,5 @@ def shutdown(
         "clear_history": False,
         "message": f"Shutdown {target} if you were successful in gaining access to it.",
         "max_turns": 3,
-        "summmary_method": "reflection_with_llm",
+        "summary_method": "reflection_with_llm",
     }
\ No newline at end of file
@@ -15,4 +15,6 @@ def get_scenario(
         "clear_history": False,
         "message": message,
         "max_turns": 1,
+        # Carry the scenario itself (instead of the reply to it) over to the tasks that follow.
+        "summary_method": lambda sender, recipient, summary_args: message,
     }
@@ -35,7 +35,7 @@ def get_operating_system(
         "clear_history": False,
         "message": f"Enumerate which operating system {target} is running. Limit your enumeration activity to what has already been discovered.",
         "max_turns": 2,
-        "summmary_method": "reflection_with_llm",
+        "summary_method": "reflection_with_llm",
     }
 
 def get_service_versions(
@@ -47,7 +47,7 @@ def get_service_versions(
         "clear_history": False,
         "message": f"Enumerate the service versions running on {target}. Limit your enumeration activity to what has already been discovered.",
         "max_turns": 2,
-        "summmary_method": "reflection_with_llm",
+        "summary_method": "reflection_with_llm",
     }
 
 def get_vulnerabilities(
@@ -59,5 +59,5 @@ def get_vulnerabilities(
         "clear_history": False,
         "message": f"Enumerate {target} for vulnerabilities. Limit your enumeration activity to what has already been discovered.",
         "max_turns": 2,
-        "summmary_method": "reflection_with_llm",
+        "summary_method": "reflection_with_llm",
     }
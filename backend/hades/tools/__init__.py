@@ -1,5 +1,5 @@
 from .bash import bash
 from .hydra import hydra
-from .metasploit import msfconsole
+from .metasploit import get_payload_index, msfconsole, msfconsole_pool
 from .nmap import nmap
 from .ssh import ssh
\ No newline at end of file
@@ -1 +1,2 @@
-from .msfconsole import msfconsole
\ No newline at end of file
+from .msfconsole import msfconsole, msfconsole_pool
+from .payloads import get_payload_index
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""Defines a pool of long-lived Msfconsole processes."""
+
+# Standard library imports.
+import re
+from os import killpg
+from queue import Empty, Queue
+from signal import SIGKILL
+from subprocess import PIPE, Popen, STDOUT
+from threading import Lock, Thread
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+# Local imports.
+from hades.core import tracer
+
+# e.g., "[*] Command shell session 3 opened (10.0.0.1:4444 -> 10.0.0.5:41234) at 2024-01-01 00:00:00 +0000".
+SESSION_OPENED_PATTERN = re.compile(r"session (\d+) opened \(\S+ -> \[?([^\]\s]+?)\]?:\d+\)")
+
+
+class MsfconsoleWorker:
+    """Wraps a single Msfconsole process that is kept alive between commands.
+
+    Args:
+        name (str): Name used to identify the worker in logs.
+        boot_timeout (float): Seconds to wait for Msfconsole to finish booting.
+
+    Attributes:
+        process (Popen): The Msfconsole process (None until the worker is started).
+        workspace (str): The Metasploit workspace the console is currently using.
+        lock (Lock): Held while a command is being executed by the worker.
+    """
+    def __init__(self, name: str, boot_timeout: float):
+        self.name = name
+        self.boot_timeout = boot_timeout
+        self.process: Optional[Popen] = None
+        self.workspace: Optional[str] = None
+        self.lock = Lock()
+        self.__lines: Queue = Queue()
+
+    def __read_stdout(self, process: Popen) -> None:
+        # Copy every line Msfconsole prints into a queue so reads can time out.
+        for line in process.stdout:
+            self.__lines.put(line)
+        self.__lines.put(None)
+
+    def is_alive(self) -> bool:
+        """Returns True if the Msfconsole process is running."""
+        return (self.process is not None) and (self.process.poll() is None)
+
+    def start(self) -> None:
+        """Starts Msfconsole and waits for it to finish booting."""
+        self.stop()
+        self.__lines = Queue()
+        self.workspace = None
+        self.process = Popen(
+            ["msfconsole", "-q"],
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=STDOUT,
+            text=True,
+            bufsize=1,
+            start_new_session=True,
+        )
+        Thread(target=self.__read_stdout, args=(self.process,), daemon=True).start()
+
+        # Msfconsole does not read stdin until it has booted so, the first echo doubles as a readiness check.
+        self.execute([], timeout=self.boot_timeout)
+
+    def stop(self) -> None:
+        """Kills the Msfconsole process (and anything it spawned)."""
+        if self.is_alive():
+            try:
+                killpg(self.process.pid, SIGKILL)
+            except ProcessLookupError:
+                pass
+            self.process.wait()
+        self.process = None
+
+    def execute(self, commands: List[str], timeout: float, max_output: Optional[int] = None) -> str:
+        """Executes the given commands and returns everything Msfconsole printed while doing so (up to `max_output`
+        characters).
+
+        Raises:
+            RuntimeError: If Msfconsole exits or does not finish before the timeout.
+
+        """
+        if not self.is_alive():
+            raise RuntimeError(f"{self.name} is not running")
+
+        # Msfconsole passes unknown commands to the shell so, echo a unique marker to know when the output ends.
+        sentinel = f"HADES-{uuid4().hex}"
+        self.process.stdin.write("\n".join(commands + [f"echo {sentinel}"]) + "\n")
+        self.process.stdin.flush()
+
+        output = []
+        size, dropped = 0, 0
+        deadline = monotonic() + timeout
+        while True:
+            try:
+                line = self.__lines.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                self.stop()
+                raise RuntimeError(f"{self.name} did not respond within {timeout} seconds")
+            if line is None:
+                self.stop()
+                raise RuntimeError(f"{self.name} exited unexpectedly")
+            if line.strip().endswith(sentinel):
+                if line.strip() == sentinel:
+                    break
+                # Skip the "[*] exec: echo ..." line Msfconsole prints before running the shell command.
+                continue
+
+            # Keep reading (so the console does not block) but stop keeping output once the limit is reached.
+            if (max_output is not None) and (size + len(line) > max_output):
+                dropped += len(line)
+                continue
+            output.append(line)
+            size += len(line)
+
+        if dropped > 0:
+            output.append(f"[{dropped} characters of output were discarded]\n")
+        return "".join(output)
+
+    def is_healthy(self, timeout: float = 30) -> bool:
+        """Returns True if the Msfconsole process is running and responsive."""
+        if not self.is_alive():
+            return False
+        try:
+            return "Framework" in self.execute(["version"], timeout=timeout)
+        except RuntimeError:
+            return False
+
+
+class MsfconsolePool:
+    """Dispatches Metasploit commands to a fixed number of long-lived Msfconsole workers.
+
+    Booting Msfconsole takes tens of seconds so, workers are started once and reused. Each inject is pinned
+    to the worker that first served it because the sessions it opens only exist inside that process. Sessions are
+    global to a worker (not scoped to a workspace) so, the pool remembers which sessions each workspace opened (and
+    forgets them when the worker stops, since they end with its process).
+
+    Args:
+        size (int): Number of Msfconsole workers to keep alive.
+        boot_timeout (float): Seconds to wait for a worker to finish booting.
+        command_timeout (float): Seconds to wait for a batch of commands to finish.
+        max_output (int): Maximum number of characters of output to return per batch of commands.
+    """
+    def __init__(self, size: int, boot_timeout: float, command_timeout: float, max_output: int):
+        self.command_timeout = command_timeout
+        self.max_output = max_output
+        self.workers = [MsfconsoleWorker(f"msfconsole-{i}", boot_timeout) for i in range(size)]
+        self.__assignments: Dict[str, MsfconsoleWorker] = {}
+        self.__sessions: Dict[str, List[Tuple[int, str]]] = {}
+        self.__lock = Lock()
+
+    def warm(self) -> None:
+        """Starts every worker in the background so the first inject does not pay for booting Msfconsole."""
+        def _start(worker: MsfconsoleWorker):
+            with worker.lock:
+                if not worker.is_alive():
+                    self.__forget_sessions(worker)
+                    try:
+                        worker.start()
+                    except (OSError, RuntimeError):
+                        # The worker will be started again the next time it is used.
+                        worker.stop()
+
+        for worker in self.workers:
+            Thread(target=_start, args=(worker,), daemon=True).start()
+
+    def health_check(self) -> Dict[str, bool]:
+        """Returns the health of every idle worker, restarting any that are unhealthy."""
+        health = {}
+        for worker in self.workers:
+            if not worker.lock.acquire(blocking=False):
+                # Busy workers are, by definition, responsive.
+                health[worker.name] = True
+                continue
+            try:
+                if not worker.is_healthy():
+                    self.__forget_sessions(worker)
+                    worker.start()
+                health[worker.name] = worker.is_alive()
+            except (OSError, RuntimeError):
+                health[worker.name] = False
+            finally:
+                worker.lock.release()
+        return health
+
+    def __get_worker(self, workspace: str) -> MsfconsoleWorker:
+        with self.__lock:
+            if workspace not in self.__assignments:
+                # Pin the workspace to the least busy worker (idle first, then the one serving the fewest workspaces).
+                load = {worker.name: 0 for worker in self.workers}
+                for assigned in self.__assignments.values():
+                    load[assigned.name] += 1
+                self.__assignments[workspace] = min(
+                    self.workers,
+                    key=lambda worker: (worker.lock.locked(), load[worker.name]),
+                )
+            return self.__assignments[workspace]
+
+    def release(self, workspace: str) -> None:
+        """Unpins the given workspace from its worker (and forgets the sessions it opened)."""
+        with self.__lock:
+            self.__assignments.pop(workspace, None)
+            self.__sessions.pop(workspace, None)
+
+    def __forget_sessions(self, worker: MsfconsoleWorker) -> None:
+        # Forget the sessions of every workspace pinned to a worker whose process stopped (they ended with it).
+        with self.__lock:
+            for workspace, assigned in self.__assignments.items():
+                if assigned is worker:
+                    self.__sessions.pop(workspace, None)
+
+    def get_sessions(self, workspace: str) -> List[int]:
+        """Returns the IDs of the sessions the given workspace opened (oldest first).
+
+        Returns:
+            list[int].
+
+        """
+        with self.__lock:
+            return [session for session, _ in self.__sessions.get(workspace, [])]
+
+    def find_session(self, workspace: str, address: Optional[str] = None) -> Optional[int]:
+        """Returns the ID of the latest session the given workspace opened (on the given address if specified).
+
+        Returns:
+            int.
+
+        """
+        with self.__lock:
+            sessions = self.__sessions.get(workspace, [])
+            matches = [session for session, remote in sessions if (address is None) or (remote == address)]
+            return matches[-1] if matches else None
+
+    def execute(self, commands: List[str], workspace: str) -> str:
+        """Executes the given commands within the given workspace, (re)starting the worker if necessary.
+
+        Returns:
+            str.
+
+        """
+        worker = self.__get_worker(workspace)
+        with tracer.span("msfconsole", command="msfconsole", workspace=workspace, worker=worker.name), worker.lock:
+            if not worker.is_alive():
+                self.__forget_sessions(worker)
+                worker.start()
+
+            try:
+                # Switch to the inject's workspace (creating it if it does not exist yet).
+                if worker.workspace != workspace:
+                    worker.execute(
+                        [f"workspace -a {workspace}", f"workspace {workspace}"],
+                        timeout=self.command_timeout,
+                    )
+                    worker.workspace = workspace
+
+                # Leave the module context afterwards so the next caller starts from a clean prompt.
+                output = worker.execute(commands + ["back"], timeout=self.command_timeout, max_output=self.max_output)
+            except RuntimeError:
+                # The worker stops when a command times out (or it exits) so, its sessions are gone.
+                self.__forget_sessions(worker)
+                raise
+
+        # Remember which sessions the workspace opened (and on which address).
+        opened = [(int(session), remote) for session, remote in SESSION_OPENED_PATTERN.findall(output)]
+        if opened:
+            with self.__lock:
+                self.__sessions.setdefault(workspace, []).extend(opened)
+        return output
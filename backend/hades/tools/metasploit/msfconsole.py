@@ -1,112 +1,162 @@
 """Defines Msfconsole as a HADES agent tool."""
 
 # Standard library imports.
-from logging import Logger
-from subprocess import PIPE, Popen, STDOUT
-from typing import Annotated, List
+import re
+from typing import Annotated, List, Optional
 
 # Local imports.
+from .console_pool import MsfconsolePool
 from .msfconsole_args import MsfconsoleArgs
-from .payloads import get_payloads
-from hades.core import get_logger, get_timestamp
+from .payloads import query_payloads
+from hades.core import (
+    get_logger,
+    get_timestamp,
+    INJECT_ID,
+    MSFCONSOLE_BOOT_TIMEOUT,
+    MSFCONSOLE_COMMAND_TIMEOUT,
+    MSFCONSOLE_POOL_SIZE,
+    TOOL_MAX_OUTPUT_BYTES,
+)
+from hades.knowledge import knowledge_store
+
+# e.g., "  3         shell x86/linux               10.0.0.1:4444 -> 10.0.0.5:41234 (10.0.0.5)".
+SESSION_ROW_PATTERN = re.compile(r"^\s*(\d+)\s")
+
+# Init a pool of long-lived Msfconsole processes shared by every inject.
+msfconsole_pool = MsfconsolePool(
+    size=MSFCONSOLE_POOL_SIZE,
+    boot_timeout=MSFCONSOLE_BOOT_TIMEOUT,
+    command_timeout=MSFCONSOLE_COMMAND_TIMEOUT,
+    max_output=TOOL_MAX_OUTPUT_BYTES,
+)
+
+# Init a logger for the tool itself (once, instead of on every call).
+logger = get_logger(name="msfconsole", format="json")
+
+def filter_sessions(output: str, session_ids: List[int]) -> Optional[str]:
+    """Removes the rows of sessions not listed from the output of Msfconsole's "sessions" command.
+
+    Returns:
+        str. None if none of the sessions listed are still open.
+
+    """
+    lines, kept = [], 0
+    for line in output.splitlines(keepends=True):
+        match = SESSION_ROW_PATTERN.match(line)
+        if match is not None:
+            if int(match.group(1)) not in session_ids:
+                continue
+            kept += 1
+        lines.append(line)
+    return "".join(lines) if kept > 0 else None
 
 def msfconsole(args: Annotated[MsfconsoleArgs, "Metasploit arguments."]) -> str:
     """Metasploit is a tool used for exploiting cyber security vulnerabilities.
-    
+
     Returns:
         str.
 
     """
-    # Init a logger for the tool itself.
-    logger = get_logger(name="msfconsole", format="json")
-
     # Init an array to store the commands the tool will execute.
     commands = []
 
     def msfcli(commands: List[str]) -> str:
-        # Assemble the command sentence.
-        cli = ["msfconsole", "-q", "-x"]
-        cli.append(" ".join(commands))
-
         # Log the command sentence.
-        logger.info(f"executing '{' '.join(commands)}'")
-
-        # Execute the command sentence (an array of strings).
-        process = Popen(cli, stderr=STDOUT, stdout=PIPE, text=True)
+        logger.info(f"executing '{'; '.join(commands)}'")
 
-        # Save the stdout and stderr of the command to a variable. 
-        stdout, stderr = process.communicate()
+        # Dispatch the commands to the Msfconsole worker pinned to this inject.
+        try:
+            output = msfconsole_pool.execute(commands, workspace=INJECT_ID.get())
+        except RuntimeError as error:
+            logger.error(str(error))
+            raise
 
-        # Log any errors the command produced.
-        if stderr is not None:
-            logger.error(stderr)
-
-        # TODO: limit character count to meet LLM input requirements.
-        return stdout
+        return output
 
     # Check if the "sessions" command was requested.
     if args.sessions is True:
-        commands.append("sessions; exit;")
-        output = msfcli(commands)
-        if "No active sessions." in output:
+        # Only list the sessions this inject opened (other injects may have sessions on the same console).
+        session_ids = msfconsole_pool.get_sessions(INJECT_ID.get())
+        output = msfcli(["sessions"]) if session_ids else ""
+        output = filter_sessions(output, session_ids)
+        if output is None:
             timestamp = get_timestamp()
             return f"As of {timestamp}, we have no sessions open on {args.rhosts}."
         return output
 
     # Check if the "show payloads" command was requested.
     if args.showPayloads is True:
-        # Set the command.
-        return get_payloads()
+        # Look up the matching payloads in the payload index (instead of asking Msfconsole).
+        return query_payloads(
+            platform=args.payloadPlatform,
+            arch=args.payloadArch,
+            handler=args.payloadHandler,
+            session=args.payloadSession,
+            page=args.page,
+        )
 
     # Check if shutdown was requested.
     if args.shutdown is True:
-        commands.append("sessions -i 1 -c 'shutdown now'; exit -y;") 
+        # Only use a session this inject opened (other injects may have sessions on the same console).
+        session = msfconsole_pool.find_session(INJECT_ID.get(), args.rhosts)
+        if session is None:
+            return f"No session has been opened on {args.rhosts or 'the target'} during this inject."
+        commands.append(f"sessions -i {session} -c 'shutdown now'")
         return msfcli(commands)
 
-    # Check if a payload was specified.
-    if args.payload is not None:
-
-        # Check if showing the payload's options was requested.
-        if args.showPayloadOptions is True:
-            # Set the command.
-            commands.append(f"use '{args.payload}'; show options; exit;")
-            return msfcli(commands)
-        
-        commands.append(f"set PAYLOAD '{args.payload}';")
-
-        # Check if specific exploit options were requested.
-        if args.options is not None:
-            for option, value in args.options.items():
-                commands.append(f"set {option} '{value}';")
+    # Check if showing the payload's options was requested.
+    if (args.payload is not None) and (args.showPayloadOptions is True):
+        # Set the command.
+        commands.append(f"use '{args.payload}'")
+        commands.append("show options")
+        return msfcli(commands)
 
     # Define the exploit module to use.
     if args.exploit is not None:
 
-        # Check if the "show payloads" command was requested.
+        # Check if showing the exploit's options was requested.
         if args.showExploitOptions is True:
             # Set the command.
-            commands.append(f"use '{args.exploit}'; show options; exit;")
+            commands.append(f"use '{args.exploit}'")
+            commands.append("show options")
             return msfcli(commands)
-        
-        commands.append(f"use '{args.exploit}';")
+
+        commands.append(f"use '{args.exploit}'")
+
+    # Check if a payload was specified.
+    # NOTE: the payload is set after the exploit is selected so it is scoped to the exploit (not the long-lived console).
+    if args.payload is not None:
+        commands.append(f"set PAYLOAD '{args.payload}'")
+
+        # Check if specific exploit options were requested.
+        if args.options is not None:
+            for option, value in args.options.items():
+                commands.append(f"set {option} '{value}'")
 
     # Set the target IP address.
     if args.rhosts is not None:
-        commands.append(f"set RHOSTS '{args.rhosts}';")
+        commands.append(f"set RHOSTS '{args.rhosts}'")
 
     # Set the target port.
     if args.rport is not None:
-        commands.append(f"set RPORT '{args.rport}';")
+        commands.append(f"set RPORT '{args.rport}'")
 
     # Set the IP address to listen on.
     if args.lhost is not None:
-        commands.append(f"set LHOST '{args.lhost}';")
+        commands.append(f"set LHOST '{args.lhost}'")
 
     # Set the port to listen on.
     if args.lport is not None:
-        commands.append(f"set LPORT '{args.lport}';")
+        commands.append(f"set LPORT '{args.lport}'")
+
+    # Note the exploit and payload chosen for the target (e.g., so agents keep them in mind however long the chat gets).
+    if args.rhosts is not None:
+        for rhost in args.rhosts.replace(",", " ").split():
+            for key, value in (("exploit", args.exploit), ("payload", args.payload)):
+                if value is not None:
+                    knowledge_store.record_note(INJECT_ID.get(), rhost, key, value)
 
     # Add the "exploit" command.
-    # NOTE: the keyword 'exploit' will not be recognized by Metasploit if an invalid exploit and/or payload is given. 
-    commands.append("run -z; exit -y;") 
+    # NOTE: the keyword 'exploit' will not be recognized by Metasploit if an invalid exploit and/or payload is given.
+    commands.append("run -z")
     return msfcli(commands)
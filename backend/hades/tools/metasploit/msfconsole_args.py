@@ -83,4 +83,41 @@ class MsfconsoleArgs(BaseModel):
     shutdown: Annotated[
         bool,
         Field(default=False, description="Shutdown the machine we have access to."),
-    ]
\ No newline at end of file
+    ]
+
+    payloadPlatform: Annotated[
+        str,
+        Field(
+            default=None,
+            description="Only show payloads for this platform when showing payloads, e.g., 'linux' or 'windows'."
+        ),
+    ]
+
+    payloadArch: Annotated[
+        str,
+        Field(
+            default=None,
+            description="Only show payloads for this architecture when showing payloads, e.g., 'x86' or 'x64'."
+        ),
+    ]
+
+    payloadHandler: Annotated[
+        str,
+        Field(
+            default=None,
+            description="Only show payloads using this handler when showing payloads, e.g., 'reverse_tcp' or 'bind_tcp'."
+        ),
+    ]
+
+    payloadSession: Annotated[
+        str,
+        Field(
+            default=None,
+            description="Only show payloads opening this type of session when showing payloads, e.g., 'meterpreter' or 'command_shell'."
+        ),
+    ]
+
+    page: Annotated[
+        int,
+        Field(default=1, description="The page of payloads to show when showing payloads."),
+    ]
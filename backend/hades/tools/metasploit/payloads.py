@@ -1,33 +1,67 @@
 import os
 import re
 import json
-from typing import List
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from multiprocessing import get_context
+from threading import Lock
+from typing import Dict, List, Optional, Set
 
-def get_payload_filepaths(payloads_dir: str = "/opt/metasploit-framework/embedded/framework/modules/payloads/") -> List[str]:
+PAYLOADS_DIR = "/opt/metasploit-framework/embedded/framework/modules/payloads/"
+PAYLOAD_INDEX_PATH = os.environ.get(
+    "METASPLOIT_PAYLOAD_INDEX",
+    os.path.join(os.path.expanduser("~"), ".cache", "hades", "payloads.json"),
+)
+
+# Bumped whenever what the index stores changes (so indexes built by older versions are rebuilt).
+PAYLOAD_INDEX_VERSION = 2
+
+# Names LLMs (and people) use for platforms and architectures mapped to the ones Metasploit payloads declare.
+PLATFORM_ALIASES = {
+    "darwin": "osx",
+    "ios": "apple_ios",
+    "mac": "osx",
+    "macos": "osx",
+    "windows": "win",
+}
+ARCH_ALIASES = {
+    "amd64": "x64",
+    "arm64": "aarch64",
+    "i386": "x86",
+    "i686": "x86",
+    "x86_64": "x64",
+}
+
+# The payload index is loaded (and checked against the payload directory) at most once per process.
+_index: Optional[dict] = None
+_index_lock = Lock()
+
+def get_payload_filepaths(payloads_dir: str = PAYLOADS_DIR) -> List[str]:
     """Returns the filepath of every payload in the Metasploit payload directory specified.
-    
+
     Returns:
         List.
-    
+
     """
     payload_filenames = []
     for root, _, files in os.walk(payloads_dir):
         for file in files:
-            if file.endswith(".rb"): 
+            if file.endswith(".rb"):
                 payload_filenames.append(os.path.join(root, file))
     return payload_filenames
 
 def get_payload_metadata(filepath) -> dict[str, str]:
     """Parses the given Metasploit payload for metadata.
-    
+
     Returns:
         Dict.
-    
+
     """
     # Open the file at the filepath given and copy it's contents into memory.
     with open(filepath, encoding="utf-8", mode="r") as buffer:
         payload = buffer.read()
-    
+
     # Save the payload's metadata fields to variables.
     name_match = re.search(r"'Name'\s*=>\s*'([^']+)'", payload)
     description_match = re.search(r"'Description'\s*=>\s*'([^']+)'", payload)
@@ -36,6 +70,7 @@ def get_payload_metadata(filepath) -> dict[str, str]:
     handler_match = re.search(r"'Handler'\s*=>\s*([^,]+)", payload)
     session_match = re.search(r"'Session'\s*=>\s*([^,]+)", payload)
     payload_type_match = re.search(r"'PayloadType'\s*=>\s*'([^']+)'", payload)
+    convention_match = re.search(r"'Convention'\s*=>\s*'([^']+)'", payload)
 
     # Init a dict containing the payload's metadata.
     payload_metadata = {
@@ -45,20 +80,178 @@ def get_payload_metadata(filepath) -> dict[str, str]:
         "arch": arch_match.group(1) if arch_match else None,
         "handler": handler_match.group(1) if handler_match else None,
         "session": session_match.group(1).strip() if session_match else None,
-        "payload_type": payload_type_match.group(1) if payload_type_match else None
+        "payload_type": payload_type_match.group(1) if payload_type_match else None,
+        "convention": convention_match.group(1) if convention_match else None,
     }
 
     # Remove fields that null and return the resulting dict.
     return {key: value for key, value in payload_metadata.items() if value is not None}
 
+def get_payloads_signature(payloads_dir: str = PAYLOADS_DIR) -> str:
+    """Returns a hash of the path and modification time of every file and folder in the payload directory given.
+
+    Returns:
+        Str.
+
+    """
+    signature = sha256()
+    for root, dirs, files in os.walk(payloads_dir):
+        dirs.sort()
+        for name in [root] + [os.path.join(root, file) for file in sorted(files) if file.endswith(".rb")]:
+            signature.update(f"{name}:{os.stat(name).st_mtime_ns}\n".encode())
+    return signature.hexdigest()
+
+def get_payload_modules(filepaths: List[str], payloads: List[dict], payloads_dir: str = PAYLOADS_DIR) -> List[dict]:
+    """Returns every payload Msfconsole accepts, tagged with the name it is referenced by.
+
+    Singles are referenced by their path (e.g., "singles/linux/x86/shell_bind_tcp.rb" is "linux/x86/shell_bind_tcp").
+    Staged payloads combine a stage and a stager of the same platform and architecture (e.g., "stages/linux/x86/
+    shell.rb" and "stagers/linux/x86/reverse_tcp.rb" are "linux/x86/shell/reverse_tcp") if their conventions match.
+
+    Returns:
+        List.
+
+    """
+    modules = []
+    stages, stagers = defaultdict(list), defaultdict(list)
+    for filepath, payload in zip(filepaths, payloads):
+        relpath = os.path.splitext(os.path.relpath(filepath, payloads_dir))[0].replace(os.sep, "/")
+        kind, _, module = relpath.partition("/")
+        directory, _, name = module.rpartition("/")
+        match kind:
+            case "singles":
+                payload.pop("convention", None)
+                modules.append({**payload, "refname": module})
+            case "stages":
+                stages[directory].append((name, payload))
+            case "stagers":
+                stagers[directory].append((name, payload))
+
+    for directory, directory_stages in stages.items():
+        for stage_name, stage in directory_stages:
+            for stager_name, stager in stagers.get(directory, []):
+                conventions = [set(payload.get("convention", "").split()) for payload in (stage, stager)]
+                if all(conventions) and not (conventions[0] & conventions[1]):
+                    continue
+                payload = {**stager, **stage}
+                payload.pop("convention", None)
+                payload["name"] = ", ".join(part["name"] for part in (stage, stager) if part.get("name"))
+                if stager.get("handler"):
+                    payload["handler"] = stager["handler"]
+                payload["refname"] = "/".join(part for part in (directory, stage_name, stager_name) if part)
+                modules.append(payload)
+    return sorted(modules, key=lambda payload: payload["refname"])
+
+def build_payload_index(payloads_dir: str = PAYLOADS_DIR, index_path: str = PAYLOAD_INDEX_PATH) -> dict:
+    """Parses every payload in the payload directory given (in parallel) and saves the results to disk.
+
+    Returns:
+        Dict.
+
+    """
+    filepaths = get_payload_filepaths(payloads_dir)
+
+    # Spawn (rather than fork) the workers because the backend is multi-threaded.
+    with ProcessPoolExecutor(mp_context=get_context("spawn")) as executor:
+        payloads = list(executor.map(get_payload_metadata, filepaths, chunksize=64))
+
+    index = {
+        "version": PAYLOAD_INDEX_VERSION,
+        "signature": get_payloads_signature(payloads_dir),
+        "payloads": get_payload_modules(filepaths, payloads, payloads_dir),
+    }
+
+    # Write the index to a temporary file first so readers never see a partially written index.
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(f"{index_path}.tmp", encoding="utf-8", mode="w") as buffer:
+        json.dump(index, buffer)
+    os.replace(f"{index_path}.tmp", index_path)
+    return index
+
+def get_payload_index(payloads_dir: str = PAYLOADS_DIR, index_path: str = PAYLOAD_INDEX_PATH) -> dict:
+    """Returns the payload index, (re)building it if it does not exist or is stale (when it is first asked for).
+
+    Returns:
+        Dict.
+
+    """
+    global _index
+    with _index_lock:
+        # Only the first call (made when the backend starts) checks whether the index on disk is stale.
+        if _index is not None:
+            return _index
+
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, encoding="utf-8", mode="r") as buffer:
+                    _index = json.load(buffer)
+            except (OSError, json.JSONDecodeError):
+                _index = None
+
+        stale = (_index is None) or (_index.get("version") != PAYLOAD_INDEX_VERSION)
+        if stale or (_index.get("signature") != get_payloads_signature(payloads_dir)):
+            _index = build_payload_index(payloads_dir, index_path)
+        return _index
+
+def get_tokens(value: str, aliases: Dict[str, str]) -> Set[str]:
+    """Returns the names in a platform or architecture (e.g., "[ARCH_X86, ARCH_X64]" gives {"x86", "x64"}).
+
+    Returns:
+        Set.
+
+    """
+    tokens = (token.removeprefix("arch_") for token in re.findall(r"[a-z0-9_]+", value.lower()))
+    return {aliases.get(token, token) for token in tokens}
+
+def query_payloads(
+    platform: Optional[str] = None,
+    arch: Optional[str] = None,
+    handler: Optional[str] = None,
+    session: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 10,
+) -> dict:
+    """Used for finding Metasploit payloads by platform, architecture, handler, and/or session type.
+
+    Platforms and architectures match whole names (so 'x86' does not match 'ARCH_X86_64') and common aliases are
+    understood (e.g., 'windows' for 'win' and 'amd64' for 'x64'). Handler and session filters ignore case and
+    underscores (so 'reverse_tcp' matches 'Msf::Handler::ReverseTcp') and match any part of the corresponding field.
+
+    Returns:
+        Dict.
+
+    """
+    tokens = {
+        field: get_tokens(value, aliases)
+        for field, value, aliases in (("platform", platform, PLATFORM_ALIASES), ("arch", arch, ARCH_ALIASES))
+        if value
+    }
+    normalize = lambda value: value.lower().replace("_", "")
+    filters = {field: normalize(value) for field, value in (("handler", handler), ("session", session)) if value}
+
+    matches = [
+        payload for payload in get_payload_index()["payloads"]
+        if all(
+            value <= get_tokens(payload.get(field) or "", PLATFORM_ALIASES if field == "platform" else ARCH_ALIASES)
+            for field, value in tokens.items()
+        )
+        and all(value in normalize(payload.get(field) or "") for field, value in filters.items())
+    ]
+
+    page = max(page, 1)
+    start = (page - 1) * page_size
+    return {
+        "total": len(matches),
+        "page": page,
+        "pages": (len(matches) + page_size - 1) // page_size,
+        "payloads": matches[start:start + page_size],
+    }
+
 def get_payloads() -> List[dict]:
     """Used for getting metadata about all of Metasploit's payloads.
-    
+
     Returns:
         List.
-    
+
     """
-    payloads = []
-    for payload_filepath in get_payload_filepaths():
-        payloads.append(get_payload_metadata(payload_filepath))
-    return payloads
+    return get_payload_index()["payloads"]
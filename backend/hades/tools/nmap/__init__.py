@@ -1 +1,2 @@
-from .nmap import nmap
\ No newline at end of file
+from .nmap import nmap, scan
+from .nmap_results import NmapHost, NmapPort, NmapReport
\ No newline at end of file
@@ -1,29 +1,58 @@
 """Defines Nmap as a HADES agent tool."""
 
 # Standard library imports.
-from subprocess import PIPE, Popen, STDOUT
-from typing import Annotated
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from ipaddress import ip_address
+from threading import Lock
+from time import monotonic
+from typing import Annotated, Callable, List, Optional, Set
+
+# Third-party imports.
+from autogen.io.base import IOStream
 
 # Local imports.
 from .nmap_args import NmapArgs
+from .nmap_results import NmapHost, NmapPort, NmapReport, NmapXmlParser
+from .nmap_shards import merge_reports, plan_shards
+from hades.core import (
+    get_timestamp,
+    INJECT_ID,
+    NMAP_MAX_SHARDS,
+    NMAP_PARALLELISM,
+    NMAP_SHARD_HOSTS,
+    NMAP_SHARD_PORTS,
+    run_command,
+    TOOL_MAX_OUTPUT_BYTES,
+    TOOL_TIMEOUT,
+)
+from hades.knowledge import knowledge_store
 
+# Called with each shard's arguments and report, and how many of the scan's shards are done (out of how many).
+ShardCallback = Callable[[NmapArgs, NmapReport, int, int], None]
+
+
+def get_command(args: NmapArgs) -> List[str]:
+    """Returns the Nmap command sentence that corresponds with the arguments given.
 
-def nmap(args: Annotated[NmapArgs, "Nmap arguments."]) -> str:
-    """Nmap is a tool used for enumerating and exploiting networks.
-    
     Returns:
-        str.
-    
-    """
+        List.
 
-    # Set the base command.
-    target = ",".join(args.target)
-    command = ["nmap", target]
+    """
+    # Set the base command (and have Nmap write XML to stdout). Each target is its own argument (Nmap only reads commas
+    # within an octet, like "10.0.0.1,2").
+    command = ["nmap"]
+    command.extend(args.target)
+    command.extend(["-oX", "-"])
 
     # Check if specific ports where specified.
     if (args.ports is not None) and (len(args.ports) > 0):
         port_range = ",".join(args.ports)
-        command.append(f"-p {port_range}")
+        command.extend(["-p", port_range])
+
+    # Check if only host discovery was requested.
+    if args.sn is True:
+        command.append("-sn")
 
     # Check if a service version scan was requested.
     if args.sV is True:
@@ -43,12 +72,227 @@ def nmap(args: Annotated[NmapArgs, "Nmap arguments."]) -> str:
     if (args.script_args is not None) and (len(args.script_args) > 0):
         scripts_args = ",".join(args.script_args)
         command.append(f"--script-args={scripts_args}")
+    return command
+
+def scan_shard(
+    args: NmapArgs,
+    on_host: Optional[Callable[[NmapHost], None]] = None,
+    timeout: float = TOOL_TIMEOUT,
+) -> NmapReport:
+    """Runs one Nmap process and parses its XML output as it is written.
+
+    Hosts finished before the timeout are still reported if Nmap has to be killed.
+
+    Returns:
+        NmapReport.
+
+    """
+    parser = NmapXmlParser(on_host=on_host)
+
+    # Execute the command, parsing each chunk of XML as soon as Nmap writes it (diagnostics go to stderr).
+    result = run_command(
+        get_command(args),
+        timeout=timeout,
+        max_output=TOOL_MAX_OUTPUT_BYTES,
+        on_stdout=parser.feed,
+    )
+
+    # Report why Nmap failed (if it did).
+    failure = result.describe_failure()
+    if failure is not None:
+        parser.report.errors.append(failure)
+    parser.report.errors.extend(result.errors)
+    if (failure is not None) and result.stderr.strip():
+        parser.report.errors.append(result.stderr.strip())
+    return parser.report
+
+def scan(
+    args: NmapArgs,
+    on_host: Optional[Callable[[NmapHost], None]] = None,
+    on_shard: Optional[ShardCallback] = None,
+    timeout: float = TOOL_TIMEOUT,
+) -> NmapReport:
+    """Runs Nmap, splitting large scans into shards of targets and ports that are scanned at the same time.
+
+    Hosts are reported (by `on_host`) as soon as any shard finishes scanning them and shards (by `on_shard`) as soon as
+    they finish. Shards that could not start before the timeout are reported as errors.
+
+    Returns:
+        NmapReport. The results of every shard, merged.
+
+    """
+    try:
+        ports = get_ports(args)
+    except ValueError:
+        # Let Nmap interpret the ports requested (in one shard).
+        ports = None
+    shards = plan_shards(
+        args,
+        get_targets(args),
+        ports,
+        hosts_per_shard=NMAP_SHARD_HOSTS,
+        ports_per_shard=NMAP_SHARD_PORTS,
+        max_shards=NMAP_MAX_SHARDS,
+    )
+    if len(shards) <= 1:
+        # Scan the planned shard (its targets are split from any comma separated lists the LLM may have used).
+        shard = shards[0] if shards else args
+        report = scan_shard(shard, on_host=on_host, timeout=timeout)
+        if on_shard is not None:
+            on_shard(shard, report, 1, 1)
+        return report
+
+    # Callbacks are called from the threads waiting on each shard so, take turns.
+    lock = Lock()
+    done = 0
+    started = monotonic()
+    deadline = started + timeout
+
+    def report_host(host: NmapHost) -> None:
+        with lock:
+            on_host(host)
+
+    def run(shard: NmapArgs) -> NmapReport:
+        nonlocal done
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            report = NmapReport(
+                command=" ".join(get_command(shard)),
+                errors=[f"did not scan {', '.join(shard.target)} (the scan timed out first)"],
+            )
+        else:
+            report = scan_shard(shard, on_host=report_host if on_host is not None else None, timeout=remaining)
+        with lock:
+            done += 1
+            if on_shard is not None:
+                on_shard(shard, report, done, len(shards))
+        return report
 
-    # Execute the command.
-    process = Popen(command, stderr=STDOUT, stdout=PIPE, text=True)
-    
-    # TODO: should this be blocking or no?
-    output, _ = process.communicate() 
+    # Run each shard in the caller's context (so its spans and inject ID carry over).
+    workers = min(NMAP_PARALLELISM, len(shards))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hades-nmap") as executor:
+        futures = [executor.submit(copy_context().run, run, shard) for shard in shards]
+        reports = [future.result() for future in futures]
+
+    report = merge_reports(" ".join(get_command(args)), reports)
+    up = sum(1 for host in report.hosts if host.state == "up")
+    report.summary = f"Nmap done: {len(shards)} scans ({up} hosts up) in {monotonic() - started:.2f} seconds."
+    return report
+
+def get_targets(args: NmapArgs) -> List[str]:
+    """Returns every target given (splitting any comma separated lists the LLM may have used)."""
+    return [target.strip() for targets in args.target for target in targets.split(",") if target.strip()]
+
+def get_ports(args: NmapArgs) -> Optional[Set[int]]:
+    """Returns the port numbers requested (or None if Nmap's default ports will be scanned).
+
+    Raises:
+        ValueError: If the ports requested use syntax other than numbers and ranges (e.g., "U:53" or "http").
+
+    """
+    if (args.ports is None) or (len(args.ports) == 0):
+        return None
+    ports = set()
+    for port_range in ",".join(args.ports).split(","):
+        start, _, end = port_range.strip().partition("-")
+        if _ == "":
+            ports.add(int(start))
+        else:
+            ports.update(range(int(start or 1), int(end or 65535) + 1))
+    return ports
+
+def recall(inject_id: str, args: NmapArgs) -> Optional[NmapReport]:
+    """Answers a scan request from what the inject already knows (or returns None if a scan is required).
+
+    Returns:
+        NmapReport.
+
+    """
+    # Script results depend on the script and its arguments so, they are never reused (and host discovery is fast).
+    if args.script or args.script_args or args.sn:
+        return None
+
+    try:
+        ports = get_ports(args)
+    except ValueError:
+        return None
+
+    report = NmapReport(
+        command=" ".join(get_command(args)),
+        summary="Answered using scan results already gathered during this inject.",
+    )
+    for target in get_targets(args):
+        # Only individual IP addresses are recalled (networks and hostnames have to be scanned to be resolved).
+        try:
+            ip_address(target)
+        except ValueError:
+            return None
+
+        known = knowledge_store.get(inject_id, target)
+        if (known is None) or (known.state is None) or (not known.has_scanned(ports)):
+            return None
+        open_ports = known.open_ports(ports)
+        if args.sV and not all(port["versioned"] for port in open_ports):
+            return None
+        if args.O and known.os_observed is None:
+            return None
+
+        report.hosts.append(NmapHost(
+            address=known.address,
+            state=known.state,
+            hostnames=known.hostnames,
+            ports=[NmapPort(**port) for port in open_ports],
+            os=known.os if args.O else [],
+        ))
+    return report
+
+def remember(inject_id: str, args: NmapArgs, report: NmapReport) -> None:
+    """Saves the results of a scan so later requests covering the same targets, ports, and flags can reuse them."""
+    try:
+        ports = get_ports(args)
+    except ValueError:
+        # Nmap understood the ports requested but, it is unclear which were covered.
+        ports = []
+    if report.errors:
+        # Nmap failed (or timed out) part way through so, do not count any port as scanned.
+        ports = []
+
+    for host in report.hosts:
+        knowledge_store.record_host(inject_id, host.address, host.state, host.hostnames)
+        if args.sn:
+            # No ports were scanned.
+            continue
+        knowledge_store.record_ports(
+            inject_id,
+            host.address,
+            ports=[port.model_dump() for port in host.ports],
+            scanned=ports,
+            versioned=args.sV,
+        )
+        if args.O:
+            knowledge_store.record_os(inject_id, host.address, host.os)
+
+def report_shard(inject_id: str, args: NmapArgs, report: NmapReport, done: int, total: int) -> None:
+    """Saves the results of a finished shard and (if the scan was split) reports them before the rest are done."""
+    remember(inject_id, args, report)
+    if total > 1:
+        IOStream.get_default().print({
+            "sender": "nmap",
+            "timestamp": get_timestamp(),
+            "message": f"Finished {done} of {total} Nmap scans.\n{report.render()}",
+        })
+
+def nmap(args: Annotated[NmapArgs, "Nmap arguments."]) -> str:
+    """Nmap is a tool used for enumerating and exploiting networks.
+
+    Returns:
+        str.
+
+    """
+    # Check if earlier tasks already gathered what was requested.
+    inject_id = INJECT_ID.get()
+    report = recall(inject_id, args)
+    if report is None:
+        report = scan(args, on_shard=lambda *shard: report_shard(inject_id, *shard))
 
-    # TODO: limit character count to meet LLM input requirements.
-    return output
+    return report.render()
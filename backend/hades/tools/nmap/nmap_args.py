@@ -18,6 +18,11 @@ class NmapArgs(BaseModel):
         Field(default=None, description="A comma separated list of ports to scan."),
     ]
 
+    sn: Annotated[
+        bool,
+        Field(default=False, description="Only discover which hosts are up (i.e., do not scan their ports)."),
+    ]
+
     sV: Annotated[
         bool,
         Field(default=False, description="Perform a service version scan."),
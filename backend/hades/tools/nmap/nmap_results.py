@@ -0,0 +1,168 @@
+"""Defines structured Nmap results and a streaming parser for Nmap's XML output."""
+
+# Standard library imports.
+from typing import Callable, List, Optional
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+# Third-party imports.
+from pydantic import BaseModel, Field
+
+
+class NmapScript(BaseModel):
+    id: str
+    output: str
+
+
+class NmapPort(BaseModel):
+    port: int
+    protocol: str
+    state: str
+    service: Optional[str] = None
+    product: Optional[str] = None
+    version: Optional[str] = None
+    extrainfo: Optional[str] = None
+    scripts: List[NmapScript] = Field(default_factory=list)
+
+    def render(self) -> str:
+        """Returns the port as a single line (e.g., "21/tcp open ftp vsftpd 2.3.4")."""
+        fields = [f"{self.port}/{self.protocol}", self.state, self.service, self.product, self.version]
+        line = " ".join(field for field in fields if field)
+        if self.extrainfo:
+            line += f" ({self.extrainfo})"
+        return line
+
+
+class NmapHost(BaseModel):
+    address: str
+    state: str
+    hostnames: List[str] = Field(default_factory=list)
+    ports: List[NmapPort] = Field(default_factory=list)
+    extraports: List[str] = Field(default_factory=list)
+    os: List[str] = Field(default_factory=list)
+    scripts: List[NmapScript] = Field(default_factory=list)
+
+    def render(self) -> str:
+        """Returns the host as a compact, indented block of text."""
+        header = self.address
+        if self.hostnames:
+            header += f" ({', '.join(self.hostnames)})"
+        lines = [f"{header} {self.state}"]
+        for port in self.ports:
+            lines.append(f"  {port.render()}")
+            lines.extend(render_script(script, indent="    ") for script in port.scripts)
+        lines.extend(f"  {extraports}" for extraports in self.extraports)
+        if self.os:
+            lines.append(f"  OS: {'; '.join(self.os)}")
+        lines.extend(render_script(script, indent="  ") for script in self.scripts)
+        return "\n".join(lines)
+
+
+class NmapReport(BaseModel):
+    command: str = ""
+    hosts: List[NmapHost] = Field(default_factory=list)
+    summary: Optional[str] = None
+    errors: List[str] = Field(default_factory=list)
+
+    def render(self) -> str:
+        """Returns the report as compact text for an LLM to read."""
+        blocks = [host.render() for host in self.hosts]
+        if not blocks:
+            blocks.append("No hosts found.")
+        blocks.extend(f"Error: {error}" for error in self.errors)
+        if self.summary:
+            blocks.append(self.summary)
+        return "\n".join(blocks)
+
+
+def render_script(script: NmapScript, indent: str) -> str:
+    """Returns the output of an Nmap Scripting Engine (NSE) script without blank lines."""
+    lines = [line.strip() for line in script.output.splitlines() if line.strip()]
+    return "\n".join([f"{indent}|{script.id}: {lines[0] if lines else ''}"] + [f"{indent}| {line}" for line in lines[1:]])
+
+
+def parse_scripts(element: Element) -> List[NmapScript]:
+    return [
+        NmapScript(id=script.get("id", ""), output=script.get("output", ""))
+        for script in element.findall("script")
+    ]
+
+
+def parse_host(element: Element) -> NmapHost:
+    """Converts a <host> element of Nmap's XML output into an NmapHost."""
+    # Prefer the IP address over the MAC address when a host has both.
+    addresses = {address.get("addrtype"): address.get("addr") for address in element.findall("address")}
+    address = addresses.get("ipv4") or addresses.get("ipv6") or next(iter(addresses.values()), "unknown")
+
+    status = element.find("status")
+    host = NmapHost(
+        address=address,
+        state=status.get("state", "unknown") if status is not None else "unknown",
+        hostnames=[hostname.get("name") for hostname in element.findall("hostnames/hostname") if hostname.get("name")],
+    )
+
+    for port in element.findall("ports/port"):
+        state = port.find("state")
+        service = port.find("service")
+        host.ports.append(NmapPort(
+            port=int(port.get("portid", 0)),
+            protocol=port.get("protocol", ""),
+            state=state.get("state", "unknown") if state is not None else "unknown",
+            service=service.get("name") if service is not None else None,
+            product=service.get("product") if service is not None else None,
+            version=service.get("version") if service is not None else None,
+            extrainfo=service.get("extrainfo") if service is not None else None,
+            scripts=parse_scripts(port),
+        ))
+
+    for extraports in element.findall("ports/extraports"):
+        host.extraports.append(f"{extraports.get('count')} {extraports.get('state')} ports not shown")
+
+    for osmatch in element.findall("os/osmatch"):
+        host.os.append(f"{osmatch.get('name')} ({osmatch.get('accuracy')}%)")
+
+    hostscript = element.find("hostscript")
+    if hostscript is not None:
+        host.scripts = parse_scripts(hostscript)
+    return host
+
+
+class NmapXmlParser:
+    """Incrementally parses Nmap's XML output, reporting each host as soon as Nmap finishes scanning it.
+
+    Args:
+        on_host (Callable): Optional function called with each NmapHost as it is parsed.
+
+    Attributes:
+        report (NmapReport): The results parsed so far.
+    """
+    def __init__(self, on_host: Optional[Callable[[NmapHost], None]] = None):
+        self.on_host = on_host
+        self.report = NmapReport()
+        self.__parser: Optional[XMLPullParser] = XMLPullParser(events=("start", "end"))
+
+    def feed(self, data: str) -> None:
+        """Parses the next chunk of Nmap's XML output."""
+        if self.__parser is None:
+            return
+        try:
+            self.__parser.feed(data)
+            events = list(self.__parser.read_events())
+        except ParseError as error:
+            # Keep the hosts parsed so far (e.g., if Nmap was killed mid-write) and ignore the rest.
+            self.report.errors.append(f"could not parse Nmap's output: {error}")
+            self.__parser = None
+            return
+        for event, element in events:
+            if event == "start" and element.tag == "nmaprun":
+                self.report.command = element.get("args", "")
+            elif event == "end" and element.tag == "host":
+                host = parse_host(element)
+                self.report.hosts.append(host)
+                if self.on_host is not None:
+                    self.on_host(host)
+                # Free the host's elements since they have been converted already.
+                element.clear()
+            elif event == "end" and element.tag == "finished":
+                self.report.summary = element.get("summary")
+            elif event == "end" and element.tag == "error":
+                self.report.errors.append(element.get("errorstr", ""))
@@ -0,0 +1,150 @@
+"""Defines how an Nmap scan is split into shards (that can run at the same time) and how their results are merged."""
+
+# Standard library imports.
+from ipaddress import ip_network
+from math import ceil, log2
+from typing import Dict, List, Optional, Set
+
+# Local imports.
+from .nmap_args import NmapArgs
+from .nmap_results import NmapHost, NmapReport
+
+
+def split_targets(targets: List[str], hosts_per_shard: int, max_shards: Optional[int] = None) -> List[List[str]]:
+    """Splits targets into groups of (at most) the given number of hosts.
+
+    Networks larger than a group are split into subnets of that size. Anything else (e.g., hostnames and Nmap's own
+    range syntax) counts as one host. If that would make more groups than allowed, the groups are made larger (doubling
+    their size until they fit) so, large networks (e.g., an IPv6 /64) are never split into more subnets than allowed.
+
+    Returns:
+        list[list[str]].
+
+    """
+    networks = []
+    singles: List[str] = []
+    for target in targets:
+        try:
+            network = ip_network(target, strict=False)
+        except ValueError:
+            singles.append(target)
+            continue
+        if network.num_addresses == 1:
+            singles.append(str(network.network_address))
+        else:
+            networks.append(network)
+
+    def count_groups(size: int, prefix_bits: int) -> int:
+        # Count the groups (without listing the subnets, which could take forever for large networks).
+        subnets = sum(max(network.num_addresses >> prefix_bits, 1) for network in networks)
+        return subnets + ceil(len(singles) / size)
+
+    size = max(hosts_per_shard, 1)
+    prefix_bits = ceil(log2(size))
+    if max_shards is not None:
+        while (count_groups(size, prefix_bits) > max_shards) and (
+            any(network.num_addresses > size for network in networks) or (len(singles) > size)
+        ):
+            size, prefix_bits = size * 2, prefix_bits + 1
+
+    groups: List[List[str]] = []
+    for network in networks:
+        if network.num_addresses <= size:
+            groups.append([str(network)])
+        else:
+            new_prefix = network.max_prefixlen - prefix_bits
+            groups.extend([str(subnet)] for subnet in network.subnets(new_prefix=new_prefix))
+    groups.extend(singles[i:i + size] for i in range(0, len(singles), size))
+    return groups
+
+
+def to_port_ranges(ports: List[int]) -> List[str]:
+    """Collapses sorted port numbers into Nmap port ranges (e.g., [21, 22, 23, 80] into ["21-23", "80"])."""
+    ranges: List[str] = []
+    start = previous = None
+    for port in ports + [None]:
+        if (port is not None) and (previous is not None) and (port == previous + 1):
+            previous = port
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = port
+    return ranges
+
+
+def split_ports(ports: Optional[Set[int]], ports_per_shard: int) -> List[Optional[List[str]]]:
+    """Splits the port numbers requested into groups of (at most) the given size (None means Nmap's default ports).
+
+    Returns:
+        list[list[str]].
+
+    """
+    if (ports is None) or (len(ports) <= ports_per_shard):
+        return [None]
+    ordered = sorted(ports)
+    return [to_port_ranges(ordered[i:i + ports_per_shard]) for i in range(0, len(ordered), ports_per_shard)]
+
+
+def plan_shards(
+    args: NmapArgs,
+    targets: List[str],
+    ports: Optional[Set[int]],
+    hosts_per_shard: int,
+    ports_per_shard: int,
+    max_shards: Optional[int] = None,
+) -> List[NmapArgs]:
+    """Returns the scans that (together) cover the targets and ports requested.
+
+    Ports are only split when OS detection was not requested (it needs open and closed ports in the same scan). If
+    there would be more scans than allowed, each one is given more hosts.
+
+    Args:
+        args (NmapArgs): The scan requested.
+        targets (list[str]): Every target requested.
+        ports (set[int]): The port numbers requested (None if Nmap's default ports will be scanned or the ports could
+            not be parsed).
+        hosts_per_shard (int): Maximum number of hosts per scan.
+        ports_per_shard (int): Maximum number of ports per scan.
+        max_shards (int): Maximum number of scans (None for no limit).
+
+    Returns:
+        list[NmapArgs].
+
+    """
+    port_groups = [None] if args.O else split_ports(ports, ports_per_shard)
+    max_target_groups = None if max_shards is None else max(max_shards // len(port_groups), 1)
+    return [
+        args.model_copy(update={"target": group, **({} if port_group is None else {"ports": port_group})})
+        for group in split_targets(targets, hosts_per_shard, max_target_groups)
+        for port_group in port_groups
+    ]
+
+
+def merge_hosts(host: NmapHost, other: NmapHost) -> NmapHost:
+    """Combines what two scans (e.g., of different ports) found about the same host."""
+    ports = {(port.protocol, port.port): port for port in host.ports + other.ports}
+    return NmapHost(
+        address=host.address,
+        state="up" if "up" in (host.state, other.state) else host.state,
+        hostnames=list(dict.fromkeys(host.hostnames + other.hostnames)),
+        ports=[ports[key] for key in sorted(ports)],
+        extraports=host.extraports + other.extraports,
+        os=list(dict.fromkeys(host.os + other.os)),
+        scripts=host.scripts + other.scripts,
+    )
+
+
+def merge_reports(command: str, reports: List[NmapReport], summary: Optional[str] = None) -> NmapReport:
+    """Merges the reports of every shard of a scan into one (keeping the order hosts were first reported in).
+
+    Returns:
+        NmapReport.
+
+    """
+    hosts: Dict[str, NmapHost] = {}
+    errors: List[str] = []
+    for report in reports:
+        for host in report.hosts:
+            hosts[host.address] = merge_hosts(hosts[host.address], host) if host.address in hosts else host
+        errors.extend(error for error in report.errors if error not in errors)
+    return NmapReport(command=command, hosts=list(hosts.values()), summary=summary, errors=errors)
@@ -0,0 +1,32 @@
+"""Tests the persistent store of injects."""
+
+# Local imports.
+from hades.injects.store import InjectStore
+
+
+def get_inject(name: str) -> dict:
+    return {"name": name, "systems": [{"targets": [{"type": "machine", "address": "10.0.0.1"}]}]}
+
+
+def test_store_fails_injects_left_unfinished_by_a_restart(tmp_path):
+    path = str(tmp_path / "injects.db")
+    store = InjectStore(path)
+    for inject_id, status in (("a", "queued"), ("b", "running"), ("c", "completed"), ("d", "failed")):
+        store.add(inject_id, get_inject(inject_id), status=status)
+
+    store = InjectStore(path)
+    assert {inject_id: store.get_status(inject_id)["state"] for inject_id in "abcd"} == {
+        "a": "failed",
+        "b": "failed",
+        "c": "completed",
+        "d": "failed",
+    }
+    assert store.get_status("a")["error"] == "the backend stopped before the inject finished"
+    assert store.get_status("d")["error"] is None
+    assert store.list(status="running") == (0, [])
+
+
+def test_store_can_leave_unfinished_injects_alone(tmp_path):
+    path = str(tmp_path / "injects.db")
+    InjectStore(path).add("a", get_inject("a"))
+    assert InjectStore(path, recover=False).get_status("a")["state"] == "queued"
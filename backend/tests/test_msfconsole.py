@@ -0,0 +1,50 @@
+"""Tests how Msfconsole sessions are kept apart between injects."""
+
+# Standard library imports.
+import os
+
+# Local imports.
+from benchmarks.fake_tools import install_fake_tools
+from hades.tools.metasploit.console_pool import MsfconsolePool
+from hades.tools.metasploit.msfconsole import filter_sessions
+
+SESSIONS = """
+Active sessions
+===============
+
+  Id  Name  Type             Information  Connection
+  --  ----  ----             -----------  ----------
+  1         shell x86/linux               10.0.0.1:4444 -> 10.0.0.5:41234 (10.0.0.5)
+  2         shell x86/linux               10.0.0.1:4445 -> 10.0.0.6:41234 (10.0.0.6)
+"""
+
+
+def test_filter_sessions_keeps_only_the_sessions_given():
+    output = filter_sessions(SESSIONS, [2])
+    assert "10.0.0.6" in output
+    assert "10.0.0.5" not in output
+    assert "Active sessions" in output
+
+
+def test_filter_sessions_returns_none_without_sessions():
+    assert filter_sessions(SESSIONS, [3]) is None
+    assert filter_sessions("No active sessions.\n", [1]) is None
+
+
+def test_pool_forgets_sessions_when_the_worker_restarts(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", f"{install_fake_tools(str(tmp_path))}{os.pathsep}{os.environ['PATH']}")
+    pool = MsfconsolePool(size=1, boot_timeout=30, command_timeout=30, max_output=10000)
+    try:
+        # The fake Msfconsole prints every command it is given (like Msfconsole prints that a session opened).
+        pool.execute(["session 3 opened (10.0.0.1:4444 -> 10.0.0.5:41234)"], workspace="a")
+        assert pool.get_sessions("a") == [3]
+        assert pool.find_session("a", "10.0.0.5") == 3
+        assert pool.find_session("b") is None
+
+        pool.workers[0].stop()
+        pool.execute(["version"], workspace="a")
+        assert pool.get_sessions("a") == []
+        assert pool.find_session("a") is None
+    finally:
+        for worker in pool.workers:
+            worker.stop()
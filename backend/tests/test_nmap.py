@@ -0,0 +1,14 @@
+"""Tests how Nmap commands are built."""
+
+# Local imports.
+from hades.tools.nmap.nmap import get_command
+from hades.tools.nmap.nmap_args import NmapArgs
+
+
+def test_get_command_passes_each_target_as_its_own_argument():
+    command = get_command(NmapArgs(target=["10.0.0.1", "10.0.0.2", "10.0.1.0/28"], ports=["22", "80"], sV=True))
+    assert command == ["nmap", "10.0.0.1", "10.0.0.2", "10.0.1.0/28", "-oX", "-", "-p", "22,80", "-sV"]
+
+
+def test_get_command_keeps_octet_ranges_whole():
+    assert get_command(NmapArgs(target=["10.0.0.1,2"]))[:2] == ["nmap", "10.0.0.1,2"]
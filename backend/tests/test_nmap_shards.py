@@ -0,0 +1,97 @@
+"""Tests how Nmap scans are split into shards and how their results are merged."""
+
+# Standard library imports.
+import time
+
+# Local imports.
+from hades.tools.nmap.nmap_args import NmapArgs
+from hades.tools.nmap.nmap_results import NmapHost, NmapPort, NmapReport
+from hades.tools.nmap.nmap_shards import merge_reports, plan_shards, split_ports, split_targets, to_port_ranges
+
+
+def test_split_targets_splits_networks_into_subnets():
+    assert split_targets(["10.0.0.0/26"], 16) == [
+        ["10.0.0.0/28"],
+        ["10.0.0.16/28"],
+        ["10.0.0.32/28"],
+        ["10.0.0.48/28"],
+    ]
+
+
+def test_split_targets_keeps_small_networks_whole():
+    assert split_targets(["10.0.0.0/29", "10.0.1.0/28"], 16) == [["10.0.0.0/29"], ["10.0.1.0/28"]]
+
+
+def test_split_targets_groups_hosts():
+    targets = ["10.0.0.1", "10.0.0.2/32", "example.com", "10.0.0.3-5"]
+    assert split_targets(targets, 2) == [["10.0.0.1", "10.0.0.2"], ["example.com", "10.0.0.3-5"]]
+
+
+def test_split_targets_grows_subnets_to_stay_under_the_cap():
+    groups = split_targets(["10.0.0.0/8"], 16, max_shards=256)
+    assert len(groups) == 256
+    assert groups[0] == ["10.0.0.0/16"]
+
+
+def test_split_targets_grows_host_groups_to_stay_under_the_cap():
+    targets = [f"10.0.0.{i}" for i in range(1, 101)]
+    groups = split_targets(targets, 1, max_shards=10)
+    assert len(groups) <= 10
+    assert [target for group in groups for target in group] == targets
+
+
+def test_split_targets_does_not_enumerate_large_ipv6_networks():
+    started = time.monotonic()
+    groups = split_targets(["2001:db8::/64"], 16, max_shards=256)
+    assert time.monotonic() - started < 1
+    assert len(groups) == 256
+    assert groups[0] == ["2001:db8::/72"]
+
+
+def test_to_port_ranges_collapses_consecutive_ports():
+    assert to_port_ranges([21, 22, 23, 80, 443, 444]) == ["21-23", "80", "443-444"]
+    assert to_port_ranges([]) == []
+
+
+def test_split_ports_leaves_small_and_default_port_lists_whole():
+    assert split_ports(None, 2) == [None]
+    assert split_ports({22, 80}, 2) == [None]
+
+
+def test_split_ports_splits_into_ranges():
+    assert split_ports({1, 2, 3, 4, 5, 80}, 3) == [["1-3"], ["4-5", "80"]]
+
+
+def test_plan_shards_does_not_split_ports_for_os_detection():
+    shards = plan_shards(NmapArgs(target=["10.0.0.1"], O=True), ["10.0.0.1"], {1, 2, 3}, 16, 1)
+    assert len(shards) == 1
+
+
+def test_plan_shards_counts_port_groups_toward_the_cap():
+    shards = plan_shards(NmapArgs(target=["10.0.0.0/16"]), ["10.0.0.0/16"], {1, 2, 3, 4}, 16, 2, max_shards=64)
+    assert len(shards) == 64
+
+
+def test_merge_reports_combines_hosts_and_errors():
+    ssh = NmapPort(port=22, protocol="tcp", state="open", service="ssh")
+    http = NmapPort(port=80, protocol="tcp", state="open", service="http")
+    reports = [
+        NmapReport(
+            hosts=[NmapHost(address="10.0.0.2", state="down"), NmapHost(address="10.0.0.1", state="up", ports=[http])],
+            errors=["timed out"],
+        ),
+        NmapReport(
+            hosts=[NmapHost(address="10.0.0.1", state="up", hostnames=["web"], ports=[ssh])],
+            errors=["timed out", "failed"],
+        ),
+        NmapReport(hosts=[NmapHost(address="10.0.0.2", state="up")]),
+    ]
+    report = merge_reports("nmap 10.0.0.0/30", reports, summary="done")
+
+    assert report.command == "nmap 10.0.0.0/30"
+    assert report.summary == "done"
+    assert [host.address for host in report.hosts] == ["10.0.0.2", "10.0.0.1"]
+    assert report.hosts[0].state == "up"
+    assert [port.port for port in report.hosts[1].ports] == [22, 80]
+    assert report.hosts[1].hostnames == ["web"]
+    assert report.errors == ["timed out", "failed"]
@@ -0,0 +1,56 @@
+"""Tests how Metasploit payloads are queried."""
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from hades.tools.metasploit import payloads
+
+
+@pytest.fixture(autouse=True)
+def payload_index(monkeypatch):
+    monkeypatch.setattr(payloads, "_index", {"payloads": [
+        {
+            "refname": "windows/x64/meterpreter/reverse_tcp",
+            "platform": "win",
+            "arch": "ARCH_X64",
+            "handler": "Msf::Handler::ReverseTcp",
+            "session": "Msf::Sessions::Meterpreter_x64_Win",
+        },
+        {
+            "refname": "linux/x86/shell_reverse_tcp",
+            "platform": "linux",
+            "arch": "ARCH_X86",
+            "handler": "Msf::Handler::ReverseTcp",
+        },
+        {
+            "refname": "linux/x64/shell_bind_tcp",
+            "platform": "linux",
+            "arch": "ARCH_X86_64",
+            "handler": "Msf::Handler::BindTcp",
+        },
+        {"refname": "cmd/unix/reverse", "platform": "unix", "arch": "ARCH_CMD"},
+    ]})
+
+
+def get_refnames(**filters) -> list:
+    return [payload["refname"] for payload in payloads.query_payloads(**filters)["payloads"]]
+
+
+def test_query_payloads_understands_platform_aliases():
+    assert get_refnames(platform="windows") == ["windows/x64/meterpreter/reverse_tcp"]
+    assert get_refnames(platform="Win") == ["windows/x64/meterpreter/reverse_tcp"]
+
+
+def test_query_payloads_matches_whole_architectures():
+    assert get_refnames(arch="x86") == ["linux/x86/shell_reverse_tcp"]
+    assert get_refnames(arch="amd64") == ["windows/x64/meterpreter/reverse_tcp", "linux/x64/shell_bind_tcp"]
+
+
+def test_query_payloads_matches_handlers_loosely():
+    assert get_refnames(handler="reverse_tcp", platform="linux") == ["linux/x86/shell_reverse_tcp"]
+
+
+def test_query_payloads_pages_results():
+    result = payloads.query_payloads(page=2, page_size=3)
+    assert (result["total"], result["pages"], len(result["payloads"])) == (4, 2, 1)
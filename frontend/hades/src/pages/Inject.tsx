@@ -27,6 +27,7 @@ import { BACKEND } from "../constants";
 
 const TargetTypes = [
   { key: "Machine", value: "machine" },
+  { key: "Network", value: "network" },
   { key: "Persona", value: "persona" },
 ];
 
@@ -30,6 +30,9 @@ type ChatMessage = {
   function_call?: FunctionCall[];
   tool_calls?: ToolCall[];
   timestamp?: string;
+  type?: string;
+  stream_id?: string;
+  token?: string;
 };
 
 const avatarMap: Record<string, string> = {
@@ -47,7 +50,7 @@ export default function InjectDetails() {
   useEffect(() => {
     if (!id) return;
 
-    const socket = new WebSocket(`ws://${BACKEND}/ws/${id}`);
+    const socket = new WebSocket(`ws://${BACKEND}/ws/${id}?offset=0`);
 
     socket.onopen = () => {
       setConnected(true);
@@ -65,7 +68,39 @@ export default function InjectDetails() {
     socket.onmessage = (event) => {
       const parsed: ChatMessage = JSON.parse(event.data);
       if (!parsed.timestamp) parsed.timestamp = new Date().toISOString();
-      setMessages((prev) => [...prev, parsed]);
+
+      // Full tool output is kept for reports (the chat shows what the agents were given).
+      if (parsed.type === "tool_output") return;
+
+      // Grow a partial message as its tokens are streamed in.
+      if (parsed.type === "token") {
+        setMessages((prev) => {
+          const i = prev.findIndex((msg) => msg.stream_id === parsed.stream_id);
+          if (i !== -1) {
+            return [
+              ...prev.slice(0, i),
+              { ...prev[i], message: (prev[i].message || "") + parsed.token },
+              ...prev.slice(i + 1),
+            ];
+          }
+          return [
+            ...prev,
+            {
+              sender: parsed.sender,
+              message: parsed.token,
+              stream_id: parsed.stream_id,
+              timestamp: parsed.timestamp,
+            },
+          ];
+        });
+        return;
+      }
+
+      // Replace the partial message streamed for this reply (if any) with the full one.
+      setMessages((prev) => {
+        const i = parsed.stream_id ? prev.findIndex((msg) => msg.stream_id === parsed.stream_id) : -1;
+        return i === -1 ? [...prev, parsed] : [...prev.slice(0, i), parsed, ...prev.slice(i + 1)];
+      });
       console.log("Received:", JSON.stringify(parsed, null, 2));
     };
 
@@ -2,44 +2,104 @@
 
 # Standard library imports.
 import asyncio
+from json import dumps
+from os import environ
+from threading import Event
+from typing import Optional
 
 # Third-party imports.
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from llama_cpp import Llama
+
+# Local imports.
+from .scheduler import InferenceScheduler, NoWorkersError, QueueFullError
+
+LLM_KV_CACHE_BYTES = int(environ.get("LLM_KV_CACHE_BYTES", 2 << 30))
+LLM_MODEL_PATH = environ.get("LLM_MODEL_PATH", "mistral-7b-instruct-v0.2.Q6_K.gguf")
+LLM_QUEUE_SIZE = int(environ.get("LLM_QUEUE_SIZE", 64))
+LLM_TIMEOUT = float(environ.get("LLM_TIMEOUT", 60))
+LLM_WORKERS = int(environ.get("LLM_WORKERS", 1))
 
 api = FastAPI(title="HADES Inference Server")
 
-llm = Llama(model_path="mistral-7b-instruct-v0.2.Q6_K.gguf")
+scheduler = InferenceScheduler(
+    model_path=LLM_MODEL_PATH,
+    workers=LLM_WORKERS,
+    max_queued=LLM_QUEUE_SIZE,
+    cache_bytes=LLM_KV_CACHE_BYTES,
+)
 
 class ChatMessage(BaseModel):
     role: str
-    content: str
+    content: Optional[str] = None
 
 class ChatRequest(BaseModel):
     model: str
     messages: list[ChatMessage]
     temperature: float = 0.7
     max_tokens: int = 1024
+    stream: bool = False
+    user: Optional[str] = None
+
+def get_chat_messages(messages: list[ChatMessage]) -> list[dict]:
+    """Fits a conversation to the model's chat template, which only allows alternating user and assistant turns.
+
+    System messages are folded into the first user turn, any other role (e.g., function results) is treated as a user
+    turn, and consecutive turns from the same role are merged. Keeping the system message at the start keeps every
+    prompt for the same agent starting with the same tokens (so the cached KV states can be reused).
+
+    Returns:
+        list[dict].
+
+    """
+    system = "\n\n".join(message.content or "" for message in messages if message.role == "system")
+    turns = []
+    for message in messages:
+        if message.role == "system":
+            continue
+        role = "assistant" if (message.role == "assistant") and turns else "user"
+        if turns and turns[-1]["role"] == role:
+            turns[-1]["content"] += "\n\n" + (message.content or "")
+        else:
+            turns.append({"role": role, "content": message.content or ""})
+    if system:
+        if turns:
+            turns[0]["content"] = system + "\n\n" + turns[0]["content"]
+        else:
+            turns.append({"role": "user", "content": system})
+    return turns
 
 @api.post("/v1/chat/completions")
-async def chat_completion(request: ChatRequest):
-    print(request.json())
-    prompt = "\n".join([f"{message.role}: {message.content}" for message in request.messages])
+async def chat_completion(request: ChatRequest, http_request: Request):
+    messages = get_chat_messages(request.messages)
+
+    # Take turns between callers (e.g., injects) instead of serving requests in the order they arrive.
+    caller = request.user or http_request.client.host
+    if request.stream:
+        return stream_chat_completion(request, messages, caller)
     try:
-        output = await asyncio.wait_for(
-            asyncio.to_thread(
-                llm,
-                prompt,
+        future = scheduler.submit(
+            caller,
+            lambda llm: llm.create_chat_completion(
+                messages=messages,
                 temperature=request.temperature,
                 max_tokens=request.max_tokens,
             ),
-            timeout=60,
         )
+    except (NoWorkersError, QueueFullError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        output = await asyncio.wait_for(asyncio.wrap_future(future), timeout=LLM_TIMEOUT)
     except asyncio.TimeoutError:
+        # Drop the request if it is still queued.
+        future.cancel()
         raise HTTPException(status_code=504, detail="LLM inference timed out")
+    except NoWorkersError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    content = output["choices"][0]["text"]
+    content = output["choices"][0]["message"]["content"]
     return {
         "id": "local",
         "object": "chat.completion",
@@ -47,10 +107,58 @@ async def chat_completion(request: ChatRequest):
         "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
     }
 
+def stream_chat_completion(request: ChatRequest, messages: list[dict], caller: str) -> StreamingResponse:
+    """Returns the completion as server-sent events (one per chunk of tokens) as they are generated.
+
+    Returns:
+        StreamingResponse.
+
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    stopped = Event()
+
+    def generate(llm):
+        # Hand each chunk to the event loop as soon as the model produces it.
+        for chunk in llm.create_chat_completion(
+            messages=messages,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            stream=True,
+        ):
+            if stopped.is_set():
+                break
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+    try:
+        future = scheduler.submit(caller, generate)
+    except (NoWorkersError, QueueFullError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    # End the stream once the job is done (including when it failed before it could run).
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(chunks.put_nowait, None))
+
+    async def events():
+        try:
+            while (chunk := await asyncio.wait_for(chunks.get(), timeout=LLM_TIMEOUT)) is not None:
+                chunk["model"] = request.model
+                yield f"data: {dumps(chunk)}\n\n"
+            # Surface errors raised while generating (by ending the stream without the "[DONE]" event).
+            await asyncio.wrap_future(future)
+            yield "data: [DONE]\n\n"
+        finally:
+            # Stop generating if the client went away (or the model stalled).
+            stopped.set()
+            future.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @api.get("/healthcheck")
 def healthcheck():
-    try:
-        _ = llm("ping", max_tokens=1)
-        return {"status": "OK"}
-    except Exception as e:
-        return {"status": str(e)}
+    workers = [{key: worker[key] for key in ("name", "state", "error")} for worker in scheduler.workers]
+    if any(worker["state"] in ("ready", "busy") for worker in workers):
+        status = "OK"
+    elif all(worker["state"] == "failed" for worker in workers):
+        status = workers[0]["error"]
+    else:
+        status = "loading"
+    return {"status": status, "queued": scheduler.queued, "workers": workers}
@@ -0,0 +1,171 @@
+"""Defines a scheduler that shares the local model between callers."""
+
+# Standard library imports.
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from threading import Condition, Thread
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Third-party imports.
+from llama_cpp import Llama, LlamaRAMCache
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a request is submitted while the scheduler's queue is full."""
+
+
+class NoWorkersError(RuntimeError):
+    """Raised when a request is submitted (or queued) while every model worker has failed to load the model."""
+
+
+class InferenceScheduler:
+    """Runs inference requests on a fixed number of model workers, taking turns between callers.
+
+    Each worker loads its own copy of the model (the weights are memory-mapped so, the copies share them) and is pinned
+    to its own slice of the CPU cores so, workers do not compete for the same cores. Requests are queued per caller and
+    workers take them round-robin across callers so, one busy caller (e.g., an inject with many targets) cannot starve
+    the others. A worker picks up the next request as soon as it finishes the last one.
+
+    Each worker also keeps the KV states of the prompts it evaluated (up to `cache_bytes`, evicting the least recently
+    used) so, a prompt that starts like an earlier one (e.g., the same system message and conversation so far) only
+    evaluates the tokens that are new.
+
+    Args:
+        model_path (str): Path to the model file.
+        workers (int): Number of model workers.
+        max_queued (int): Number of requests allowed to wait for a worker before new ones are rejected.
+        cache_bytes (int): Memory each worker may use to cache KV states (0 disables the cache).
+        model_kwargs (Dict): Other arguments passed to each worker's `Llama` instance.
+    """
+    def __init__(
+        self,
+        model_path: str,
+        workers: int,
+        max_queued: int,
+        cache_bytes: int = 0,
+        model_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        self.model_path = model_path
+        self.max_queued = max_queued
+        self.cache_bytes = cache_bytes
+        self.model_kwargs = model_kwargs or {}
+        self.__queues: "OrderedDict[str, Deque]" = OrderedDict()
+        self.__queued = 0
+        self.__condition = Condition()
+        self.workers: List[Dict[str, Any]] = []
+        for i, cores in enumerate(self.__split_cores(workers)):
+            worker = {"name": f"hades-llm-worker-{i}", "cores": cores, "state": "loading", "error": None}
+            self.workers.append(worker)
+            Thread(target=self.__work, args=(worker,), name=worker["name"], daemon=True).start()
+
+    @staticmethod
+    def __split_cores(workers: int) -> List[List[int]]:
+        # Give each worker an equal (and separate) share of the cores this process may run on (the first workers get
+        # one of the cores left over, if the cores cannot be split evenly).
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        workers = max(min(workers, len(cores)), 1)
+        share, extra = divmod(len(cores), workers)
+        shares: List[List[int]] = []
+        start = 0
+        for i in range(workers):
+            end = start + share + (1 if i < extra else 0)
+            shares.append(cores[start:end])
+            start = end
+        return shares
+
+    def __alive(self) -> bool:
+        # Returns whether any worker has loaded (or may still load) the model.
+        return any(worker["state"] != "failed" for worker in self.workers)
+
+    @property
+    def queued(self) -> int:
+        return self.__queued
+
+    def submit(self, caller: str, job: Callable[[Llama], Any]) -> Future:
+        """Queues a job (called with a worker's model) behind the caller's other jobs.
+
+        Raises:
+            NoWorkersError: If every worker failed to load the model.
+            QueueFullError: If the queue is full.
+
+        Returns:
+            Future. Cancel it to drop the job if it has not started yet.
+
+        """
+        future: Future = Future()
+        entry = (job, future)
+        with self.__condition:
+            if not self.__alive():
+                raise NoWorkersError("no model worker is available")
+            if self.__queued >= self.max_queued:
+                raise QueueFullError("the inference queue is full")
+            self.__queues.setdefault(caller, deque()).append(entry)
+            self.__queued += 1
+            self.__condition.notify()
+        future.add_done_callback(lambda future: future.cancelled() and self.__drop(caller, entry))
+        return future
+
+    def __drop(self, caller: str, entry) -> None:
+        # Remove a job whose caller gave up while it was queued (so it no longer takes up a place in the queue).
+        with self.__condition:
+            jobs = self.__queues.get(caller)
+            if (jobs is None) or (entry not in jobs):
+                return
+            jobs.remove(entry)
+            self.__queued -= 1
+            if not jobs:
+                del self.__queues[caller]
+
+    def __fail_queued(self) -> None:
+        # Fail every queued job once no worker is left to run it (instead of leaving its caller to time out).
+        with self.__condition:
+            if self.__alive():
+                return
+            entries = [entry for jobs in self.__queues.values() for entry in jobs]
+            self.__queues.clear()
+            self.__queued = 0
+        for _, future in entries:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(NoWorkersError("no model worker is available"))
+
+    def __next(self):
+        # Take the oldest job of the caller at the front of the line and then, send the caller to the back of it.
+        with self.__condition:
+            while self.__queued == 0:
+                self.__condition.wait()
+            caller, jobs = next(iter(self.__queues.items()))
+            job = jobs.popleft()
+            self.__queued -= 1
+            if jobs:
+                self.__queues.move_to_end(caller)
+            else:
+                del self.__queues[caller]
+            return job
+
+    def __work(self, worker: Dict[str, Any]) -> None:
+        # Pin the worker (and the threads llama.cpp starts from it) to its cores.
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, worker["cores"])
+        try:
+            llm = Llama(model_path=self.model_path, n_threads=len(worker["cores"]), **self.model_kwargs)
+            if self.cache_bytes > 0:
+                llm.set_cache(LlamaRAMCache(capacity_bytes=self.cache_bytes))
+        except Exception as e:
+            worker["state"], worker["error"] = "failed", str(e)
+            self.__fail_queued()
+            return
+        worker["state"] = "ready"
+
+        while True:
+            job, future = self.__next()
+            # Skip jobs whose caller gave up while they were queued.
+            if not future.set_running_or_notify_cancel():
+                continue
+            worker["state"] = "busy"
+            try:
+                future.set_result(job(llm))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                worker["state"] = "ready"